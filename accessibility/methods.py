@@ -2,6 +2,8 @@
 accessibility/methods.py
 """
 
+import time
+
 from django.core.cache import cache
 
 from accessibility.accessibility import ACCESSBILITY_FEATURE
@@ -9,39 +11,72 @@ from accessibility.filters import AccessibilityFilter
 from accessibility.models import DefaultAccessibility
 from horilla.horilla_middlewares import _thread_locals
 
+ACCESSIBILITY_GRANT_CACHE_KEY = "horilla_accessibility_grant_{}"
+ACCESSIBILITY_VERSION_CACHE_KEY = "horilla_accessibility_version"
 
-def check_is_accessible(feature, cache_key, employee):
-    """
-    Method to check the employee is accessible for the feature or not
+# Cached when the feature has no enabled accessibility, i.e. open for everyone
+NO_ACCESSIBILITY = "no_accessibility"
+
+
+def build_accessibility_grant(feature):
     """
-    if not employee:
-        return False
+    Build the precomputed grant of a feature from the database.
 
+    Returns NO_ACCESSIBILITY when the feature is not restricted, else an
+    (exclude_all, bitmap) pair where bit n of bitmap is set when the employee
+    with id n is granted the feature.
+    """
     accessibility = DefaultAccessibility.objects.filter(
         feature=feature, is_enabled=True
     ).first()
+    if not accessibility:
+        return NO_ACCESSIBILITY
+    bitmap = 0
+    for employee_id in accessibility.employees.values_list("id", flat=True):
+        bitmap |= 1 << employee_id
+    return (accessibility.exclude_all, bitmap)
 
-    if accessibility and accessibility.exclude_all:
-        return False
-    if not feature or not accessibility:
-        return True
 
-    data: dict = cache.get(cache_key, default={})
-    if data and data.get(feature) is not None:
-        return data.get(feature)
+def update_accessibility_grant(feature):
+    """
+    Rebuild and store the grant of the feature
+    """
+    grant = build_accessibility_grant(feature)
+    cache.set(ACCESSIBILITY_GRANT_CACHE_KEY.format(feature), grant, None)
+    cache.set(ACCESSIBILITY_VERSION_CACHE_KEY, time.time_ns(), None)
+    return grant
+
 
-    employees = accessibility.employees.all()
-    accessible = employee in employees
-    return accessible
+def get_accessibility_grant(feature):
+    """
+    Return the precomputed grant of the feature, building it on first use
+    """
+    grant = cache.get(ACCESSIBILITY_GRANT_CACHE_KEY.format(feature))
+    if grant is None:
+        grant = update_accessibility_grant(feature)
+    return grant
 
 
-def update_employee_accessibility_cache(cache_key, employee):
+def get_accessibility_version():
     """
-    Cache for get all the queryset
+    Changes whenever any feature grant is rebuilt
+    """
+    return cache.get(ACCESSIBILITY_VERSION_CACHE_KEY)
+
+
+def check_is_accessible(feature, employee):
+    """
+    Method to check the employee is accessible for the feature or not
     """
-    feature_accessible = {}
-    for accessibility, _display in ACCESSBILITY_FEATURE:
-        feature_accessible[accessibility] = check_is_accessible(
-            accessibility, cache_key, employee
-        )
-    cache.set(cache_key, feature_accessible)
+    if not employee:
+        return False
+    if not feature:
+        return True
+
+    grant = get_accessibility_grant(feature)
+    if grant == NO_ACCESSIBILITY:
+        return True
+    exclude_all, bitmap = grant
+    if exclude_all:
+        return False
+    return bool(bitmap >> employee.id & 1)
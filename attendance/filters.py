@@ -5,7 +5,6 @@ This page is used to register filter for attendance models
 
 """
 
-import datetime
 import uuid
 
 import django_filters
@@ -13,6 +12,7 @@ from django import forms
 from django.forms import DateTimeInput
 from django.utils.translation import gettext_lazy as _
 
+from attendance.methods.presence import online_employee_ids
 from attendance.models import (
     Attendance,
     AttendanceActivity,
@@ -652,14 +652,7 @@ class AttendanceRequestReGroup:
 
 
 def get_working_today(queryset, _name, value):
-    today = datetime.datetime.now().date()
-    yesterday = today - datetime.timedelta(days=1)
-
-    working_employees = Attendance.objects.filter(
-        attendance_date__gte=yesterday,
-        attendance_date__lte=today,
-        attendance_clock_out_date__isnull=True,
-    ).values_list("employee_id", flat=True)
+    working_employees = online_employee_ids()
 
     if value:
         queryset = queryset.filter(id__in=working_employees)
@@ -0,0 +1,253 @@
+"""
+presence.py
+
+Registry of the employees at work, answering "is the employee online", "who
+has not checked in" and "how long is the employee at work today" without
+scanning the attendances on every request and mobile poll.
+
+The registry lives in the PRESENCE_CACHE Django cache and is read from the
+attendances when missing:
+
+- the presence snapshot holds the ids of the employees with an open
+  attendance of yesterday or today and of those checked in today
+- a presence entry per employee holds their attendance of the day, the
+  seconds of the closed activities and the start of the open ones, so the
+  seconds at work are computed from the clock without a query
+
+Check-ins and check-outs of every path (web, API, biometric devices) save
+the attendance and its activities, the receivers of attendance.signals then
+call presence_changed(), which moves the snapshot and the entries of the
+employees to a new version. A value computed while an employee clocked in
+or out is stored under the previous version and never read. Changes made
+without saving the models (queryset update()) show after at most
+PRESENCE_TIMEOUT seconds.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from django.core.cache import caches
+
+from attendance.methods.utils import format_time, strtime_seconds
+from attendance.models import Attendance, AttendanceActivity
+from horilla import horilla_middlewares
+from horilla.horilla_settings import PRESENCE_CACHE, PRESENCE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "horilla_presence"
+
+
+def get_cache():
+    return caches[PRESENCE_CACHE]
+
+
+def version_key(employee_id=None):
+    if employee_id is None:
+        return f"{KEY_PREFIX}:version"
+    return f"{KEY_PREFIX}:version:{employee_id}"
+
+
+def current_versions(*keys) -> dict:
+    """
+    Versions stored under the keys, the missing ones are created
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, None)
+            versions[key] = cache.get(key, 1)
+    return versions
+
+
+def bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted, any new value differs from the version of the stored values
+        cache.set(key, int(datetime.now().timestamp() * 1000), None)
+
+
+def presence_changed(*employee_ids):
+    """
+    Move the snapshot and the entries of the employees to a new version,
+    called when their attendances or activities change
+    """
+    try:
+        bump(version_key())
+        for employee_id in set(employee_ids):
+            bump(version_key(employee_id))
+    except Exception:
+        logger.warning("Could not update the presence registry", exc_info=True)
+
+
+def read_snapshot(today) -> dict:
+    yesterday = today - timedelta(days=1)
+    online, checked_in = set(), set()
+    for employee_id, attendance_date, clock_out, clock_out_date in (
+        Attendance.objects.entire()
+        .filter(attendance_date__gte=yesterday, attendance_date__lte=today)
+        .values_list(
+            "employee_id",
+            "attendance_date",
+            "attendance_clock_out",
+            "attendance_clock_out_date",
+        )
+    ):
+        if clock_out_date is None:
+            online.add(employee_id)
+        if attendance_date == today and clock_out is None:
+            checked_in.add(employee_id)
+    return {"online": frozenset(online), "checked_in": frozenset(checked_in)}
+
+
+def snapshot() -> dict:
+    """
+    Ids of the employees online (an attendance of yesterday or today not
+    clocked out) and of those checked in today, read once per request
+    """
+    request = getattr(horilla_middlewares._thread_locals, "request", None)
+    today = date.today()
+    cached = getattr(request, "presence_snapshot", None)
+    if cached is not None and cached[0] == today:
+        return cached[1]
+
+    cache = get_cache()
+    try:
+        version = current_versions(version_key())[version_key()]
+        key = f"{KEY_PREFIX}:snapshot:{today}:{version}"
+        value = cache.get(key)
+    except Exception:
+        logger.warning("Could not read the presence registry", exc_info=True)
+        key = value = None
+    if value is None:
+        value = read_snapshot(today)
+        if key:
+            cache.set(key, value, PRESENCE_TIMEOUT)
+    if request is not None:
+        request.presence_snapshot = (today, value)
+    return value
+
+
+def online_employee_ids() -> frozenset:
+    return snapshot()["online"]
+
+
+def checked_in_employee_ids() -> frozenset:
+    return snapshot()["checked_in"]
+
+
+def is_online(employee_id) -> bool:
+    return employee_id in online_employee_ids()
+
+
+def online_count() -> int:
+    return len(online_employee_ids())
+
+
+def not_in_yet(queryset):
+    """
+    Employees of the queryset not checked in today, or checked out
+    """
+    return queryset.exclude(id__in=checked_in_employee_ids())
+
+
+def activity_start(activity) -> datetime:
+    return datetime.combine(activity.clock_in_date, activity.clock_in)
+
+
+def read_entry(employee_id, today) -> dict:
+    attendances = list(
+        Attendance.objects.entire()
+        .filter(
+            employee_id=employee_id,
+            attendance_date__in=[today - timedelta(days=1), today],
+        )
+        .order_by("attendance_date")
+        .only("id", "attendance_date", "minimum_hour")
+    )
+    attendance = attendances[-1] if attendances else None
+    entry = {
+        "has_attendance": attendance is not None,
+        "minimum_hour_seconds": strtime_seconds(
+            getattr(attendance, "minimum_hour", "0")
+        ),
+        "closed_seconds": 0,
+        "open_since": [],
+    }
+    if attendance:
+        for activity in AttendanceActivity.objects.entire().filter(
+            attendance_date=attendance.attendance_date, employee_id=employee_id
+        ):
+            if activity.clock_out is None:
+                entry["open_since"].append(activity_start(activity))
+            else:
+                closed_at = datetime.combine(
+                    activity.clock_out_date, activity.clock_out
+                )
+                entry["closed_seconds"] += (
+                    closed_at - activity_start(activity)
+                ).total_seconds()
+
+    activities = AttendanceActivity.objects.entire().filter(employee_id=employee_id)
+    last_activity = activities.order_by("-id").only("clock_out_date").first()
+    first_today = (
+        activities.filter(clock_in_date=today)
+        .order_by("in_datetime")
+        .only("clock_in")
+        .first()
+    )
+    entry["last_activity_open"] = (
+        None if last_activity is None else last_activity.clock_out_date is None
+    )
+    entry["first_clock_in_today"] = first_today and first_today.clock_in
+    return entry
+
+
+def presence_entry(employee_id) -> dict:
+    """
+    Attendance of the day of the employee: seconds of the closed activities,
+    start of the open ones, minimum hour, whether the last activity is open
+    and the first clock in of today
+    """
+    cache = get_cache()
+    today = date.today()
+    try:
+        key = version_key(employee_id)
+        version = current_versions(key)[key]
+        entry_key = f"{KEY_PREFIX}:entry:{today}:{employee_id}:{version}"
+        entry = cache.get(entry_key)
+    except Exception:
+        logger.warning("Could not read the presence registry", exc_info=True)
+        entry_key = entry = None
+    if entry is None:
+        entry = read_entry(employee_id, today)
+        if entry_key:
+            cache.set(entry_key, entry, PRESENCE_TIMEOUT)
+    return entry
+
+
+def at_work_seconds(entry) -> float:
+    # seconds resolution, as the clock in and out times
+    now = datetime.now().replace(microsecond=0)
+    return entry["closed_seconds"] + sum(
+        (now - since).total_seconds() for since in entry["open_since"]
+    )
+
+
+def forecasted_at_work(employee_id) -> dict:
+    """
+    Seconds at work so far and pending to the minimum hour of the day
+    """
+    entry = presence_entry(employee_id)
+    at_work = at_work_seconds(entry)
+    pending = max(0, entry["minimum_hour_seconds"] - at_work)
+    return {
+        "forecasted_at_work": format_time(at_work),
+        "forecasted_pending_hours": format_time(pending),
+        "forecasted_at_work_seconds": at_work,
+        "forecasted_pending_hours_seconds": pending,
+        "has_attendance": entry["has_attendance"],
+    }
@@ -19,6 +19,7 @@ from base.methods import get_pagination
 from base.models import WEEK_DAYS, CompanyLeaves, Holidays
 from employee.models import Employee
 from horilla.horilla_settings import HORILLA_DATE_FORMATS, HORILLA_TIME_FORMATS
+from horilla.pagination import CountFreePaginator
 
 MONTH_MAPPING = {
     "january": 1,
@@ -428,11 +429,13 @@ def attendance_day_checking(attendance_date, minimum_hour):
     return minimum_hour
 
 
-def paginator_qry(qryset, page_number):
+def paginator_qry(qryset, page_number, count_free=False):
     """
-    This method is used to paginate queryset
+    This method is used to paginate queryset, without counting the records
+    when count_free (see horilla.pagination)
     """
-    paginator = Paginator(qryset, get_pagination())
+    paginator_class = CountFreePaginator if count_free else Paginator
+    paginator = paginator_class(qryset, get_pagination())
     qryset = paginator.get_page(page_number)
     return qryset
 
@@ -3,12 +3,18 @@
 from datetime import datetime, timedelta
 
 from django.apps import apps
-from django.db.models.signals import post_migrate, post_save, pre_delete
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
+from attendance.methods.presence import presence_changed
 from attendance.methods.utils import strtime_seconds
-from attendance.models import Attendance, AttendanceGeneralSetting, WorkRecords
+from attendance.models import (
+    Attendance,
+    AttendanceActivity,
+    AttendanceGeneralSetting,
+    WorkRecords,
+)
 from base.models import Company, PenaltyAccounts
 from employee.models import Employee
 from horilla.methods import get_horilla_model_class
@@ -82,6 +88,17 @@ def handle_attendance_deletion(sender, instance, **kwargs):
             workrecord.delete()
 
 
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=AttendanceActivity)
+@receiver(post_delete, sender=AttendanceActivity)
+def attendance_presence_changed(sender, instance, **kwargs):
+    """
+    Keep the presence registry in line with the clock ins and outs
+    """
+    presence_changed(instance.employee_id_id)
+
+
 # @receiver(post_migrate)
 def add_missing_attendance_to_workrecord(sender, **kwargs):
     if sender.label not in ["attendance", "leave"]:
@@ -9,6 +9,7 @@ from datetime import datetime
 
 import pandas as pd
 
+from attendance.methods.presence import presence_changed
 from attendance.models import Attendance
 from base.models import EmployeeShift, WorkType
 from employee.models import Employee
@@ -207,4 +208,5 @@ def process_attendance_data(attendance_dicts):
             error_list.append(attendance_data)
     if attendance_list:
         Attendance.objects.bulk_create(attendance_list)
+        presence_changed(*(attendance.employee_id_id for attendance in attendance_list))
     return error_list
@@ -243,10 +243,10 @@ def attendance_activity_search(request):
         template = "attendance/attendance_activity/group_by.html"
     else:
         attendance_activities = paginator_qry(
-            attendance_activities, request.GET.get("page")
+            attendance_activities, request.GET.get("page"), count_free=True
         )
         activity_ids = json.dumps(
-            [instance.id for instance in paginator_qry(attendance_activities, None)]
+            [instance.id for instance in attendance_activities.object_list]
         )
     data_dict = parse_qs(previous_data)
     get_key_instances(AttendanceActivity, data_dict)
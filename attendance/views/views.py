@@ -794,7 +794,10 @@ def attendance_activity_view(request):
     attendance_activities = attendance_activities.distinct()
     attendance_activities = attendance_activities.order_by("-pk")
     activity_ids = json.dumps(
-        [instance.id for instance in paginator_qry(attendance_activities, None)]
+        [
+            instance.id
+            for instance in paginator_qry(attendance_activities, None, count_free=True)
+        ]
     )
     if attendance_activities.exists():
         template = "attendance/attendance_activity/attendance_activity_view.html"
@@ -804,7 +807,9 @@ def attendance_activity_view(request):
         request,
         template,
         {
-            "data": paginator_qry(attendance_activities, request.GET.get("page")),
+            "data": paginator_qry(
+                attendance_activities, request.GET.get("page"), count_free=True
+            ),
             "pd": previous_data,
             "f": filter_obj,
             "gp_fields": AttendanceActivityReGroup.fields,
@@ -15,8 +15,13 @@ class BaseConfig(AppConfig):
 
     def ready(self) -> None:
         from base import signals
+        from horilla.horilla_settings import PROFILER_BACKGROUND
 
         super().ready()
+        if PROFILER_BACKGROUND:
+            from horilla.profiler import profile_scheduler_jobs
+
+            profile_scheduler_jobs()
         try:
             from base.models import EmployeeShiftDay
 
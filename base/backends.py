@@ -17,6 +17,46 @@ from horilla.horilla_middlewares import _thread_locals
 
 logger = logging.getLogger(__name__)
 
+EMAIL_CONFIGURATIONS_CACHE_KEY = "horilla_email_configurations"
+
+
+def get_email_configurations():
+    """
+    Return every mail server configuration, cached until one of them is
+    saved or deleted.
+
+    Returns:
+        dict: {"companies": {company_id: configuration}, "primary": configuration}
+    """
+    configurations = cache.get(EMAIL_CONFIGURATIONS_CACHE_KEY)
+    if configurations is None:
+        companies = {}
+        primary = None
+        for configuration in DynamicEmailConfiguration.objects.order_by("id"):
+            companies.setdefault(configuration.company_id_id, configuration)
+            if configuration.is_primary and primary is None:
+                primary = configuration
+        configurations = {"companies": companies, "primary": primary}
+        cache.set(EMAIL_CONFIGURATIONS_CACHE_KEY, configurations, None)
+    return configurations
+
+
+def get_email_configuration(company=None):
+    """
+    Resolve the mail server configuration of the company, falling back to the
+    primary mail server
+    """
+    configurations = get_email_configurations()
+    company_id = getattr(company, "pk", company)
+    return configurations["companies"].get(company_id) or configurations["primary"]
+
+
+def clear_email_configuration_cache(*args, **kwargs):
+    """
+    Signal receiver to drop the cached mail server configurations
+    """
+    cache.delete(EMAIL_CONFIGURATIONS_CACHE_KEY)
+
 
 class DefaultHorillaMailBackend(EmailBackend):
     def __init__(
@@ -65,13 +105,7 @@ class DefaultHorillaMailBackend(EmailBackend):
         company = None
         if request and not request.user.is_anonymous:
             company = request.user.employee_get.get_company()
-        configuration = DynamicEmailConfiguration.objects.filter(
-            company_id=company
-        ).first()
-        if configuration is None:
-            configuration = DynamicEmailConfiguration.objects.filter(
-                is_primary=True
-            ).first()
+        configuration = get_email_configuration(company)
         if configuration:
             display_email_name = (
                 f"{configuration.display_name} <{configuration.from_email}>"
@@ -3,9 +3,15 @@ horilla_company_manager.py
 """
 
 import logging
+import threading
+from contextvars import ContextVar
+from functools import lru_cache
 from typing import Coroutine, Sequence
 
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.db.models import Q
 from django.db.models.query import QuerySet
 
 from horilla.horilla_middlewares import _thread_locals
@@ -14,6 +20,48 @@ from horilla.signals import post_bulk_update, pre_bulk_update
 logger = logging.getLogger(__name__)
 django_filter_update = QuerySet.update
 
+# Company selected for the current request, set by base.middleware.CompanyMiddleware
+selected_company_context = ContextVar("horilla_selected_company", default=None)
+
+# Models whose rows always belong to a company (rows without company are hidden)
+COMPANY_MODELS = {
+    "base": ["shiftrequest", "worktyperequest"],
+    "employee": [
+        "employee",
+        "disciplinaryaction",
+        "employeebankdetails",
+        "employeeworkinformation",
+    ],
+    "horilla_documents": ["documentrequest"],
+    "recruitment": ["recruitment", "candidate"],
+    "leave": [
+        "leaverequest",
+        "restrictleave",
+        "availableleave",
+        "leaveallocationrequest",
+        "compensatoryleaverequest",
+    ],
+    "asset": ["assetassignment", "assetrequest"],
+    "attendance": [
+        "attendance",
+        "attendanceactivity",
+        "attendanceovertime",
+        "workrecords",
+    ],
+    "payroll": [
+        "contract",
+        "loanaccount",
+        "payslip",
+        "reimbursement",
+    ],
+    "helpdesk": ["ticket"],
+    "offboarding": ["offboarding"],
+    "pms": ["employeeobjective"],
+}
+
+_company_filter_templates = None
+_company_filter_lock = threading.Lock()
+
 
 def update(self, *args, **kwargs):
     # pre_update signal
@@ -30,6 +78,115 @@ def update(self, *args, **kwargs):
 setattr(QuerySet, "update", update)
 
 
+def _lookup_paths(q_object):
+    """
+    Yield every lookup path (e.g. "employee_id__employee_work_info__company_id")
+    used by a Q object, including the nested ones.
+    """
+    for child in q_object.children:
+        if isinstance(child, Q):
+            yield from _lookup_paths(child)
+        else:
+            yield child[0]
+
+
+def _is_multi_valued_path(model, path):
+    """
+    Return True if following the lookup path from the model crosses a
+    many-to-many or reverse foreign key relation, i.e. a join that can
+    return the same row more than once.
+    """
+    opts = model._meta
+    for part in path.split("__"):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            # Remaining parts are lookups/transforms such as "isnull"
+            break
+        if not field.is_relation:
+            break
+        if field.many_to_many or field.one_to_many:
+            return True
+        opts = field.related_model._meta
+    return False
+
+
+@lru_cache(maxsize=None)
+def _requires_distinct(model, paths):
+    return any(_is_multi_valued_path(model, path) for path in paths)
+
+
+def requires_distinct(model, q_object):
+    """
+    Distinct planner for the company filter.
+
+    The decision only depends on the model and the lookup paths of the filter
+    (not on the filtered values), so it is computed once per model and filter
+    shape and served from memory afterwards, without any database round trip.
+    """
+    return _requires_distinct(model, tuple(sorted(set(_lookup_paths(q_object)))))
+
+
+def compile_company_filters():
+    """
+    Build the company filter template of every Horilla model once.
+
+    Each template is a (lookup, strict) pair: the lookup path to the company
+    and whether rows without a company should be hidden (strict) or shown.
+    """
+    from horilla.horilla_settings import APPS
+
+    company_models = set()
+    for app_label, model_names in COMPANY_MODELS.items():
+        if apps.is_installed(app_label):
+            for model_name in model_names:
+                try:
+                    company_models.add(apps.get_model(app_label, model_name))
+                except LookupError:
+                    pass
+
+    templates = {}
+    for model in apps.get_models():
+        if model._meta.app_label not in APPS:
+            continue
+        manager = getattr(model, "objects", None)
+        related_company_field = getattr(manager, "related_company_field", None)
+        if getattr(model, "company_id", None):
+            lookup = "company_id"
+        elif isinstance(manager, HorillaCompanyManager) and related_company_field:
+            lookup = related_company_field
+        else:
+            continue
+        strict = model in company_models
+        templates[model] = (lookup, strict)
+        # warm the distinct planner for this filter shape
+        requires_distinct(model, _build_company_filter(lookup, strict, None))
+    return templates
+
+
+def _build_company_filter(lookup, strict, company_id):
+    company_filter = Q(**{lookup: company_id})
+    if not strict:
+        company_filter |= Q(**{f"{lookup}__isnull": True})
+    return company_filter
+
+
+def get_company_filter(model, company_id):
+    """
+    Return the company filter Q object of the model for the given company,
+    or None if the model is not company scoped.
+    """
+    global _company_filter_templates
+    if _company_filter_templates is None:
+        with _company_filter_lock:
+            if _company_filter_templates is None:
+                _company_filter_templates = compile_company_filters()
+    template = _company_filter_templates.get(model)
+    if template is None:
+        return None
+    return _build_company_filter(*template, company_id)
+
+
 class HorillaCompanyManager(models.Manager):
     """
     HorillaCompanyManager
@@ -49,24 +206,25 @@ class HorillaCompanyManager(models.Manager):
         """
 
         queryset = super().get_queryset()
-        request = getattr(_thread_locals, "request", None)
-        selected_company = None
-        if request is not None:
-            selected_company = request.session.get("selected_company")
+        selected_company = selected_company_context.get()
         try:
-            queryset = (
-                queryset.filter(self.model.company_filter)
-                if selected_company != "all" and selected_company
-                else queryset
-            )
+            if selected_company != "all" and selected_company:
+                company_filter = get_company_filter(self.model, selected_company)
+                if company_filter is not None:
+                    queryset = self._apply_distinct(
+                        queryset.filter(company_filter), company_filter
+                    )
         except Exception as e:
             logger.error(e)
-        try:
-            has_duplicates = queryset.count() != queryset.distinct().count()
-            if has_duplicates:
-                queryset = queryset.distinct()
-        except:
-            pass
+        return queryset
+
+    def _apply_distinct(self, queryset, company_filter):
+        """
+        Apply DISTINCT only when the company filter joins a multi-valued
+        relation (m2m / reverse foreign key)
+        """
+        if requires_distinct(self.model, company_filter):
+            queryset = queryset.distinct()
         return queryset
 
     def all(self):
@@ -76,25 +234,24 @@ class HorillaCompanyManager(models.Manager):
         queryset = []
         try:
             queryset = self.get_queryset()
-            if queryset.exists():
-                try:
-                    model_name = queryset.model._meta.model_name
-                    if model_name == "employee":
-                        request = getattr(_thread_locals, "request", None)
-                        if not getattr(request, "is_filtering", None):
-                            queryset = queryset.filter(is_active=True)
-                    else:
-                        for field in queryset.model._meta.fields:
-                            if isinstance(field, models.ForeignKey):
-                                if field.name in self.check_fields:
-                                    related_model_is_active_filter = {
-                                        f"{field.name}__is_active": True
-                                    }
-                                    queryset = queryset.filter(
-                                        **related_model_is_active_filter
-                                    )
-                except:
-                    pass
+            try:
+                model_name = queryset.model._meta.model_name
+                if model_name == "employee":
+                    request = getattr(_thread_locals, "request", None)
+                    if not getattr(request, "is_filtering", None):
+                        queryset = queryset.filter(is_active=True)
+                else:
+                    for field in queryset.model._meta.fields:
+                        if isinstance(field, models.ForeignKey):
+                            if field.name in self.check_fields:
+                                related_model_is_active_filter = {
+                                    f"{field.name}__is_active": True
+                                }
+                                queryset = queryset.filter(
+                                    **related_model_is_active_filter
+                                )
+            except:
+                pass
         except:
             pass
         return queryset
@@ -0,0 +1,321 @@
+"""
+Horilla management command to benchmark the hot endpoints.
+
+Each scenario is rendered --repeat times with the test client, timing the
+response and counting its queries. The result is written as a JSON report
+that can be diffed against the report of another release with --baseline.
+
+Usage:
+    python manage.py generate_tenant_data --employees 10000
+    python manage.py benchmark_views --output benchmark.json
+    python manage.py benchmark_views --baseline previous.json --only employee-view
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import date, timedelta
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from horilla.query_inspector import QueryRecorder
+
+# Rows counted in the report so results of different tenants are comparable
+COUNTED_MODELS = [
+    ("employee", "employee"),
+    ("attendance", "attendance"),
+    ("attendance", "attendanceactivity"),
+    ("leave", "leaverequest"),
+    ("payroll", "contract"),
+    ("payroll", "payslip"),
+    ("recruitment", "candidateapplication"),
+]
+
+
+class Rollback(Exception):
+    """
+    Raised to roll back the writes of a benchmarked POST request
+    """
+
+
+def attendance_export_params(command):
+    from attendance.forms import AttendanceExportForm
+
+    return {
+        "selected_fields": AttendanceExportForm().fields["selected_fields"].initial,
+    }
+
+
+def generate_payslip_data(command):
+    Contract = apps.get_model("payroll", "contract")
+    contracts = Contract.objects.filter(
+        contract_status="active", employee_id__is_active=True
+    )
+    if command.company_id not in (None, "all"):
+        contracts = contracts.filter(
+            employee_id__employee_work_info__company_id=command.company_id
+        )
+    employee_ids = list(
+        contracts.order_by("employee_id").values_list("employee_id", flat=True)[
+            : command.payslip_batch
+        ]
+    )
+    end_date = date.today().replace(day=1) - timedelta(days=1)
+    return {
+        "employee_id": employee_ids,
+        "start_date": end_date.replace(day=1).isoformat(),
+        "end_date": end_date.isoformat(),
+        "group_name": "Benchmark batch",
+    }
+
+
+SCENARIOS = [
+    {"name": "employee-view", "url": "employee-view"},
+    {"name": "employee-view-card", "url": "employee-view-card"},
+    {"name": "employee-filter-view", "url": "employee-filter-view"},
+    {"name": "attendance-view", "url": "attendance-view"},
+    {"name": "leave-dashboard", "url": "leave-dashboard"},
+    {"name": "leave-request-view", "url": "request-view"},
+    {"name": "payslip-view", "url": "view-payslip"},
+    {
+        "name": "payslip-batch-generation",
+        "url": "generate-payslip",
+        "method": "post",
+        "data": generate_payslip_data,
+    },
+    {"name": "employee-pivot", "url": "employee-pivot"},
+    {"name": "attendance-pivot", "url": "attendance-pivot"},
+    {"name": "leave-pivot", "url": "leave-pivot"},
+    {"name": "payroll-pivot", "url": "payroll-pivot"},
+    {"name": "employee-export", "url": "employee-export"},
+    {
+        "name": "attendance-export",
+        "url": "attendance-info-export",
+        "data": attendance_export_params,
+    },
+]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """
+    Horilla management command to benchmark the hot endpoints.
+    """
+
+    help = "Times and counts the queries of the hot endpoints into a JSON report"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username", type=str, help="Username used to render the views"
+        )
+        parser.add_argument(
+            "--company",
+            type=str,
+            default=None,
+            help="Selected company id or all (defaults to the user's company)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of timed runs of each scenario, after one warm up run",
+        )
+        parser.add_argument(
+            "--payslip-batch",
+            type=int,
+            default=50,
+            help="Employees in the benchmarked payslip batch",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="*",
+            default=None,
+            help="Names of the scenarios to run",
+        )
+        parser.add_argument(
+            "--output", type=str, default=None, help="Path of the JSON report"
+        )
+        parser.add_argument(
+            "--baseline",
+            type=str,
+            default=None,
+            help="JSON report of a previous run to compare with",
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(username=options["username"]).first()
+            if options["username"]
+            else User.objects.filter(is_superuser=True).first()
+        )
+        if user is None:
+            raise CommandError("No user found to render the views with.")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        self.payslip_batch = options["payslip_batch"]
+        self.company_id = options["company"] or getattr(
+            getattr(getattr(user, "employee_get", None), "employee_work_info", None),
+            "company_id_id",
+            None,
+        )
+
+        # A failing view is reported with its 500 status instead of aborting
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        if options["company"]:
+            session = client.session
+            session["selected_company"] = options["company"]
+            session.save()
+
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["only"] or scenario["name"] in options["only"]
+        ]
+        results = {}
+        for scenario in scenarios:
+            result = self.run_scenario(client, scenario, options["repeat"])
+            if result is not None:
+                results[scenario["name"]] = result
+
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "git_revision": git_revision(),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+            },
+            "user": user.username,
+            "company": options["company"],
+            "repeat": options["repeat"],
+            "row_counts": self.row_counts(),
+            "results": results,
+        }
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["results"]
+        self.print_results(results, baseline)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2, sort_keys=True)
+            self.stdout.write(
+                self.style.SUCCESS(f"Report written to {options['output']}")
+            )
+
+    def run_scenario(self, client, scenario, repeat):
+        """
+        Run one warm up and `repeat` timed requests of the scenario
+        """
+        try:
+            url = reverse(scenario["url"])
+        except NoReverseMatch:
+            self.stdout.write(
+                self.style.WARNING(f"Skipping {scenario['name']}, unknown url")
+            )
+            return None
+        method = scenario.get("method", "get")
+        data = scenario.get("data")
+        data = data(self) if data else {}
+
+        timings = []
+        recorder = None
+        for _ in range(repeat + 1):
+            recorder = QueryRecorder()
+            start = time.perf_counter()
+            with recorder.record():
+                response = self.request(client, method, url, data)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings = timings[1:]
+
+        if response.status_code >= 400:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{scenario['name']} responded with {response.status_code}"
+                )
+            )
+        duplicates = recorder.duplicates()
+        return {
+            "url": url,
+            "method": method.upper(),
+            "status": response.status_code,
+            "median_ms": round(statistics.median(timings), 1),
+            "min_ms": round(min(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "queries": recorder.count,
+            "db_time_ms": round(recorder.total_time * 1000, 1),
+            "duplicated_queries": sum(item["count"] for item in duplicates),
+            "top_duplicates": [
+                {"count": item["count"], "fingerprint": item["fingerprint"][:300]}
+                for item in duplicates[:5]
+            ],
+            "response_bytes": (
+                len(response.content) if not response.streaming else None
+            ),
+        }
+
+    def request(self, client, method, url, data):
+        """
+        Send the request, the writes of POST requests are rolled back
+        """
+        if method == "get":
+            return client.get(url, data)
+        response = None
+        try:
+            with transaction.atomic():
+                response = getattr(client, method)(url, data)
+                raise Rollback
+        except Rollback:
+            pass
+        return response
+
+    def row_counts(self):
+        counts = {}
+        for app_label, model_name in COUNTED_MODELS:
+            if apps.is_installed(app_label):
+                model = apps.get_model(app_label, model_name)
+                counts[model._meta.label] = model._base_manager.count()
+        return counts
+
+    def print_results(self, results, baseline=None):
+        header = f"{'scenario':<28}{'status':>8}{'median ms':>12}{'queries':>10}"
+        if baseline is not None:
+            header += f"{'Δ ms':>10}{'Δ queries':>12}"
+        self.stdout.write(header)
+        for name, result in results.items():
+            row = (
+                f"{name:<28}{result['status']:>8}"
+                f"{result['median_ms']:>12}{result['queries']:>10}"
+            )
+            previous = (baseline or {}).get(name)
+            if previous:
+                row += (
+                    f"{result['median_ms'] - previous['median_ms']:>+10.1f}"
+                    f"{result['queries'] - previous['queries']:>+12}"
+                )
+            self.stdout.write(row)
@@ -0,0 +1,124 @@
+"""
+Horilla management command to benchmark the number of queries issued by the
+main list views when a company is selected.
+
+Usage:
+    python manage.py company_queryset_benchmark --username admin --company 1
+    python manage.py company_queryset_benchmark --username admin --compare
+"""
+
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+
+from base.horilla_company_manager import HorillaCompanyManager
+
+LIST_VIEWS = [
+    "employee-view",
+    "employee-view-card",
+    "attendance-view",
+    "request-view",
+    "view-payslip",
+    "asset-category-view",
+]
+
+
+def legacy_apply_distinct(self, queryset, company_filter):
+    """
+    The count based de-duplication used before the distinct planner
+    """
+    if queryset.count() != queryset.distinct().count():
+        queryset = queryset.distinct()
+    return queryset
+
+
+class Command(BaseCommand):
+    """
+    Horilla management command to benchmark company scoped list views.
+    """
+
+    help = "Prints the query count and time of the main list views"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username", type=str, help="Username used to render the views"
+        )
+        parser.add_argument(
+            "--company",
+            type=str,
+            default=None,
+            help="Selected company id (defaults to the user's company)",
+        )
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Also run the views with the count based de-duplication",
+        )
+        parser.add_argument(
+            "--views",
+            nargs="*",
+            default=LIST_VIEWS,
+            help="URL names of the views to benchmark",
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(username=options["username"]).first()
+            if options["username"]
+            else User.objects.filter(is_superuser=True).first()
+        )
+        if user is None:
+            raise CommandError("No user found to render the views with.")
+
+        client = Client()
+        client.force_login(user)
+        if options["company"]:
+            session = client.session
+            session["selected_company"] = options["company"]
+            session.save()
+
+        results = {"planner": self.run_views(client, options["views"])}
+        if options["compare"]:
+            with mock.patch.object(
+                HorillaCompanyManager, "_apply_distinct", legacy_apply_distinct
+            ):
+                results["legacy"] = self.run_views(client, options["views"])
+
+        self.stdout.write(
+            f"{'view':<30}"
+            + "".join(f"{mode + ' queries':>20}{mode + ' ms':>14}" for mode in results)
+        )
+        for view in options["views"]:
+            row = f"{view:<30}"
+            for mode in results:
+                queries, elapsed = results[mode].get(view, ("-", "-"))
+                row += f"{queries:>20}{elapsed:>14}"
+            self.stdout.write(row)
+
+    def run_views(self, client, views):
+        """
+        Render each view once and return {view: (query count, elapsed ms)}
+        """
+        results = {}
+        for view in views:
+            try:
+                url = reverse(view)
+            except NoReverseMatch:
+                self.stdout.write(self.style.WARNING(f"Skipping unknown view {view}"))
+                continue
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = round((time.perf_counter() - start) * 1000, 1)
+            if response.status_code != 200:
+                self.stdout.write(
+                    self.style.WARNING(f"{view} responded with {response.status_code}")
+                )
+            results[view] = (len(context.captured_queries), elapsed)
+        return results
@@ -0,0 +1,538 @@
+"""
+Horilla management command to generate a synthetic large tenant for
+benchmarking.
+
+Usage:
+    python manage.py generate_tenant_data --companies 2 --employees 20000
+    python manage.py generate_tenant_data --employees 100000 --attendance-days 20
+
+Every row is written with bulk_create, so model save() overrides and
+signals are skipped and computed fields are filled in directly.
+"""
+
+import random
+import time
+from datetime import date, datetime
+from datetime import time as dt_time
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from base.models import (
+    Company,
+    Department,
+    EmployeeShift,
+    EmployeeShiftDay,
+    EmployeeType,
+    JobPosition,
+    JobRole,
+    WorkType,
+)
+from employee.methods.hierarchy import sync_hierarchy
+from employee.models import Employee, EmployeeWorkInformation
+
+FIRST_NAMES = (
+    "Aarav Amelia Carlos Chen Fatima Hana Ibrahim Isla Jonas Kavya "
+    "Liam Lucia Mateo Mei Noah Olivia Omar Priya Sofia Yusuf"
+).split()
+LAST_NAMES = (
+    "Ahmed Ali Costa Garcia Ito Khan Kim Martin Meyer Nair "
+    "Novak Okafor Patel Rossi Silva Smith Tanaka Wang Weber Zhang"
+).split()
+DEPARTMENTS = [
+    "Engineering",
+    "Sales",
+    "Marketing",
+    "Finance",
+    "Human Resources",
+    "Operations",
+    "Support",
+    "Legal",
+    "Procurement",
+    "Research",
+]
+POSITIONS = ["Associate", "Senior", "Lead"]
+WEEK_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+
+
+class Command(BaseCommand):
+    """
+    Horilla management command to generate a synthetic large tenant.
+    """
+
+    help = "Generates companies, employees and their HR history with bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1)
+        parser.add_argument(
+            "--employees", type=int, default=1000, help="Employees per company"
+        )
+        parser.add_argument(
+            "--span",
+            type=int,
+            default=7,
+            help="Direct reports per manager in the reporting hierarchy",
+        )
+        parser.add_argument(
+            "--attendance-days",
+            type=int,
+            default=30,
+            help="Working days of attendance and activities per employee",
+        )
+        parser.add_argument(
+            "--leave-requests", type=int, default=3, help="Leave requests per employee"
+        )
+        parser.add_argument(
+            "--payslip-months", type=int, default=3, help="Payslips per employee"
+        )
+        parser.add_argument(
+            "--candidates", type=int, default=500, help="Candidates per company"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            type=str,
+            default="bench",
+            help="Prefix of the generated names, usernames and badge ids",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.prefix = options["prefix"]
+        self.options = options
+        self.today = date.today()
+        self.shift_days = {day.day: day for day in EmployeeShiftDay.objects.all()}
+
+        start = time.perf_counter()
+        for index in range(options["companies"]):
+            self.generate_company(index)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Tenant generated in {time.perf_counter() - start:.1f} seconds"
+            )
+        )
+
+    def step(self, label, method, *args):
+        """
+        Run one generation step in its own transaction and report it
+        """
+        start = time.perf_counter()
+        with transaction.atomic():
+            count = method(*args)
+        self.stdout.write(
+            f"  {label:<28}{count:>10} rows  {time.perf_counter() - start:>8.1f}s"
+        )
+        return count
+
+    def bulk_create(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def generate_company(self, index):
+        company = Company.objects.create(
+            company=f"{self.prefix.title()} Company {index + 1}",
+            hq=index == 0 and not Company.objects.filter(hq=True).exists(),
+            address="1 Benchmark Street",
+            country="India",
+            state="Kerala",
+            city="Kochi",
+            zip="682001",
+        )
+        self.stdout.write(f"Company {company.company}")
+        self.company = company
+        self.step("organisation", self.generate_organisation)
+        self.step("employees", self.generate_employees)
+        self.step("work information", self.generate_work_information)
+        if apps.is_installed("attendance"):
+            self.step("attendance", self.generate_attendance)
+        if apps.is_installed("leave"):
+            self.step("leave", self.generate_leave)
+        if apps.is_installed("payroll"):
+            self.step("payroll", self.generate_payroll)
+        if apps.is_installed("recruitment"):
+            self.step("recruitment", self.generate_recruitment)
+
+    def link_company(self, model, objects):
+        through = model.company_id.through
+        source = f"{model._meta.model_name}_id"
+        self.bulk_create(
+            through,
+            [
+                through(**{source: obj.id, "company_id": self.company.id})
+                for obj in objects
+            ],
+        )
+
+    def generate_organisation(self):
+        label = self.company.id
+        departments = self.bulk_create(
+            Department,
+            [Department(department=f"{name} {label}") for name in DEPARTMENTS],
+        )
+        positions = self.bulk_create(
+            JobPosition,
+            [
+                JobPosition(
+                    job_position=f"{level} {department.department}",
+                    department_id=department,
+                )
+                for department in departments
+                for level in POSITIONS
+            ],
+        )
+        roles = self.bulk_create(
+            JobRole,
+            [
+                JobRole(
+                    job_role=f"{position.job_position} Role", job_position_id=position
+                )
+                for position in positions
+            ],
+        )
+        (shift,) = self.bulk_create(
+            EmployeeShift,
+            [EmployeeShift(employee_shift=f"General {label}", full_time="200:00")],
+        )
+        shift.days.set(
+            [self.shift_days[day] for day in WEEK_DAYS if day in self.shift_days]
+        )
+        work_types = self.bulk_create(
+            WorkType,
+            [WorkType(work_type=f"{name} {label}") for name in ("Office", "Remote")],
+        )
+        employee_types = self.bulk_create(
+            EmployeeType,
+            [
+                EmployeeType(employee_type=f"{name} {label}")
+                for name in ("Permanent", "Contract")
+            ],
+        )
+        for model, objects in (
+            (Department, departments),
+            (JobPosition, positions),
+            (JobRole, roles),
+            (EmployeeShift, [shift]),
+            (WorkType, work_types),
+            (EmployeeType, employee_types),
+        ):
+            self.link_company(model, objects)
+
+        self.departments = departments
+        self.roles = roles
+        self.shift = shift
+        self.work_types = work_types
+        self.employee_types = employee_types
+        return len(departments) + len(positions) + len(roles) + 5
+
+    def generate_employees(self):
+        total = self.options["employees"]
+        password = make_password(f"{self.prefix}-password")
+        key = f"{self.prefix}{self.company.id}"
+        users = self.bulk_create(
+            User,
+            [User(username=f"{key}_{i}", password=password) for i in range(total)],
+        )
+        employees = []
+        for i, user in enumerate(users):
+            first_name = self.random.choice(FIRST_NAMES)
+            last_name = self.random.choice(LAST_NAMES)
+            employees.append(
+                Employee(
+                    employee_user_id=user,
+                    badge_id=f"{key.upper()}-{i:06d}",
+                    employee_first_name=first_name,
+                    employee_last_name=f"{last_name} {i}",
+                    email=f"{key}_{i}@example.com",
+                    phone=f"9{i:09d}",
+                    gender=self.random.choice(["male", "female"]),
+                    dob=self.today - timedelta(days=self.random.randint(8000, 20000)),
+                )
+            )
+        self.employees = self.bulk_create(Employee, employees)
+        return len(users) + len(self.employees)
+
+    def generate_work_information(self):
+        span = max(self.options["span"], 1)
+        work_info = []
+        for i, employee in enumerate(self.employees):
+            role = self.random.choice(self.roles)
+            position = role.job_position_id
+            work_info.append(
+                EmployeeWorkInformation(
+                    employee_id=employee,
+                    company_id=self.company,
+                    department_id=position.department_id,
+                    job_position_id=position,
+                    job_role_id=role,
+                    # balanced tree: employee i reports to employee (i - 1) // span
+                    reporting_manager_id=(
+                        self.employees[(i - 1) // span] if i else None
+                    ),
+                    shift_id=self.shift,
+                    work_type_id=self.random.choice(self.work_types),
+                    employee_type_id=self.random.choice(self.employee_types),
+                    email=employee.email,
+                    date_joining=self.today
+                    - timedelta(days=self.random.randint(30, 3650)),
+                    basic_salary=self.random.randint(20, 200) * 1000,
+                )
+            )
+        self.bulk_create(EmployeeWorkInformation, work_info)
+        sync_hierarchy(employee.pk for employee in self.employees)
+        return len(work_info)
+
+    def working_days(self, count):
+        days = []
+        day = self.today - timedelta(days=1)
+        while len(days) < count:
+            if day.weekday() < 5:
+                days.append(day)
+            day -= timedelta(days=1)
+        return days
+
+    def generate_attendance(self):
+        Attendance = apps.get_model("attendance", "attendance")
+        AttendanceActivity = apps.get_model("attendance", "attendanceactivity")
+
+        days = self.working_days(self.options["attendance_days"])
+        created = 0
+        for chunk_start in range(0, len(self.employees), 500):
+            attendances = []
+            activities = []
+            for employee in self.employees[chunk_start : chunk_start + 500]:
+                for day in days:
+                    shift_day = self.shift_days.get(day.strftime("%A").lower())
+                    clock_in = dt_time(8, self.random.randint(30, 59))
+                    worked = self.random.randint(7 * 3600, 9 * 3600)
+                    clock_out_dt = datetime.combine(day, clock_in) + timedelta(
+                        seconds=worked
+                    )
+                    worked_hour = f"{worked // 3600:02d}:{worked % 3600 // 60:02d}"
+                    attendances.append(
+                        Attendance(
+                            employee_id=employee,
+                            attendance_date=day,
+                            shift_id=self.shift,
+                            attendance_day=shift_day,
+                            attendance_clock_in_date=day,
+                            attendance_clock_in=clock_in,
+                            attendance_clock_out_date=clock_out_dt.date(),
+                            attendance_clock_out=clock_out_dt.time(),
+                            attendance_worked_hour=worked_hour,
+                            minimum_hour="08:00",
+                            at_work_second=worked,
+                            attendance_validated=True,
+                        )
+                    )
+                    activities.append(
+                        AttendanceActivity(
+                            employee_id=employee,
+                            attendance_date=day,
+                            shift_day=shift_day,
+                            clock_in_date=day,
+                            clock_in=clock_in,
+                            in_datetime=timezone.make_aware(
+                                datetime.combine(day, clock_in)
+                            ),
+                            clock_out_date=clock_out_dt.date(),
+                            clock_out=clock_out_dt.time(),
+                            out_datetime=timezone.make_aware(clock_out_dt),
+                        )
+                    )
+            self.bulk_create(Attendance, attendances)
+            self.bulk_create(AttendanceActivity, activities)
+            created += len(attendances) + len(activities)
+        return created
+
+    def generate_leave(self):
+        LeaveType = apps.get_model("leave", "leavetype")
+        AvailableLeave = apps.get_model("leave", "availableleave")
+        LeaveRequest = apps.get_model("leave", "leaverequest")
+
+        leave_types = self.bulk_create(
+            LeaveType,
+            [
+                LeaveType(
+                    name=f"{name} {self.company.id}",
+                    payment=payment,
+                    total_days=days,
+                    reset_month="1",
+                    company_id=self.company,
+                )
+                for name, payment, days in (
+                    ("Casual Leave", "paid", 12),
+                    ("Sick Leave", "paid", 10),
+                    ("Unpaid Leave", "unpaid", 30),
+                )
+            ],
+        )
+        available = self.bulk_create(
+            AvailableLeave,
+            [
+                AvailableLeave(
+                    employee_id=employee,
+                    leave_type_id=leave_type,
+                    available_days=leave_type.total_days,
+                    total_leave_days=leave_type.total_days,
+                    assigned_date=self.today.replace(month=1, day=1),
+                )
+                for employee in self.employees
+                for leave_type in leave_types
+            ],
+        )
+        requests = []
+        for employee in self.employees:
+            for _ in range(self.options["leave_requests"]):
+                start_date = self.today - timedelta(days=self.random.randint(-30, 365))
+                days = self.random.randint(1, 3)
+                requests.append(
+                    LeaveRequest(
+                        employee_id=employee,
+                        leave_type_id=self.random.choice(leave_types),
+                        start_date=start_date,
+                        end_date=start_date + timedelta(days=days - 1),
+                        requested_days=days,
+                        description="Generated leave request",
+                        status=self.random.choice(
+                            ["requested", "approved", "approved", "rejected"]
+                        ),
+                        requested_date=start_date - timedelta(days=7),
+                    )
+                )
+        self.bulk_create(LeaveRequest, requests)
+        return len(leave_types) + len(available) + len(requests)
+
+    def generate_payroll(self):
+        Contract = apps.get_model("payroll", "contract")
+        Allowance = apps.get_model("payroll", "allowance")
+        Payslip = apps.get_model("payroll", "payslip")
+
+        work_info = {
+            info.employee_id_id: info
+            for info in EmployeeWorkInformation.objects.filter(
+                employee_id__in=[employee.id for employee in self.employees]
+            )
+        }
+        contracts = self.bulk_create(
+            Contract,
+            [
+                Contract(
+                    contract_name=f"{employee.get_full_name()} Contract",
+                    employee_id=employee,
+                    contract_start_date=work_info[employee.id].date_joining,
+                    wage=work_info[employee.id].basic_salary,
+                    contract_status="active",
+                    department=work_info[employee.id].department_id,
+                    job_position=work_info[employee.id].job_position_id,
+                    job_role=work_info[employee.id].job_role_id,
+                    shift=self.shift,
+                )
+                for employee in self.employees
+            ],
+        )
+        allowances = self.bulk_create(
+            Allowance,
+            [
+                Allowance(
+                    title=f"{title} {self.company.id}",
+                    include_active_employees=True,
+                    is_fixed=True,
+                    amount=amount,
+                    company_id=self.company,
+                )
+                for title, amount in (("House Rent", 2000), ("Travel", 800))
+            ],
+        )
+        payslips = []
+        month_start = self.today.replace(day=1)
+        for _ in range(self.options["payslip_months"]):
+            end_date = month_start - timedelta(days=1)
+            month_start = end_date.replace(day=1)
+            for employee in self.employees:
+                wage = work_info[employee.id].basic_salary or 0
+                gross = wage + 2800
+                deduction = round(gross * 0.1, 2)
+                payslips.append(
+                    Payslip(
+                        employee_id=employee,
+                        start_date=month_start,
+                        end_date=end_date,
+                        group_name=f"{month_start:%B %Y}",
+                        pay_head_data={},
+                        contract_wage=wage,
+                        basic_pay=wage,
+                        gross_pay=gross,
+                        deduction=deduction,
+                        net_pay=gross - deduction,
+                        status="paid",
+                    )
+                )
+        self.bulk_create(Payslip, payslips)
+        return len(contracts) + len(allowances) + len(payslips)
+
+    def generate_recruitment(self):
+        Recruitment = apps.get_model("recruitment", "recruitment")
+        Stage = apps.get_model("recruitment", "stage")
+        CandidateApplication = apps.get_model("recruitment", "candidateapplication")
+
+        positions = JobPosition.objects.filter(company_id=self.company)[:3]
+        recruitments = []
+        for position in positions:
+            recruitment = Recruitment.objects.create(
+                title=f"Hiring {position.job_position}",
+                job_position_id=position,
+                company_id=self.company,
+                vacancy=5,
+                start_date=self.today - timedelta(days=60),
+                is_published=True,
+            )
+            recruitment.open_positions.add(position)
+            recruitments.append(recruitment)
+
+        stages = self.bulk_create(
+            Stage,
+            [
+                Stage(
+                    recruitment_id=recruitment,
+                    stage=title,
+                    stage_type=stage_type,
+                    sequence=sequence,
+                )
+                for recruitment in recruitments
+                for sequence, (title, stage_type) in enumerate(
+                    (
+                        ("Initial", "sourced"),
+                        ("Interview", "interview"),
+                        ("Hired", "selected"),
+                    )
+                )
+            ],
+        )
+        stages_of = {}
+        for stage in stages:
+            stages_of.setdefault(stage.recruitment_id_id, []).append(stage)
+
+        candidates = []
+        for i in range(self.options["candidates"] if recruitments else 0):
+            recruitment = recruitments[i % len(recruitments)]
+            candidates.append(
+                CandidateApplication(
+                    name=f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}",
+                    email=f"{self.prefix}{self.company.id}_candidate_{i}@example.com",
+                    mobile=f"8{i:09d}",
+                    portfolio="https://example.com",
+                    resume="recruitment/resume/generated.pdf",
+                    recruitment_id=recruitment,
+                    job_position_id=recruitment.job_position_id,
+                    stage_id=self.random.choice(stages_of[recruitment.id]),
+                    source="application",
+                )
+            )
+        self.bulk_create(CandidateApplication, candidates)
+        return len(recruitments) + len(stages) + len(candidates)
@@ -22,10 +22,12 @@ from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
 
 from base.models import Company, CompanyLeaves, DynamicPagination, Holidays
+from employee.methods.hierarchy import subordinate_ids
 from employee.models import Employee, EmployeeWorkInformation
 from horilla.horilla_apps import NESTED_SUBORDINATE_VISIBILITY
 from horilla.horilla_middlewares import _thread_locals
 from horilla.horilla_settings import HORILLA_DATE_FORMATS, HORILLA_TIME_FORMATS
+from horilla.pagination import CountFreePaginator
 
 
 def users_count(self):
@@ -49,32 +51,10 @@ def filtersubordinates(request, queryset, perm=None, field="employee_id"):
     if not request:
         return queryset
     if NESTED_SUBORDINATE_VISIBILITY:
-        current_managers = [
-            request.user.employee_get.id,
-        ]
-        all_subordinates = Q(
-            **{
-                f"{field}__employee_work_info__reporting_manager_id__in": current_managers
-            }
+        return queryset.filter(
+            **{f"{field}__in": subordinate_ids(request.user.employee_get)}
         )
 
-        while True:
-            sub_managers = queryset.filter(
-                **{
-                    f"{field}__employee_work_info__reporting_manager_id__in": current_managers
-                }
-            ).values_list(f"{field}__id", flat=True)
-            if not sub_managers.exists():
-                break
-            current_managers = sub_managers
-            all_subordinates |= Q(
-                **{
-                    f"{field}__employee_work_info__reporting_manager_id__in": sub_managers
-                }
-            )
-
-        return queryset.filter(all_subordinates)
-
     manager = Employee.objects.filter(employee_user_id=user).first()
 
     if field:
@@ -124,30 +104,7 @@ def filtersubordinatesemployeemodel(request, queryset, perm=None):
         return queryset
 
     if NESTED_SUBORDINATE_VISIBILITY:
-        # Initialize the set of subordinates with the current manager(s)
-        current_managers = [
-            request.user.employee_get.id,
-        ]
-        all_subordinates = Q(
-            employee_work_info__reporting_manager_id__in=current_managers
-        )
-
-        # Iteratively find subordinates in the chain
-        while True:
-            sub_managers = queryset.filter(
-                employee_work_info__reporting_manager_id__in=current_managers
-            ).values_list("id", flat=True)
-
-            if not sub_managers.exists():
-                break
-
-            current_managers = sub_managers
-            all_subordinates |= Q(
-                employee_work_info__reporting_manager_id__in=sub_managers
-            )
-
-        # Apply the filter to the queryset
-        return queryset.filter(all_subordinates).distinct()
+        return queryset.filter(id__in=subordinate_ids(request.user.employee_get))
 
     manager = Employee.objects.filter(employee_user_id=user).first()
     queryset = queryset.filter(employee_work_info__reporting_manager_id=manager)
@@ -754,11 +711,13 @@ def get_pagination():
     return count
 
 
-def paginator_qry(queryset, page_number):
+def paginator_qry(queryset, page_number, count_free=False):
     """
-    Common paginator method
+    Common paginator method, without counting the records when count_free
+    (see horilla.pagination)
     """
-    paginator = Paginator(queryset, get_pagination())
+    paginator_class = CountFreePaginator if count_free else Paginator
+    paginator = paginator_class(queryset, get_pagination())
     queryset = paginator.get_page(page_number)
     return queryset
 
@@ -957,6 +916,8 @@ def get_subordinates(request):
     This method is used to filter out subordinates queryset element.
     """
     user = request.user.employee_get
+    if NESTED_SUBORDINATE_VISIBILITY:
+        return Employee.objects.filter(id__in=subordinate_ids(user))
     subordinates = Employee.objects.filter(
         employee_work_info__reporting_manager_id=user
     )
@@ -2,30 +2,16 @@
 middleware.py
 """
 
-from django.apps import apps
 from django.contrib import messages
 from django.contrib.auth import logout
-from django.core.cache import cache
-from django.db.models import Q
 from django.shortcuts import redirect
 from django.utils.translation import gettext_lazy as _
 
-from base.backends import ConfiguredEmailBackend
+from base.backends import get_email_configuration, get_email_configurations
 from base.context_processors import AllCompany
-from base.horilla_company_manager import HorillaCompanyManager
-from base.models import Company, ShiftRequest, WorkTypeRequest
-from employee.models import (
-    DisciplinaryAction,
-    Employee,
-    EmployeeBankDetails,
-    EmployeeWorkInformation,
-)
+from base.horilla_company_manager import selected_company_context
+from base.models import Company
 from horilla.horilla_apps import TWO_FACTORS_AUTHENTICATION
-from horilla.horilla_settings import APPS
-from horilla.methods import get_horilla_model_class
-from horilla_documents.models import DocumentRequest
-
-CACHE_KEY = "horilla_company_models_cache_key"
 
 
 class CompanyMiddleware:
@@ -97,99 +83,17 @@ class CompanyMiddleware:
                 "id": all_company.id,
             }
 
-    def _add_company_filter(self, model, company_id):
-        """
-        Add company filter to the model if applicable.
-        """
-        is_company_model = model in self._get_company_models()
-        company_field = getattr(model, "company_id", None)
-        is_horilla_manager = isinstance(model.objects, HorillaCompanyManager)
-        related_company_field = getattr(model.objects, "related_company_field", None)
-
-        if is_company_model:
-            if company_field:
-                model.add_to_class("company_filter", Q(company_id=company_id))
-            elif is_horilla_manager and related_company_field:
-                model.add_to_class(
-                    "company_filter", Q(**{related_company_field: company_id})
-                )
-        else:
-            if company_field:
-                model.add_to_class(
-                    "company_filter",
-                    Q(company_id=company_id) | Q(company_id__isnull=True),
-                )
-            elif is_horilla_manager and related_company_field:
-                model.add_to_class(
-                    "company_filter",
-                    Q(**{related_company_field: company_id})
-                    | Q(**{f"{related_company_field}__isnull": True}),
-                )
-
-    def _get_company_models(self):
-        """
-        Retrieve the list of models that are company-specific.
-        """
-        company_models = cache.get(CACHE_KEY)
-
-        if company_models is None:
-            company_models = [
-                Employee,
-                ShiftRequest,
-                WorkTypeRequest,
-                DocumentRequest,
-                DisciplinaryAction,
-                EmployeeBankDetails,
-                EmployeeWorkInformation,
-            ]
-
-            app_model_mappings = {
-                "recruitment": ["recruitment", "candidate"],
-                "leave": [
-                    "leaverequest",
-                    "restrictleave",
-                    "availableleave",
-                    "leaveallocationrequest",
-                    "compensatoryleaverequest",
-                ],
-                "asset": ["assetassignment", "assetrequest"],
-                "attendance": [
-                    "attendance",
-                    "attendanceactivity",
-                    "attendanceovertime",
-                    "workrecords",
-                ],
-                "payroll": [
-                    "contract",
-                    "loanaccount",
-                    "payslip",
-                    "reimbursement",
-                ],
-                "helpdesk": ["ticket"],
-                "offboarding": ["offboarding"],
-                "pms": ["employeeobjective"],
-            }
-
-            for app_label, models in app_model_mappings.items():
-                if apps.is_installed(app_label):
-                    company_models.extend(
-                        [get_horilla_model_class(app_label, model) for model in models]
-                    )
-
-            cache.set(CACHE_KEY, company_models)
-
-        return company_models
-
     def __call__(self, request):
         if getattr(request, "user", False) and not request.user.is_anonymous:
             company_id = self._get_company_id(request)
             self._set_company_session(request, company_id)
-
-            app_models = [
-                model for model in apps.get_models() if model._meta.app_label in APPS
-            ]
-            for model in app_models:
-                self._add_company_filter(model, company_id)
+            token = selected_company_context.set(
+                request.session.get("selected_company")
+            )
+            try:
+                return self.get_response(request)
+            finally:
+                selected_company_context.reset(token)
 
         response = self.get_response(request)
         return response
@@ -223,6 +127,17 @@ class TwoFactorAuthMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
+    def _email_configured(self, request):
+        """
+        Check a mail server is configured to send the OTP, from the cached
+        configurations. The user's company is only looked up when there is
+        no primary mail server.
+        """
+        if get_email_configurations()["primary"] is not None:
+            return True
+        company = request.user.employee_get.get_company()
+        return get_email_configuration(company) is not None
+
     def __call__(self, request):
         excluded_paths = [
             "/change-password",
@@ -237,12 +152,13 @@ class TwoFactorAuthMiddleware:
 
         if TWO_FACTORS_AUTHENTICATION:
             try:
-                if ConfiguredEmailBackend().configuration is not None:
-                    if hasattr(request, "user") and request.user.is_authenticated:
-                        if not request.session.get("otp_code_verified", False):
-                            return redirect("/two-factor")
-                else:
-                    return self.get_response(request)
+                if (
+                    hasattr(request, "user")
+                    and request.user.is_authenticated
+                    and not request.session.get("otp_code_verified", False)
+                    and self._email_configured(request)
+                ):
+                    return redirect("/two-factor")
             except Exception as e:
                 return self.get_response(request)
 
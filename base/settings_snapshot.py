@@ -0,0 +1,117 @@
+"""
+settings_snapshot.py
+
+This module is used to load the singleton settings read by the context
+processors once per selected company and keep them in the cache
+"""
+
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+
+from base.horilla_company_manager import selected_company_context
+
+SNAPSHOT_VERSION_KEY = "horilla_settings_snapshot_version"
+SNAPSHOT_TIMEOUT = 60 * 60
+
+# Models read by the snapshot, a save or delete on any of them invalidates it
+SNAPSHOT_MODELS = [
+    ("base", "company"),
+    ("base", "tracklatecomeearlyout"),
+    ("employee", "employeegeneralsetting"),
+    ("employee", "profileeditfeature"),
+    ("offboarding", "offboardinggeneralsetting"),
+    ("attendance", "attendancegeneralsetting"),
+    ("payroll", "payrollgeneralsetting"),
+    ("recruitment", "recruitmentgeneralsetting"),
+]
+
+
+def _first(app_label, model_name):
+    if not apps.is_installed(app_label):
+        return None
+    return apps.get_model(app_label, model_name).objects.first()
+
+
+def load_settings_snapshot():
+    """
+    Read every setting used by the context processors from the database
+    """
+    Company = apps.get_model("base", "company")
+    companies = list(Company.objects.all())
+    offboarding_setting = _first("offboarding", "offboardinggeneralsetting")
+    attendance_setting = _first("attendance", "attendancegeneralsetting")
+    payroll_setting = _first("payroll", "payrollgeneralsetting")
+    recruitment_setting = _first("recruitment", "recruitmentgeneralsetting")
+    employee_setting = _first("employee", "employeegeneralsetting")
+    tracking = _first("base", "tracklatecomeearlyout")
+    profile_edit = _first("employee", "profileeditfeature")
+
+    hq = None
+    for company in companies:
+        if company.hq:
+            hq = company
+    return {
+        "companies": companies,
+        "hq": hq,
+        "resignation_request": (
+            offboarding_setting.resignation_request if offboarding_setting else False
+        ),
+        "time_runner": attendance_setting.time_runner if attendance_setting else True,
+        "notice_period": payroll_setting.notice_period if payroll_setting else 30,
+        "candidate_self_tracking": (
+            recruitment_setting.candidate_self_tracking
+            if recruitment_setting
+            else False
+        ),
+        "show_overall_rating": (
+            recruitment_setting.show_overall_rating if recruitment_setting else False
+        ),
+        "badge_id_prefix": (
+            employee_setting.badge_id_prefix if employee_setting else "PEP"
+        ),
+        "prefix_instance_id": employee_setting.id if employee_setting else None,
+        "tracking": tracking.is_enable if tracking else True,
+        "profile_edit": bool(profile_edit and profile_edit.is_enabled),
+    }
+
+
+def get_snapshot_version():
+    """
+    Current version of the snapshot, part of every snapshot cache key
+    """
+    version = cache.get(SNAPSHOT_VERSION_KEY)
+    if version is None:
+        cache.add(SNAPSHOT_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SNAPSHOT_VERSION_KEY)
+    return version
+
+
+def invalidate_settings_snapshot(*args, **kwargs):
+    """
+    Signal receiver, moves every company to a new snapshot version
+    """
+    cache.set(SNAPSHOT_VERSION_KEY, time.time_ns(), None)
+
+
+def get_settings_snapshot(request=None):
+    """
+    Return the settings snapshot of the selected company.
+
+    The snapshot is memoized on the request, so the context processors of a
+    render share a single cache read.
+    """
+    snapshot = getattr(request, "_horilla_settings_snapshot", None)
+    if snapshot is not None:
+        return snapshot
+
+    company = selected_company_context.get() or "all"
+    cache_key = f"horilla_settings_snapshot_{get_snapshot_version()}_{company}"
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = load_settings_snapshot()
+        cache.set(cache_key, snapshot, SNAPSHOT_TIMEOUT)
+    if request is not None:
+        request._horilla_settings_snapshot = snapshot
+    return snapshot
@@ -8,7 +8,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.signals import user_login_failed
 from django.db.models import Max, Q
-from django.db.models.signals import m2m_changed, post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 from django.dispatch import receiver
 from django.http import Http404
 from django.shortcuts import redirect, render
@@ -240,3 +240,45 @@ class Fail2BanMiddleware:
 
 
 settings.MIDDLEWARE.append("base.signals.Fail2BanMiddleware")
+
+
+def connect_settings_snapshot_signals():
+    """
+    Invalidate the context processor settings snapshot whenever one of the
+    underlying settings models changes
+    """
+    from base.settings_snapshot import SNAPSHOT_MODELS, invalidate_settings_snapshot
+    from horilla.signals import post_bulk_update
+
+    for app_label, model_name in SNAPSHOT_MODELS:
+        if not apps.is_installed(app_label):
+            continue
+        model = apps.get_model(app_label, model_name)
+        for signal in (post_save, post_delete, post_bulk_update):
+            signal.connect(
+                invalidate_settings_snapshot,
+                sender=model,
+                dispatch_uid=f"settings_snapshot_{app_label}_{model_name}",
+            )
+
+
+connect_settings_snapshot_signals()
+
+
+def connect_email_configuration_signals():
+    """
+    Drop the cached mail server configurations when they change
+    """
+    from base.backends import clear_email_configuration_cache
+    from base.models import DynamicEmailConfiguration
+    from horilla.signals import post_bulk_update
+
+    for signal in (post_save, post_delete, post_bulk_update):
+        signal.connect(
+            clear_email_configuration_cache,
+            sender=DynamicEmailConfiguration,
+            dispatch_uid="email_configuration_cache",
+        )
+
+
+connect_email_configuration_signals()
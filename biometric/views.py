@@ -37,6 +37,7 @@ from horilla.decorators import (
 )
 from horilla.filters import HorillaPaginator
 from horilla.horilla_settings import BIO_DEVICE_THREADS
+from horilla.profiler import profiled_thread
 from horilla.settings import TIME_ZONE
 
 from .anviz import CrossChexCloudAPI
@@ -117,6 +118,7 @@ def biometric_set_time(conn):
     conn.set_time(new_time)
 
 
+@profiled_thread
 class ZKBioAttendance(Thread):
     """
     Represents a thread for capturing live attendance data from a ZKTeco biometric device.
@@ -217,6 +219,7 @@ class ZKBioAttendance(Thread):
         self.conn.end_live_capture = True
 
 
+@profiled_thread
 class COSECBioAttendanceThread(Thread):
     """
     A thread class that handles the real-time retrieval and processing of
@@ -19,7 +19,7 @@ from employee.models import DisciplinaryAction, Employee, Policy
 from horilla.filters import FilterSet, HorillaFilterSet, filter_by_name
 from horilla.horilla_middlewares import _thread_locals
 from horilla_documents.models import Document
-from horilla_views.templatetags.generic_template_filters import getattribute
+from horilla_views.search import search_queryset
 
 
 class EmployeeFilter(HorillaFilterSet):
@@ -176,8 +176,7 @@ class EmployeeFilter(HorillaFilterSet):
         request = getattr(_thread_locals, "request", None)
         if request:
             employee = getattr(request.user, "employee_get", None)
-            cache_key = request.session.session_key + "accessibility_filter"
-            accessible = check_is_accessible("employee_view", cache_key, employee)
+            accessible = check_is_accessible("employee_view", employee)
             if not accessible and employee.reporting_manager.exists():
                 queryset = filtersubordinatesemployeemodel(
                     request=request, queryset=queryset, perm="employee.view_employee"
@@ -206,17 +205,9 @@ class EmployeeFilter(HorillaFilterSet):
         """
         Employee search method
         """
-        value = value.lower()
-
         if self.data.get("search_field"):
             return queryset
-
-        def _icontains(instance):
-            result = str(getattribute(instance, "get_full_name")).lower()
-            return instance.pk if value in result else None
-
-        ids = list(filter(None, map(_icontains, queryset)))
-        return queryset.filter(id__in=ids)
+        return search_queryset(queryset, "get_full_name", value)
 
 
 class EmployeeReGroup:
@@ -0,0 +1,23 @@
+"""
+rebuild_reporting_hierarchy.py
+
+Recompute the reporting hierarchy closure table, after the reporting managers
+were changed outside of the application (e.g. by SQL or a data migration).
+"""
+
+from django.core.management.base import BaseCommand
+
+from employee.methods.hierarchy import rebuild_hierarchy
+from employee.models import ReportingHierarchy
+
+
+class Command(BaseCommand):
+    help = "Rebuild the reporting hierarchy of the employees"
+
+    def handle(self, *args, **options):
+        rebuild_hierarchy()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reporting hierarchy rebuilt, {ReportingHierarchy.objects.count()} rows"
+            )
+        )
@@ -0,0 +1,202 @@
+"""
+employee/methods/disciplinary.py
+
+Login block and unblock of the employees under a disciplinary action, kept
+as DisciplinaryTransition rows due at a given time.
+
+A suspension or dismissal with the login block option schedules its
+transitions when saved (see the employee.models receivers):
+
+- a dismissal blocks the login from the start date
+- a suspension in days blocks it from the start date and unblocks it the
+  given number of days later
+- a suspension in hours blocks it at the start of the shift of the employee
+  on the start date and unblocks it the given hours later
+
+Saving the action, its type or its employees again replaces the transitions
+not yet applied. The scheduler calls process_due_transitions(), which reads
+only the transitions due and not applied through the (processed_at, due_at)
+index, applies them in bulk and marks them applied, so each runs once.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from base.models import EmployeeShiftSchedule
+from employee.models import DisciplinaryAction, DisciplinaryTransition, Employee
+
+logger = logging.getLogger(__name__)
+
+BLOCKING_ACTION_TYPES = ("suspension", "dismissal")
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+SCHEDULED = False
+
+
+def local_datetime(day, at=time.min) -> datetime:
+    return timezone.make_aware(datetime.combine(day, at))
+
+
+def suspension_duration(hours) -> timedelta:
+    """
+    Duration of a suspension given in HH:MM
+    """
+    try:
+        hour, minute = hours.split(":")
+        return timedelta(hours=int(hour), minutes=int(minute))
+    except (AttributeError, ValueError):
+        return timedelta()
+
+
+def shift_start(employee, day):
+    """
+    Start time of the shift of the employee on the day
+    """
+    work_info = getattr(employee, "employee_work_info", None)
+    if work_info is None or work_info.shift_id_id is None:
+        return None
+    return (
+        EmployeeShiftSchedule._base_manager.filter(
+            shift_id=work_info.shift_id_id, day__day=WEEKDAYS[day.weekday()]
+        )
+        .values_list("start_time", flat=True)
+        .first()
+    )
+
+
+def action_transitions(disciplinary_action) -> list:
+    """
+    Block and unblock of the employees of the action, unsaved
+    """
+    action_type = disciplinary_action.action
+    start_date = disciplinary_action.start_date
+    if (
+        not action_type.block_option
+        or action_type.action_type not in BLOCKING_ACTION_TYPES
+        or start_date is None
+    ):
+        return []
+
+    employees = Employee._base_manager.filter(
+        disciplinaryaction=disciplinary_action
+    ).select_related("employee_work_info")
+    duration = suspension_duration(disciplinary_action.hours)
+    transitions = []
+    for employee in employees:
+        periods = []
+        if action_type.action_type == "dismissal":
+            periods.append((True, local_datetime(start_date)))
+        elif disciplinary_action.unit_in == "days":
+            if disciplinary_action.days:
+                periods.append((True, local_datetime(start_date)))
+                periods.append(
+                    (
+                        False,
+                        local_datetime(
+                            start_date + timedelta(days=disciplinary_action.days)
+                        ),
+                    )
+                )
+        elif duration:
+            start_time = shift_start(employee, start_date)
+            if start_time is not None:
+                blocked_at = local_datetime(start_date, start_time)
+                periods.append((True, blocked_at))
+                periods.append((False, blocked_at + duration))
+        transitions.extend(
+            DisciplinaryTransition(
+                disciplinary_action_id=disciplinary_action,
+                employee_id=employee,
+                block=block,
+                due_at=due_at,
+            )
+            for block, due_at in periods
+        )
+    return transitions
+
+
+def schedule_transitions(disciplinary_action):
+    """
+    Replace the transitions of the action not yet applied, those already
+    applied are not scheduled again
+    """
+    transitions = action_transitions(disciplinary_action)
+    with transaction.atomic():
+        disciplinary_action.transitions.filter(processed_at__isnull=True).delete()
+        applied = set(
+            disciplinary_action.transitions.values_list(
+                "employee_id", "block", "due_at"
+            )
+        )
+        DisciplinaryTransition.objects.bulk_create(
+            [
+                transition
+                for transition in transitions
+                if (transition.employee_id_id, transition.block, transition.due_at)
+                not in applied
+            ]
+        )
+
+
+def schedule_missing_transitions():
+    """
+    Schedule the blocking actions saved before their transitions were kept
+    """
+    for disciplinary_action in DisciplinaryAction._base_manager.filter(
+        action__block_option=True,
+        action__action_type__in=BLOCKING_ACTION_TYPES,
+        transitions__isnull=True,
+    ).select_related("action"):
+        schedule_transitions(disciplinary_action)
+
+
+def process_due_transitions(now=None) -> int:
+    """
+    Apply the transitions due and not applied, the latest due of each
+    employee deciding their login, and return their number
+    """
+    global SCHEDULED
+    if not SCHEDULED:
+        schedule_missing_transitions()
+        SCHEDULED = True
+
+    now = now or timezone.now()
+    due = list(
+        DisciplinaryTransition.objects.filter(
+            processed_at__isnull=True, due_at__lte=now
+        )
+        .order_by("due_at", "id")
+        .values_list("id", "employee_id__employee_user_id", "block")
+    )
+    if not due:
+        return 0
+
+    active = {}
+    for _transition_id, user_id, block in due:
+        if user_id is not None:
+            active[user_id] = not block
+    with transaction.atomic():
+        for is_active in (False, True):
+            User.objects.filter(
+                id__in=[
+                    user_id for user_id, state in active.items() if state == is_active
+                ]
+            ).exclude(is_active=is_active).update(is_active=is_active)
+        DisciplinaryTransition.objects.filter(id__in=[row[0] for row in due]).update(
+            processed_at=now
+        )
+    logger.info("Applied %s disciplinary login transitions", len(due))
+    return len(due)
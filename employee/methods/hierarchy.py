@@ -0,0 +1,223 @@
+"""
+employee/methods/hierarchy.py
+
+Reporting hierarchy of the employees kept as a closure table.
+
+ReportingHierarchy holds a row for each employee and every manager above them
+through EmployeeWorkInformation.reporting_manager_id, so the subordinates of
+a manager at any depth are one indexed lookup instead of a walk down the
+reporting tree level by level.
+
+The table follows the reporting manager changes:
+
+- saving or deleting a work information moves the employee with their
+  subordinates under the new manager (see the employee.models receivers)
+- bulk imports and updates call sync_hierarchy() with the employees they
+  touched, which rebuilds the whole table when many of them moved
+- sync_hierarchy() also moves the organisation chart pages of the managers
+  of the employees and of their former managers, and rebuild_hierarchy() the
+  whole chart, so the changes show on it (see employee.methods.org_chart)
+- rebuild_hierarchy() recomputes it from the work information, it runs when
+  the table is found empty and from the rebuild_reporting_hierarchy command
+
+A reporting chain closing on itself stops at the first employee seen twice.
+"""
+
+import logging
+from itertools import chain
+
+from django.db import transaction
+
+from employee.methods.org_chart import org_chart_changed, reports_changed
+from employee.models import Employee, EmployeeWorkInformation, ReportingHierarchy
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 999
+
+# More moved employees than this in one sync rebuild the whole table
+REBUILD_THRESHOLD = 200
+
+BUILT = False
+
+
+def reporting_managers() -> dict:
+    """
+    Reporting manager id of every employee having one
+    """
+    return dict(
+        EmployeeWorkInformation._base_manager.filter(
+            employee_id__isnull=False, reporting_manager_id__isnull=False
+        ).values_list("employee_id", "reporting_manager_id")
+    )
+
+
+def manager_chain(employee_id, managers):
+    """
+    Managers above the employee, nearest first
+    """
+    seen = {employee_id}
+    manager_id = managers.get(employee_id)
+    while manager_id is not None and manager_id not in seen:
+        seen.add(manager_id)
+        yield manager_id
+        manager_id = managers.get(manager_id)
+
+
+def rebuild_hierarchy():
+    """
+    Recompute the closure table from the reporting managers
+    """
+    global BUILT
+    managers = reporting_managers()
+    employee_ids = Employee._base_manager.values_list("id", flat=True)
+    with transaction.atomic():
+        ReportingHierarchy.objects.all().delete()
+        rows = []
+        for employee_id in employee_ids.iterator():
+            rows.append(
+                ReportingHierarchy(
+                    ancestor_id_id=employee_id, descendant_id_id=employee_id, depth=0
+                )
+            )
+            for depth, manager_id in enumerate(
+                manager_chain(employee_id, managers), start=1
+            ):
+                rows.append(
+                    ReportingHierarchy(
+                        ancestor_id_id=manager_id,
+                        descendant_id_id=employee_id,
+                        depth=depth,
+                    )
+                )
+            if len(rows) >= BATCH_SIZE:
+                ReportingHierarchy.objects.bulk_create(rows)
+                rows = []
+        ReportingHierarchy.objects.bulk_create(rows)
+    BUILT = True
+    org_chart_changed()
+    logger.info("Reporting hierarchy rebuilt for %s managers", len(managers))
+
+
+def ensure_hierarchy():
+    """
+    Build the closure table when it was never built
+    """
+    global BUILT
+    if BUILT:
+        return
+    if ReportingHierarchy.objects.exists():
+        BUILT = True
+    else:
+        rebuild_hierarchy()
+
+
+def detach_employee(employee_id):
+    """
+    Remove the links of the employee and their subordinates to the managers
+    above the employee
+    """
+    subtree = ReportingHierarchy.objects.filter(ancestor_id=employee_id).values(
+        "descendant_id"
+    )
+    ReportingHierarchy.objects.filter(descendant_id__in=subtree).exclude(
+        ancestor_id__in=subtree
+    ).delete()
+
+
+def move_employee(employee_id, manager_id):
+    """
+    Move the employee and their subordinates under the manager, to the top of
+    the hierarchy when the manager is None
+    """
+    subtree = dict(
+        ReportingHierarchy.objects.filter(ancestor_id=employee_id).values_list(
+            "descendant_id", "depth"
+        )
+    )
+    if manager_id in subtree:
+        # the chain closes on itself, only the full walk can place it
+        rebuild_hierarchy()
+        return
+    detach_employee(employee_id)
+    if manager_id is None:
+        return
+    ReportingHierarchy.objects.get_or_create(
+        ancestor_id_id=manager_id, descendant_id_id=manager_id, depth=0
+    )
+    ancestors = ReportingHierarchy.objects.filter(descendant_id=manager_id).values_list(
+        "ancestor_id", "depth"
+    )
+    ReportingHierarchy.objects.bulk_create(
+        [
+            ReportingHierarchy(
+                ancestor_id_id=ancestor_id,
+                descendant_id_id=descendant_id,
+                depth=ancestor_depth + descendant_depth + 1,
+            )
+            for ancestor_id, ancestor_depth in ancestors
+            for descendant_id, descendant_depth in subtree.items()
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def sync_hierarchy(employee_ids):
+    """
+    Bring the closure table in line with the reporting managers of the
+    employees, after they were saved or bulk updated
+    """
+    employee_ids = list(employee_ids)
+    if not BUILT and not ReportingHierarchy.objects.exists():
+        rebuild_hierarchy()
+        return
+    with transaction.atomic():
+        ReportingHierarchy.objects.bulk_create(
+            [
+                ReportingHierarchy(
+                    ancestor_id_id=employee_id, descendant_id_id=employee_id, depth=0
+                )
+                for employee_id in employee_ids
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        managers = dict(
+            EmployeeWorkInformation._base_manager.filter(
+                employee_id__in=employee_ids
+            ).values_list("employee_id", "reporting_manager_id")
+        )
+        parents = dict(
+            ReportingHierarchy.objects.filter(
+                descendant_id__in=employee_ids, depth=1
+            ).values_list("descendant_id", "ancestor_id")
+        )
+        moved = [
+            employee_id
+            for employee_id in employee_ids
+            if managers.get(employee_id) != parents.get(employee_id)
+        ]
+        if len(moved) > REBUILD_THRESHOLD:
+            rebuild_hierarchy()
+            return
+        for employee_id in moved:
+            move_employee(employee_id, managers.get(employee_id))
+    # the pages listing the employees, and both ends of the moves
+    org_chart_changed(managers.values())
+    reports_changed(
+        chain.from_iterable(
+            (managers.get(employee_id), parents.get(employee_id))
+            for employee_id in moved
+        )
+    )
+
+
+def subordinate_ids(manager):
+    """
+    Subquery of the ids of the employees reporting to the manager at any depth
+    """
+    ensure_hierarchy()
+    return ReportingHierarchy.objects.filter(ancestor_id=manager, depth__gt=0).values(
+        "descendant_id"
+    )
@@ -0,0 +1,545 @@
+"""
+employee/methods/import_engine.py
+
+Background import of the employee work information file.
+
+The uploaded file is stored on an EmployeeImportJob and imported by
+EmployeeImportThread, the request only checks the headers and answers with a
+progress dialog polling the job. The import:
+
+- reads the file in chunks of EMPLOYEE_IMPORT_CHUNK_SIZE rows, never holding
+  the whole sheet in memory
+- validates the chunks and hashes the initial passwords in a pool of
+  EMPLOYEE_IMPORT_WORKERS processes, a file of a single chunk is validated
+  in the thread
+- checks the rows against one ImportIndex of the existing records, which also
+  resolves the department, job position, shift ... and manager names
+- writes each chunk in its own transaction, a chunk failing to save reports
+  its rows in the error workbook and does not stop the import
+- resolves the reporting managers imported after their subordinates once all
+  the chunks are written
+
+The rejected rows are stored as a workbook on the job, downloaded from the
+result dialog.
+
+Jobs of the "employee" layout import the short employee file (full name,
+email and phone) the same way, its rows are read as work information rows
+holding those columns only.
+"""
+
+import logging
+import multiprocessing
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+from itertools import chain
+
+import django
+import pandas as pd
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+
+from base.models import (
+    Department,
+    EmployeeShift,
+    EmployeeType,
+    JobPosition,
+    JobRole,
+    WorkType,
+)
+from employee.methods.hierarchy import sync_hierarchy
+from employee.methods.methods import (
+    ImportIndex,
+    convert_nan,
+    create_contracts_in_thread,
+    error_data_template,
+    is_postgres,
+    validate_employee_row,
+)
+from employee.models import Employee, EmployeeImportJob, EmployeeWorkInformation
+from horilla.horilla_settings import EMPLOYEE_IMPORT_CHUNK_SIZE, EMPLOYEE_IMPORT_WORKERS
+from horilla.profiler import profiled_thread
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = None if is_postgres else 999
+
+ERROR_COLUMNS = list(error_data_template) + ["Import Error"]
+
+
+def file_extension(name) -> str:
+    return name.rsplit(".", 1)[-1].lower()
+
+
+def read_header(file, extension):
+    """
+    Header and first row of the file, for the header checks of the upload
+    """
+    if extension == "csv":
+        return pd.read_csv(file, nrows=1)
+    return pd.read_excel(file, nrows=1)
+
+
+# Columns of the short employee file, see employee_layout_row
+EMPLOYEE_LAYOUT_COLUMNS = ["employee_full_name", "email", "phone"]
+
+
+# Work information columns the short employee file leaves empty, the badge
+# and gender columns are left out so that its rows skip their checks
+EMPTY_LAYOUT_COLUMNS = [
+    column
+    for column in error_data_template
+    if not column.endswith("Error") and column not in ["Badge ID", "Gender"]
+]
+
+
+def employee_layout_row(row) -> dict:
+    """
+    Work information row of a row of the short employee file
+    """
+    full_name = convert_nan("employee_full_name", row) or ""
+    first_name, _space, last_name = str(full_name).strip().partition(" ")
+    emp = dict.fromkeys(EMPTY_LAYOUT_COLUMNS, float("nan"))
+    emp.update(
+        {
+            "First Name": first_name,
+            "Last Name": last_name,
+            "Email": row.get("email", ""),
+            "Phone": row.get("phone", ""),
+        }
+    )
+    return emp
+
+
+def count_rows(file, extension) -> int:
+    """
+    Rows of the file below the header, only used for the progress
+    """
+    if extension == "csv":
+        return max(sum(1 for line in file if line.strip()) - 1, 0)
+    if extension == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = workbook.worksheets[0].max_row or 0
+        workbook.close()
+        return max(rows - 1, 0)
+    return len(pd.read_excel(file))
+
+
+def read_chunks(file, extension, size):
+    """
+    Rows of the file as dictionaries keyed by the header, size rows at a time
+    """
+    if extension == "csv":
+        for data_frame in pd.read_csv(file, chunksize=size):
+            yield data_frame.to_dict("records")
+        return
+    if extension != "xlsx":
+        # the xls reader has no streaming mode
+        data_frame = pd.read_excel(file)
+        for start in range(0, len(data_frame), size):
+            yield data_frame.iloc[start : start + size].to_dict("records")
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [
+            str(column).strip() if column is not None else "" for column in header
+        ]
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            # empty cells read as NaN, the way pandas reads them
+            chunk.append(
+                {
+                    column: float("nan") if value is None else value
+                    for column, value in zip(header, row)
+                }
+            )
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def validate_chunk(rows, today):
+    """
+    Checks of the rows needing no database, with the password hash of the
+    accepted rows. Runs in the worker processes.
+    """
+    results = []
+    for emp in rows:
+        errors, save, values = validate_employee_row(emp, today)
+        password = make_password(values["phone"]) if save else None
+        results.append((emp, errors, save, values, password))
+    return results
+
+
+def validated_chunks(chunks, today, workers=EMPLOYEE_IMPORT_WORKERS):
+    """
+    validate_chunk() results of the chunks in their order, computed by the
+    process pool while the previous chunks are written
+    """
+    first = next(chunks, None)
+    second = next(chunks, None)
+    if second is None or workers <= 1:
+        for rows in chain(filter(None, [first, second]), chunks):
+            yield validate_chunk(rows, today)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    ) as pool:
+        pending = deque(
+            [
+                pool.submit(validate_chunk, first, today),
+                pool.submit(validate_chunk, second, today),
+            ]
+        )
+        for rows in chunks:
+            # keep at most one chunk per worker ahead of the writes
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(validate_chunk, rows, today))
+        while pending:
+            yield pending.popleft().result()
+
+
+def whole_number(field, row):
+    """
+    Salary column of the row as an integer, 0 when empty (the row checks
+    already rejected the values that are no numbers)
+    """
+    value = row.get(field)
+    if value is None or pd.isna(value) or str(value).strip() == "":
+        return 0
+    return int(float(value))
+
+
+def create_references(rows, index):
+    """
+    Create the departments, job positions, job roles, work types, shifts and
+    employee types named by the rows and missing from the index
+    """
+    departments = {
+        name
+        for emp, _values, _password in rows
+        if (name := convert_nan("Department", emp))
+    } - index.departments.keys()
+    if departments:
+        Department.objects.bulk_create(
+            [Department(department=name) for name in departments],
+            batch_size=BATCH_SIZE,
+        )
+        index.departments.update(
+            (department.department, department)
+            for department in Department.objects.filter(
+                department__in=departments
+            ).only("id", "department")
+        )
+
+    positions = set()
+    for emp, _values, _password in rows:
+        department = index.departments.get(convert_nan("Department", emp))
+        position = convert_nan("Job Position", emp)
+        if department and position:
+            positions.add((department.id, position))
+    positions -= index.job_positions.keys()
+    if positions:
+        JobPosition.objects.bulk_create(
+            [
+                JobPosition(department_id_id=department_id, job_position=name)
+                for department_id, name in positions
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        index.job_positions.update(
+            ((position.department_id_id, position.job_position), position)
+            for position in JobPosition.objects.filter(
+                department_id__in={department_id for department_id, _name in positions}
+            ).only("id", "department_id", "job_position")
+        )
+
+    roles = set()
+    for emp, _values, _password in rows:
+        position = job_position_of(emp, index)
+        role = convert_nan("Job Role", emp)
+        if position and role:
+            roles.add((position.id, role))
+    roles -= index.job_roles.keys()
+    if roles:
+        JobRole.objects.bulk_create(
+            [
+                JobRole(job_position_id_id=position_id, job_role=name)
+                for position_id, name in roles
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        index.job_roles.update(
+            ((role.job_position_id_id, role.job_role), role)
+            for role in JobRole.objects.filter(
+                job_position_id__in={position_id for position_id, _name in roles}
+            ).only("id", "job_position_id", "job_role")
+        )
+
+    for model, field, column, lookup in (
+        (WorkType, "work_type", "Work Type", index.work_types),
+        (EmployeeShift, "employee_shift", "Shift", index.shifts),
+        (EmployeeType, "employee_type", "Employee Type", index.employee_types),
+    ):
+        names = {
+            name
+            for emp, _values, _password in rows
+            if (name := convert_nan(column, emp))
+        } - lookup.keys()
+        if names:
+            model.objects.bulk_create(
+                [model(**{field: name}) for name in names], batch_size=BATCH_SIZE
+            )
+            lookup.update(
+                (getattr(instance, field), instance)
+                for instance in model.objects.filter(**{f"{field}__in": names}).only(
+                    "id", field
+                )
+            )
+
+
+def job_position_of(emp, index):
+    department = index.departments.get(convert_nan("Department", emp))
+    if not department:
+        return None
+    return index.job_positions.get((department.id, convert_nan("Job Position", emp)))
+
+
+def write_chunk(rows, index):
+    """
+    Create the users, employees, work information and contracts of the
+    accepted rows of a chunk.
+
+    Returns the ids of the created employees and the (employee id, manager
+    name) pairs whose manager is not imported yet.
+    """
+    unresolved = []
+    with transaction.atomic():
+        create_references(rows, index)
+
+        User.objects.bulk_create(
+            [
+                User(
+                    username=values["email"],
+                    email=values["email"],
+                    password=password,
+                    is_superuser=False,
+                )
+                for _emp, values, password in rows
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = dict(
+            User.objects.filter(
+                username__in=[values["email"] for _emp, values, _password in rows]
+            ).values_list("username", "id")
+        )
+        Employee.objects.bulk_create(
+            [
+                Employee(
+                    employee_user_id_id=user_ids[values["email"]],
+                    badge_id=values["badge_id"],
+                    employee_first_name=values["first_name"],
+                    employee_last_name=values["last_name"],
+                    email=values["email"],
+                    phone=values["phone"],
+                    gender=str(emp.get("Gender") or "").strip().lower(),
+                )
+                for emp, values, _password in rows
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        employees = {
+            employee.employee_user_id_id: employee
+            for employee in Employee.objects.entire().filter(
+                employee_user_id__in=user_ids.values()
+            )
+        }
+
+        work_info_list = []
+        for emp, values, _password in rows:
+            employee = employees[user_ids[values["email"]]]
+            position = job_position_of(emp, index)
+            manager = emp.get("Reporting Manager")
+            manager_id = None
+            if isinstance(manager, str) and " " in manager:
+                manager_id = index.managers.get(manager)
+                if manager_id is None:
+                    unresolved.append((employee.id, manager))
+            work_info_list.append(
+                EmployeeWorkInformation(
+                    employee_id=employee,
+                    email=values["email"],
+                    department_id=index.departments.get(convert_nan("Department", emp)),
+                    job_position_id=position,
+                    job_role_id=position
+                    and index.job_roles.get(
+                        (position.id, convert_nan("Job Role", emp))
+                    ),
+                    work_type_id=index.work_types.get(convert_nan("Work Type", emp)),
+                    employee_type_id=index.employee_types.get(
+                        convert_nan("Employee Type", emp)
+                    ),
+                    shift_id=index.shifts.get(convert_nan("Shift", emp)),
+                    reporting_manager_id_id=manager_id,
+                    company_id=index.companies.get(values["company"]),
+                    location=convert_nan("Location", emp),
+                    date_joining=values["joining_date"] or date.today(),
+                    contract_end_date=values["contract_end_date"],
+                    basic_salary=whole_number("Basic Salary", emp),
+                    salary_hour=whole_number("Salary Hour", emp),
+                )
+            )
+        EmployeeWorkInformation.objects.bulk_create(
+            work_info_list, batch_size=BATCH_SIZE
+        )
+        if apps.is_installed("payroll"):
+            create_contracts_in_thread(work_info_list, [])
+
+    for employee in employees.values():
+        index.managers[
+            f"{employee.employee_first_name} {employee.employee_last_name}"
+        ] = employee.id
+    return [employee.id for employee in employees.values()], unresolved
+
+
+def resolve_managers(unresolved, index):
+    """
+    Set the reporting managers imported after their subordinates
+    """
+    subordinates = defaultdict(list)
+    for employee_id, manager in unresolved:
+        manager_id = index.managers.get(manager)
+        if manager_id is not None:
+            subordinates[manager_id].append(employee_id)
+    for manager_id, employee_ids in subordinates.items():
+        EmployeeWorkInformation._base_manager.filter(
+            employee_id__in=employee_ids
+        ).update(reporting_manager_id=manager_id)
+
+
+def error_workbook(error_list) -> bytes:
+    """
+    Workbook of the rejected rows and their errors, without the columns empty
+    for every row
+    """
+    data_frame = pd.DataFrame(
+        [[row.get(column) for column in ERROR_COLUMNS] for row in error_list],
+        columns=ERROR_COLUMNS,
+    ).dropna(axis="columns", how="all")
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        data_frame.to_excel(writer, index=False, sheet_name="Sheet1")
+        writer.sheets["Sheet1"].set_column("A:Z", 30)
+    return output.getvalue()
+
+
+def run_import(job):
+    """
+    Import the file of the job, updating its progress after each chunk
+    """
+    extension = file_extension(job.file.name)
+    with job.file.open("rb") as file:
+        job.total_rows = count_rows(file, extension)
+    job.status = "running"
+    job.save(update_fields=["status", "total_rows"])
+
+    index = ImportIndex()
+    today = date.today()
+    error_list, created_ids, unresolved = [], [], []
+    with job.file.open("rb") as file:
+        chunks = read_chunks(file, extension, EMPLOYEE_IMPORT_CHUNK_SIZE)
+        if job.layout == "employee":
+            chunks = (list(map(employee_layout_row, chunk)) for chunk in chunks)
+        for results in validated_chunks(chunks, today):
+            accepted = []
+            for emp, errors, save, values, password in results:
+                save = index.check_row(emp, values, errors) and save
+                if save:
+                    accepted.append((emp, values, password))
+                else:
+                    emp.update(errors)
+                    error_list.append(emp)
+            if accepted:
+                try:
+                    employee_ids, pending = write_chunk(accepted, index)
+                    created_ids += employee_ids
+                    unresolved += pending
+                except Exception as error:
+                    logger.exception("Employee import %s: chunk not saved", job.pk)
+                    for emp, _values, _password in accepted:
+                        emp["Import Error"] = str(error)
+                        error_list.append(emp)
+                    # the index holds the rows rolled back
+                    index = ImportIndex()
+            job.processed_rows += len(results)
+            job.created_count = len(created_ids)
+            job.error_count = len(error_list)
+            EmployeeImportJob.objects.filter(pk=job.pk).update(
+                processed_rows=job.processed_rows,
+                created_count=job.created_count,
+                error_count=job.error_count,
+            )
+
+    resolve_managers(unresolved, index)
+    sync_hierarchy(created_ids)
+    if error_list:
+        job.error_file.save(
+            f"employee_import_{job.pk}_errors.xlsx",
+            ContentFile(error_workbook(error_list)),
+            save=False,
+        )
+
+
+@profiled_thread
+class EmployeeImportThread(threading.Thread):
+    """
+    Runs an EmployeeImportJob
+    """
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job = job
+
+    def run(self):
+        job = self.job
+        try:
+            run_import(job)
+            job.status = "completed"
+        except Exception as error:
+            logger.exception("Employee import %s failed", job.pk)
+            job.status = "failed"
+            job.message = str(error)
+        finally:
+            job.finished_at = timezone.now()
+            job.save()
+            connection.close()
+
+
+def start_import(job):
+    EmployeeImportThread(job).start()
@@ -0,0 +1,212 @@
+"""
+employee/methods/org_chart.py
+
+Organisation chart served one level at a time.
+
+The chart shows a manager with the first ORG_CHART_PAGE_SIZE employees
+reporting to them, each node telling how many employees report to it, and
+the page loads the reports of a node when it is expanded. A page of reports
+is read with two queries, whatever the size of the organisation, and kept in
+the Django cache in a compact form (ids, names, positions, avatars and
+report counts) for ORG_CHART_TIMEOUT seconds.
+
+The cached pages of a manager carry a version of their own, moved by
+org_chart_changed() for the managers whose pages show a change:
+
+- the manager of an employee whose name, avatar or position changed
+- the former and the new manager of an employee who moved, with the
+  managers above them whose pages show their report counts
+- the manager of a deleted work information and the manager above them
+
+The pages of the other managers stay cached. Rebuilding the reporting
+hierarchy moves the version of the whole chart.
+"""
+
+import logging
+from datetime import datetime
+from itertools import chain
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Count, F
+from django.templatetags.static import static
+from django.utils.translation import gettext as _
+
+from employee.models import Employee, EmployeeWorkInformation
+from horilla.horilla_settings import ORG_CHART_PAGE_SIZE, ORG_CHART_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "horilla_org_chart"
+
+VERSION_KEY = f"{KEY_PREFIX}:version"
+
+NODE_FIELDS = (
+    "id",
+    "employee_first_name",
+    "employee_last_name",
+    "employee_work_info__job_position_id__job_position",
+    "employee_profile",
+)
+
+
+def chart_version(key=VERSION_KEY):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def manager_version_key(manager_id) -> str:
+    return f"{VERSION_KEY}:{manager_id}"
+
+
+def org_chart_changed(manager_ids=None):
+    """
+    Move the pages of the managers to a new version, the whole chart when no
+    managers are given
+    """
+    if manager_ids is None:
+        keys = [VERSION_KEY]
+    else:
+        keys = [
+            manager_version_key(manager_id)
+            for manager_id in set(manager_ids)
+            if manager_id is not None
+        ]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(datetime.now().timestamp() * 1000), None)
+        except Exception:
+            logger.warning("Could not update the organisation chart", exc_info=True)
+
+
+def reports_changed(manager_ids):
+    """
+    The reports of the managers changed, move their pages and the pages of
+    the managers above them showing their report counts
+    """
+    manager_ids = set(manager_ids) - {None}
+    if not manager_ids:
+        return
+    org_chart_changed(
+        manager_ids.union(
+            EmployeeWorkInformation._base_manager.filter(
+                employee_id__in=manager_ids
+            ).values_list("reporting_manager_id", flat=True)
+        )
+    )
+
+
+def employees_changed(employee_ids):
+    """
+    Move the pages of the managers of the employees, and the pages showing
+    their report counts as the employees may have left or joined them
+    """
+    org_chart_changed(
+        chain.from_iterable(
+            EmployeeWorkInformation._base_manager.filter(
+                employee_id__in=employee_ids
+            ).values_list(
+                "reporting_manager_id",
+                "reporting_manager_id__employee_work_info__reporting_manager_id",
+            )
+        )
+    )
+
+
+def report_counts(employee_ids) -> dict:
+    """
+    Number of active employees reporting to each of the employees
+    """
+    return dict(
+        Employee.objects.filter(
+            is_active=True,
+            employee_work_info__reporting_manager_id__in=employee_ids,
+        )
+        .exclude(employee_work_info__reporting_manager_id=F("id"))
+        .values_list("employee_work_info__reporting_manager_id")
+        .annotate(count=Count("id"))
+    )
+
+
+def read_reports(manager_id, offset) -> dict:
+    rows = list(
+        Employee.objects.filter(
+            is_active=True, employee_work_info__reporting_manager_id=manager_id
+        )
+        .exclude(id=manager_id)
+        .order_by("employee_first_name", "employee_last_name", "id")
+        .values_list(*NODE_FIELDS)[offset : offset + ORG_CHART_PAGE_SIZE + 1]
+    )
+    more = len(rows) > ORG_CHART_PAGE_SIZE
+    rows = rows[:ORG_CHART_PAGE_SIZE]
+    counts = report_counts([row[0] for row in rows])
+    return {
+        "nodes": [row + (counts.get(row[0], 0),) for row in rows],
+        "next_offset": offset + ORG_CHART_PAGE_SIZE if more else None,
+    }
+
+
+def reports_page(manager_id, offset=0, company=None) -> dict:
+    """
+    Compact nodes of the employees reporting to the manager from offset,
+    with the offset of the next page when more follow
+    """
+    version = chart_version(manager_version_key(manager_id))
+    key = f"{KEY_PREFIX}:{chart_version()}:{manager_id}:{version}:{company}:{offset}"
+    page = cache.get(key)
+    if page is None:
+        page = read_reports(manager_id, offset)
+        cache.set(key, page, ORG_CHART_TIMEOUT)
+    return page
+
+
+def avatar_url(profile) -> str:
+    if profile:
+        return default_storage.url(profile)
+    return static("images/ui/default_avatar.jpg")
+
+
+def chart_node(employee_id, first_name, last_name, position, profile, reports):
+    """
+    Node of the chart plugin, the reports are loaded when it is expanded
+    """
+    node = {
+        "id": employee_id,
+        "name": f"{first_name} {last_name}" if last_name else first_name,
+        "title": position or _("Not set"),
+        "avatar": avatar_url(profile),
+        "child_count": reports,
+    }
+    if not reports:
+        node["className"] = "middle-level"
+    return node
+
+
+def chart_reports(manager_id, offset=0, company=None) -> dict:
+    page = reports_page(manager_id, offset, company)
+    return {
+        "children": [chart_node(*node) for node in page["nodes"]],
+        "next_offset": page["next_offset"],
+    }
+
+
+def chart_root(manager, company=None) -> dict:
+    """
+    Node of the manager with the first page of their reports
+    """
+    reports = chart_reports(manager.id, company=company)
+    node = chart_node(
+        manager.id,
+        manager.employee_first_name,
+        manager.employee_last_name,
+        getattr(manager.get_job_position(), "job_position", None),
+        manager.employee_profile.name,
+        report_counts([manager.id]).get(manager.id, 0),
+    )
+    node.update(reports)
+    return node
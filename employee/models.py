@@ -5,7 +5,7 @@ This module is used to register models for employee app
 
 """
 
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 
 from django.apps import apps
 from django.conf import settings
@@ -13,8 +13,9 @@ from django.contrib.auth.models import Permission, User
 from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage
 from django.db import models
+from django.db.models.functions import Coalesce, Concat
 from django.db.models.query import QuerySet
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.templatetags.static import static
 from django.utils.translation import gettext as _
@@ -31,9 +32,8 @@ from base.models import (
     WorkType,
     validate_time_format,
 )
-from employee.methods.duration_methods import format_time, strtime_seconds
 from horilla import horilla_middlewares
-from horilla.methods import get_horilla_model_class
+from horilla.methods import db_expression, get_horilla_model_class
 from horilla.models import HorillaModel, has_xss
 from horilla_audit.methods import get_diff
 from horilla_audit.models import HorillaAuditInfo, HorillaAuditLog
@@ -48,6 +48,42 @@ def reporting_manager_validator(value):
     return value
 
 
+def full_name_expression(prefix=""):
+    """
+    Database expression of Employee.get_full_name
+    """
+    first_name = models.F(f"{prefix}employee_first_name")
+    last_name = models.F(f"{prefix}employee_last_name")
+    return models.Case(
+        models.When(
+            models.Q(**{f"{prefix}employee_last_name__isnull": True})
+            | models.Q(**{f"{prefix}employee_last_name": ""}),
+            then=first_name,
+        ),
+        default=Concat(first_name, models.Value(" "), last_name),
+        output_field=models.CharField(),
+    )
+
+
+def employee_str_expression(prefix=""):
+    """
+    Database expression of Employee.__str__
+    """
+    return Concat(
+        models.F(f"{prefix}employee_first_name"),
+        models.Value(" "),
+        Coalesce(models.F(f"{prefix}employee_last_name"), models.Value("")),
+        models.Value(" "),
+        models.Case(
+            models.When(**{f"{prefix}badge_id__isnull": True}, then=models.Value("")),
+            default=Concat(
+                models.Value("("), models.F(f"{prefix}badge_id"), models.Value(")")
+            ),
+        ),
+        output_field=models.CharField(),
+    )
+
+
 class Employee(models.Model):
     """
     Employee model
@@ -149,6 +185,7 @@ class Employee(models.Model):
             return self.dob.strftime("%d %b")
         return None
 
+    @db_expression(full_name_expression)
     def get_full_name(self):
         """
         Method will return employee full name
@@ -280,42 +317,9 @@ class Employee(models.Model):
         This method is used to the employees current day shift status
         """
         if apps.is_installed("attendance"):
-            today = datetime.today()
-            yesterday = today - timedelta(days=1)
-            today_attendance = None
-            yesterday_attendance = None
-            attendances = list(
-                self.employee_attendances.filter(
-                    attendance_date__in=[yesterday, today]
-                ).order_by("attendance_date")
-            )
+            from attendance.methods.presence import forecasted_at_work
 
-            if len(attendances) == 1:
-                yesterday_attendance, today_attendance = attendances[0], None
-            elif len(attendances) == 2:
-                yesterday_attendance, today_attendance = attendances
-            else:
-                yesterday_attendance, today_attendance = None, None
-
-            attendance = today_attendance
-            if not today_attendance:
-                attendance = yesterday_attendance
-            minimum_hour_seconds = strtime_seconds(
-                getattr(attendance, "minimum_hour", "0")
-            )
-            at_work = 0
-            forecasted_pending_hours = 0
-            if attendance:
-                at_work = attendance.get_at_work_from_activities()
-            forecasted_pending_hours = max(0, (minimum_hour_seconds - at_work))
-
-            return {
-                "forecasted_at_work": format_time(at_work),
-                "forecasted_pending_hours": format_time(forecasted_pending_hours),
-                "forecasted_at_work_seconds": at_work,
-                "forecasted_pending_hours_seconds": forecasted_pending_hours,
-                "has_attendance": attendance is not None,
-            }
+            return forecasted_at_work(self.pk)
         else:
             return {}
 
@@ -428,6 +432,7 @@ class Employee(models.Model):
                 pass
             return related_models_dict
 
+    @db_expression(employee_str_expression)
     def __str__(self) -> str:
         last_name = (
             self.employee_last_name if self.employee_last_name is not None else ""
@@ -440,24 +445,9 @@ class Employee(models.Model):
         This method is used to check if the user is in the list of online users.
         """
         if apps.is_installed("attendance"):
-            Attendance = get_horilla_model_class("attendance", "attendance")
-            request = getattr(horilla_middlewares._thread_locals, "request", None)
-
-            if request is not None:
-                if (
-                    not hasattr(request, "working_employees")
-                    or request.working_employees is None
-                ):
-                    today = datetime.now().date()
-                    yesterday = today - timedelta(days=1)
-                    working_employees = Attendance.objects.filter(
-                        attendance_date__gte=yesterday,
-                        attendance_date__lte=today,
-                        attendance_clock_out_date__isnull=True,
-                    ).values_list("employee_id", flat=True)
-                    setattr(request, "working_employees", working_employees)
-                working_employees = request.working_employees
-                return self.pk in working_employees
+            from attendance.methods.presence import is_online
+
+            return is_online(self.pk)
         return False
 
     class Meta:
@@ -510,6 +500,11 @@ class Employee(models.Model):
         :param manager: Employee object who is the reporting manager.
         :return: QuerySet of Employee objects.
         """
+        from employee.methods.hierarchy import subordinate_ids
+        from horilla.horilla_apps import NESTED_SUBORDINATE_VISIBILITY
+
+        if NESTED_SUBORDINATE_VISIBILITY:
+            return Employee.objects.filter(id__in=subordinate_ids(self))
         subordinates = Employee.objects.filter(
             employee_work_info__reporting_manager_id=self
         )
@@ -718,6 +713,73 @@ class EmployeeWorkInformation(models.Model):
         return self
 
 
+class ReportingHierarchy(models.Model):
+    """
+    Closure table of the reporting chain, a row for each employee and every
+    manager above them with the number of levels between, the employee
+    itself at depth 0 (see employee.methods.hierarchy)
+    """
+
+    ancestor_id = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="hierarchy_descendants"
+    )
+    descendant_id = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name="hierarchy_ancestors"
+    )
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("ancestor_id", "descendant_id")
+        indexes = [models.Index(fields=["descendant_id", "depth"])]
+
+    def __str__(self) -> str:
+        return f"{self.ancestor_id_id} > {self.descendant_id_id} ({self.depth})"
+
+
+@receiver(post_save, sender=EmployeeWorkInformation)
+def reporting_hierarchy_post_save(sender, instance, **kwargs):
+    """
+    Move the employee and their subordinates when the reporting manager changes
+    """
+    from employee.methods.hierarchy import sync_hierarchy
+
+    if instance.employee_id_id is not None:
+        sync_hierarchy([instance.employee_id_id])
+
+
+@receiver(post_delete, sender=EmployeeWorkInformation)
+def reporting_hierarchy_post_delete(sender, instance, **kwargs):
+    """
+    Detach the employee and their subordinates from the former managers
+    """
+    from employee.methods.hierarchy import detach_employee
+
+    if instance.employee_id_id is not None:
+        detach_employee(instance.employee_id_id)
+
+
+@receiver(post_save, sender=Employee)
+def org_chart_employee_post_save(sender, instance, created, **kwargs):
+    """
+    Show the name, avatar and active status changes on the chart, the
+    position and manager changes are shown by sync_hierarchy()
+    """
+    from employee.methods.org_chart import employees_changed
+
+    if not created:
+        employees_changed([instance.pk])
+
+
+@receiver(post_delete, sender=EmployeeWorkInformation)
+def org_chart_work_info_post_delete(sender, instance, **kwargs):
+    """
+    Remove the employee from the page of their former manager
+    """
+    from employee.methods.org_chart import reports_changed
+
+    reports_changed([instance.reporting_manager_id_id])
+
+
 class EmployeeBankDetails(HorillaModel):
     """
     EmployeeBankDetails model
@@ -954,6 +1016,65 @@ class DisciplinaryAction(HorillaModel):
         ordering = ["-id"]
 
 
+class DisciplinaryTransition(models.Model):
+    """
+    Login block or unblock of an employee due by a disciplinary action,
+    applied by the scheduler once due (see employee.methods.disciplinary)
+    """
+
+    disciplinary_action_id = models.ForeignKey(
+        DisciplinaryAction, on_delete=models.CASCADE, related_name="transitions"
+    )
+    employee_id = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    block = models.BooleanField(default=True)
+    due_at = models.DateTimeField()
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["processed_at", "due_at"])]
+
+    def __str__(self) -> str:
+        state = "block" if self.block else "unblock"
+        return f"{self.employee_id} {state} at {self.due_at}"
+
+
+@receiver(post_save, sender=DisciplinaryAction)
+def disciplinary_transitions_post_save(sender, instance, **kwargs):
+    """
+    Schedule the login block and unblock of the employees of the action
+    """
+    from employee.methods.disciplinary import schedule_transitions
+
+    schedule_transitions(instance)
+
+
+@receiver(m2m_changed, sender=DisciplinaryAction.employee_id.through)
+def disciplinary_transitions_m2m_changed(sender, instance, action, **kwargs):
+    """
+    Schedule the block and unblock again when employees are added or removed
+    """
+    from employee.methods.disciplinary import schedule_transitions
+
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(
+        instance, DisciplinaryAction
+    ):
+        schedule_transitions(instance)
+
+
+@receiver(post_save, sender=Actiontype)
+def disciplinary_transitions_action_type(sender, instance, created, **kwargs):
+    """
+    Schedule the actions of the type again when its type or block changes
+    """
+    from employee.methods.disciplinary import schedule_transitions
+
+    if not created:
+        for disciplinary_action in DisciplinaryAction._base_manager.filter(
+            action=instance
+        ):
+            schedule_transitions(disciplinary_action)
+
+
 class EmployeeGeneralSetting(HorillaModel):
     """
     EmployeeGeneralSetting
@@ -973,6 +1094,52 @@ class ProfileEditFeature(HorillaModel):
     objects = models.Manager()
 
 
+class EmployeeImportJob(models.Model):
+    """
+    Employee import running in the background (see
+    employee.methods.import_engine)
+    """
+
+    choice_status = [
+        ("queued", trans("Queued")),
+        ("running", trans("Running")),
+        ("completed", trans("Completed")),
+        ("failed", trans("Failed")),
+    ]
+    choice_layout = [
+        ("work_info", trans("Work information")),
+        ("employee", trans("Employee")),
+    ]
+
+    file = models.FileField(upload_to="employee/imports")
+    layout = models.CharField(max_length=10, choices=choice_layout, default="work_info")
+    error_file = models.FileField(upload_to="employee/imports", null=True, blank=True)
+    status = models.CharField(max_length=10, choices=choice_status, default="queued")
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.file.name} ({self.status})"
+
+    def progress(self) -> int:
+        """
+        Percentage of the rows processed
+        """
+        if self.status == "completed":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.processed_rows * 100 / self.total_rows), 99)
+
+
 from accessibility.accessibility import ACCESSBILITY_FEATURE
 
 ACCESSBILITY_FEATURE.append(("gender_chart", "Can view Gender Chart"))
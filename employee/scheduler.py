@@ -1,134 +1,56 @@
 import datetime
+import logging
 import sys
-from datetime import timedelta
+import time
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
+logger = logging.getLogger(__name__)
+
 
 def update_experience():
     from employee.models import EmployeeWorkInformation
 
     """
-    This scheduled task to trigger the experience calculator
-    to update the employee work experience
+    This scheduled task updates the work experience of the active employees
+    from their joining date, saving only the changed rows in batches without
+    the history of the model
     """
-    queryset = EmployeeWorkInformation.objects.filter(employee_id__is_active=True)
-    for instance in queryset:
-        instance.experience_calculator()
-    return
+    started = time.monotonic()
+    today = datetime.date.today()
+    changed = []
+    for work_info_id, date_joining, experience in (
+        EmployeeWorkInformation._base_manager.filter(
+            employee_id__is_active=True, date_joining__isnull=False
+        )
+        .values_list("id", "date_joining", "experience")
+        .iterator(chunk_size=2000)
+    ):
+        # same as EmployeeWorkInformation.experience_calculator()
+        new_experience = (today - date_joining).days / 365.0
+        if new_experience != experience:
+            changed.append(
+                EmployeeWorkInformation(id=work_info_id, experience=new_experience)
+            )
+    EmployeeWorkInformation._base_manager.bulk_update(
+        changed, ["experience"], batch_size=999
+    )
+    logger.info(
+        "Updated the experience of %s employees in %.2f seconds",
+        len(changed),
+        time.monotonic() - started,
+    )
+    return len(changed)
 
 
 def block_unblock_disciplinary():
     """
-    This scheduled task to trigger the Disciplinary action and take the suspens
+    This scheduled task blocks and unblocks the login of the employees under
+    a suspension or dismissal when their scheduled transitions are due
     """
-    from base.models import EmployeeShiftSchedule
-    from employee.models import DisciplinaryAction
-    from employee.policies import employee_account_block_unblock
-
-    dis_action = DisciplinaryAction.objects.all()
-    for dis in dis_action:
-
-        if dis.action.block_option:
-            if dis.action.action_type == "suspension":
-                if dis.days:
-                    day = dis.days
-                    end_date = dis.start_date + timedelta(days=day)
-                    if (
-                        datetime.date.today() >= dis.start_date
-                        or datetime.date.today() >= end_date
-                    ):
-                        if datetime.date.today() >= dis.start_date:
-                            r = False
-                        if datetime.date.today() >= end_date:
-                            r = True
-
-                        employees = dis.employee_id.all()
-                        for emp in employees:
-                            employee_account_block_unblock(emp_id=emp.id, result=r)
-
-                if dis.hours:
-                    hour_str = dis.hours + ":00"
-                    if hour_str > "00:00:00":
-
-                        # Checking the date of action date.
-                        if datetime.date.today() >= dis.start_date:
-
-                            employees = dis.employee_id.all()
-                            for emp in employees:
-
-                                # Taking the shift of employee for taking the work start time
-                                shift = emp.employee_work_info.shift_id
-                                shift_detail = EmployeeShiftSchedule.objects.filter(
-                                    shift_id=shift
-                                )
-                                for shi in shift_detail:
-                                    today = datetime.datetime.today()
-                                    day_of_week = today.weekday()
-
-                                    # List of weekday names
-                                    weekday_names = [
-                                        "monday",
-                                        "tuesday",
-                                        "wednesday",
-                                        "thursday",
-                                        "friday",
-                                        "saturday",
-                                        "sunday",
-                                    ]
-                                    if weekday_names[day_of_week] == shi.day.day:
-
-                                        st_time = shi.start_time
-
-                                        hour_time = datetime.datetime.strptime(
-                                            hour_str, "%H:%M:%S"
-                                        ).time()
-
-                                        time1 = st_time
-                                        time2 = hour_time
-
-                                        # Convert them to datetime objects
-                                        datetime1 = datetime.datetime.combine(
-                                            datetime.date.today(), time1
-                                        )
-                                        datetime2 = datetime.datetime.combine(
-                                            datetime.date.today(), time2
-                                        )
-
-                                        # Add the datetime objects
-                                        result_datetime = (
-                                            datetime1
-                                            + datetime.timedelta(
-                                                hours=datetime2.hour,
-                                                minutes=datetime2.minute,
-                                                seconds=datetime2.second,
-                                            )
-                                        )
-
-                                        # Extract the time component from the result
-                                        result_time = result_datetime.time()
-
-                                        # Get the current time
-                                        current_time = datetime.datetime.now().time()
-
-                                        # Check if the current time matches st_time
-                                        if current_time >= st_time:
-                                            r = False
-                                        if current_time >= result_time:
-                                            r = True
-
-                                    employee_account_block_unblock(
-                                        emp_id=emp.id, result=r
-                                    )
-
-            if dis.action.action_type == "dismissal":
-                if datetime.date.today() >= dis.start_date:
-                    if datetime.date.today() >= dis.start_date:
-                        r = False
-                    employees = dis.employee_id.all()
-                    for emp in employees:
-                        employee_account_block_unblock(emp_id=emp.id, result=r)
+    from employee.methods.disciplinary import process_due_transitions
 
+    process_due_transitions()
     return
 
 
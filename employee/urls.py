@@ -168,6 +168,16 @@ urlpatterns = [
     path("employee-import", views.employee_import, name="employee-import"),
     path("employee-export", views.employee_export, name="employee-export"),
     path("work-info-import", views.work_info_import, name="work-info-import"),
+    path(
+        "work-info-import-status/<int:job_id>/",
+        views.work_info_import_status,
+        name="work-info-import-status",
+    ),
+    path(
+        "work-info-import-errors/<int:job_id>/",
+        views.work_info_import_errors,
+        name="work-info-import-errors",
+    ),
     path(
         "work-info-import-file",
         views.work_info_import_file,
@@ -339,6 +349,11 @@ urlpatterns = [
         name="document-delete",
     ),
     path("organisation-chart/", views.organisation_chart, name="organisation-chart"),
+    path(
+        "organisation-chart-reports/<int:employee_id>/",
+        views.organisation_chart_reports,
+        name="organisation-chart-reports",
+    ),
     path("delete-policies", policies.delete_policies, name="delete-policies"),
     path(
         "disciplinary-actions/",
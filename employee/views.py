@@ -16,7 +16,6 @@ import calendar
 import json
 import operator
 import os
-import threading
 from datetime import date, datetime, timedelta
 from urllib.parse import parse_qs
 
@@ -25,13 +24,18 @@ from django.apps import apps
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.db.models import F, ProtectedError
 from django.db.models.query import QuerySet
 from django.forms import DateInput, Select
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -41,8 +45,6 @@ from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_http_methods
 
 from accessibility.decorators import enter_if_accessible
-from accessibility.methods import update_employee_accessibility_cache
-from accessibility.middlewares import ACCESSIBILITY_CACHE_USER_KEYS
 from accessibility.models import DefaultAccessibility
 from base.forms import ModelForm
 from base.methods import (
@@ -64,7 +66,6 @@ from base.models import (
     ShiftRequest,
     WorkTypeRequest,
 )
-from base.views import generate_error_report
 from employee.filters import DocumentRequestFilter, EmployeeFilter, EmployeeReGroup
 from employee.forms import (
     BonusPointAddForm,
@@ -81,27 +82,21 @@ from employee.forms import (
     EmployeeWorkInformationUpdateForm,
     excel_columns,
 )
-from employee.methods.methods import (
-    bulk_create_department_import,
-    bulk_create_employee_import,
-    bulk_create_employee_types,
-    bulk_create_job_position_import,
-    bulk_create_job_role_import,
-    bulk_create_shifts,
-    bulk_create_user_import,
-    bulk_create_work_info_import,
-    bulk_create_work_types,
-    error_data_template,
-    get_ordered_badge_ids,
-    process_employee_records,
-    set_initial_password,
-    valid_import_file_headers,
+from employee.methods.hierarchy import sync_hierarchy
+from employee.methods.import_engine import (
+    EMPLOYEE_LAYOUT_COLUMNS,
+    file_extension,
+    read_header,
+    start_import,
 )
+from employee.methods.methods import get_ordered_badge_ids, valid_import_file_headers
+from employee.methods.org_chart import chart_reports, chart_root
 from employee.models import (
     BonusPoint,
     Employee,
     EmployeeBankDetails,
     EmployeeGeneralSetting,
+    EmployeeImportJob,
     EmployeeNote,
     EmployeeTag,
     EmployeeWorkInformation,
@@ -290,13 +285,6 @@ def profile_edit_access(request, emp_id):
             else:
                 accessibility.employees.add(employee)
 
-            user_cache_key = ACCESSIBILITY_CACHE_USER_KEYS.get(
-                employees.first().employee_user_id.id, None
-            )
-            if user_cache_key:
-                cache.delete(user_cache_key[-1])
-                update_employee_accessibility_cache(user_cache_key[-1], employee)
-
     return HttpResponseRedirect(request.META.get("HTTP_REFERER", "/"))
 
 
@@ -1314,6 +1302,8 @@ def save_employee_bulk_update(request):
                     )
                     value = dict_value.get(parts[-1])
                     employee_queryset.update(**{parts[-1]: value})
+                    if parts[-1] == "reporting_manager_id":
+                        sync_hierarchy(int(pk) for pk in employee_list)
                 elif parts[0] == "employee_bank_details":
                     for id in employee_list:
 
@@ -2094,9 +2084,14 @@ def replace_employee(request, emp_id):
                     field_name == "reporting_manager_id"
                     and str(emp_id) != replace_emp_id
                 ):
-                    reporting_manager = EmployeeWorkInformation.objects.filter(
+                    reporting_managed = EmployeeWorkInformation.objects.filter(
                         reporting_manager_id=emp_id
-                    ).update(reporting_manager_id=replace_emp)
+                    )
+                    employee_ids = list(
+                        reporting_managed.values_list("employee_id", flat=True)
+                    )
+                    reporting_managed.update(reporting_manager_id=replace_emp)
+                    sync_hierarchy(employee_ids)
                 elif (
                     apps.is_installed("recruitment")
                     and field_name == "recruitment_managers"
@@ -2403,51 +2398,34 @@ def employee_import(request):
     """
     if request.method == "POST":
         file = request.FILES["file"]
-        # Read the Excel file into a Pandas DataFrame
-        data_frame = pd.read_excel(file)
-        # Convert the DataFrame to a list of dictionaries
-        employee_dicts = data_frame.to_dict("records")
-        # Create or update Employee objects from the list of dictionaries
-        error_list = []
-        for employee_dict in employee_dicts:
-            try:
-                phone = employee_dict["phone"]
-                email = employee_dict["email"]
-                employee_full_name = employee_dict["employee_full_name"]
-                existing_user = User.objects.filter(username=email).first()
-                if existing_user is None:
-                    employee_first_name = employee_full_name
-                    employee_last_name = ""
-                    if " " in employee_full_name:
-                        (
-                            employee_first_name,
-                            employee_last_name,
-                        ) = employee_full_name.split(" ", 1)
-
-                    user = User.objects.create_user(
-                        username=email,
-                        email=email,
-                        password=str(phone).strip(),
-                        is_superuser=False,
-                    )
-                    employee = Employee()
-                    employee.employee_user_id = user
-                    employee.employee_first_name = employee_first_name
-                    employee.employee_last_name = employee_last_name
-                    employee.email = email
-                    employee.phone = phone
-                    employee.save()
-            except Exception:
-                error_list.append(employee_dict)
-        return HttpResponse(
-            """
-    <div class='alert-success p-3 border-rounded'>
-        Employee data has been imported successfully.
+        extension = file_extension(file.name)
+        if extension not in ["csv", "xls", "xlsx"]:
+            return HttpResponse(
+                """
+    <div class='alert-danger p-3 border-rounded'>
+        Unsupported file format. Please upload a CSV or Excel file.
     </div>
 
     """
+            )
+        columns = read_header(file, extension).columns
+        missing_keys = [key for key in EMPLOYEE_LAYOUT_COLUMNS if key not in columns]
+        if missing_keys:
+            return HttpResponse(
+                f"""
+    <div class='alert-danger p-3 border-rounded'>
+        These required headers are missing in the uploaded file: {", ".join(missing_keys)}
+    </div>
+
+    """
+            )
+        file.seek(0)
+        job = EmployeeImportJob.objects.create(
+            file=file, created_by=request.user, layout="employee"
         )
-    data_frame = pd.DataFrame(columns=["employee_full_name", "email", "phone"])
+        start_import(job)
+        return render(request, "employee/import_progress.html", {"job": job})
+    data_frame = pd.DataFrame(columns=EMPLOYEE_LAYOUT_COLUMNS)
     # Export the DataFrame to an Excel file
     response = HttpResponse(content_type="application/ms-excel")
     response["Content-Disposition"] = 'attachment; filename="employee_template.xlsx"'
@@ -2548,76 +2526,31 @@ def work_info_import(request):
                 {"error_message": error_message},
             )
 
-        file_extension = file.name.split(".")[-1].lower()
+        extension = file_extension(file.name)
+        if extension not in ["csv", "xls", "xlsx"]:
+            error_message = _(
+                "Unsupported file format. Please upload a CSV or Excel file."
+            )
+            return render(
+                request,
+                "employee/employee_import.html",
+                {"error_message": error_message},
+            )
 
         try:
-            if file_extension == "csv":
-                data_frame = pd.read_csv(file)
-            elif file_extension in ["xls", "xlsx"]:
-                data_frame = pd.read_excel(file)
-            else:
-
-                error_message = _(
-                    "Unsupported file format. Please upload a CSV or Excel file."
-                )
-                return render(
-                    request,
-                    "employee/employee_import.html",
-                    {"error_message": error_message},
-                )
-
-            valid, error_message = valid_import_file_headers(data_frame)
+            valid, error_message = valid_import_file_headers(
+                read_header(file, extension)
+            )
             if not valid:
                 return render(
                     request,
                     "employee/employee_import.html",
                     {"error_message": error_message},
                 )
-            success_list, error_list, created_count = process_employee_records(
-                data_frame
-            )
-            if success_list:
-                try:
-                    users = bulk_create_user_import(success_list)
-                    employees = bulk_create_employee_import(success_list)
-                    bulk_create_department_import(success_list)
-                    bulk_create_job_position_import(success_list)
-                    bulk_create_job_role_import(success_list)
-                    bulk_create_work_types(success_list)
-                    bulk_create_shifts(success_list)
-                    bulk_create_employee_types(success_list)
-                    bulk_create_work_info_import(success_list)
-                    thread = threading.Thread(
-                        target=set_initial_password, args=(employees,)
-                    )
-                    thread.start()
-
-                except Exception as e:
-                    messages.error(request, _("Error Occured {}").format(e))
-                    logger.error(e)
-
-            path_info = (
-                generate_error_report(
-                    error_list, error_data_template, "EmployeesImportError.xlsx"
-                )
-                if error_list
-                else None
-            )
-
-            context = {
-                "created_count": created_count,
-                "total_count": created_count + len(error_list),
-                "error_count": len(error_list),
-                "model": _("Employees"),
-                "path_info": path_info,
-            }
-            result = render_to_string("import_popup.html", context)
-            result += """
-                        <script>
-                            $('#objectCreateModalTarget').css('max-width', '410px');
-                        </script>
-                    """
-            return HttpResponse(result)
+            file.seek(0)
+            job = EmployeeImportJob.objects.create(file=file, created_by=request.user)
+            start_import(job)
+            return render(request, "employee/import_progress.html", {"job": job})
         except Exception as e:
             messages.error(
                 request,
@@ -2632,6 +2565,59 @@ def work_info_import(request):
     )
 
 
+@login_required
+@hx_request_required
+@permission_required("employee.add_employee")
+def work_info_import_status(request, job_id):
+    """
+    Progress dialog of an employee import, the result dialog once it ended
+    """
+    job = get_object_or_404(EmployeeImportJob, id=job_id, created_by=request.user)
+    if job.status == "failed":
+        return render(
+            request,
+            "employee/employee_import.html",
+            {"error_message": _("Import failed: {}").format(job.message)},
+        )
+    if job.status != "completed":
+        return render(request, "employee/import_progress.html", {"job": job})
+
+    context = {
+        "created_count": job.created_count,
+        "total_count": job.created_count + job.error_count,
+        "error_count": job.error_count,
+        "model": _("Employees"),
+        "path_info": (
+            reverse("work-info-import-errors", args=[job.id])[1:]
+            if job.error_file
+            else None
+        ),
+    }
+    result = render_to_string("import_popup.html", context)
+    result += """
+                <script>
+                    $('#objectCreateModalTarget').css('max-width', '410px');
+                </script>
+            """
+    return HttpResponse(result)
+
+
+@login_required
+@permission_required("employee.add_employee")
+def work_info_import_errors(request, job_id):
+    """
+    Download the rows an employee import rejected
+    """
+    job = get_object_or_404(EmployeeImportJob, id=job_id, created_by=request.user)
+    if not job.error_file:
+        raise Http404
+    return FileResponse(
+        job.error_file.open("rb"),
+        as_attachment=True,
+        filename="EmployeesImportError.xlsx",
+    )
+
+
 @login_required
 @manager_can_enter("employee.view_employee")
 def work_info_export(request):
@@ -3325,108 +3311,50 @@ def organisation_chart(request):
         ).distinct()
     else:
         reporting_managers = Employee.objects.filter(
-            is_active=True,
-            reporting_manager__isnull=False,
+            is_active=True, reporting_manager__isnull=False
         ).distinct()
 
     # Iterate through the queryset and add reporting manager id and name to the dictionary
     result_dict = {item.id: item.get_full_name() for item in reporting_managers}
 
-    entered_req_managers = []
-
-    # Helper function to recursively create the hierarchy structure
-    def create_hierarchy(manager):
-        """
-        Hierarchy generator method
-        """
-        nodes = []
-        # check the manager is a reporting manager if yes, store it into entered_req_managers
-        if manager.id in result_dict.keys():
-            entered_req_managers.append(manager)
-        # filter the subordinates
-        subordinates = Employee.objects.filter(
-            is_active=True, employee_work_info__reporting_manager_id=manager
-        ).exclude(id=manager.id)
-
-        # itrating through subordinates
-        for employee in subordinates:
-            if employee in entered_req_managers:
-                continue
-            # check the employee is a reporting manager if yes,remove className store
-            # it into entered_req_managers
-            if employee.id in result_dict.keys():
-                nodes.append(
-                    {
-                        "name": employee.get_full_name(),
-                        "title": getattr(
-                            employee.get_job_position(), "job_position", _("Not set")
-                        ),
-                        "children": create_hierarchy(employee),
-                    }
-                )
-                entered_req_managers.append(employee)
-
-            else:
-                nodes.append(
-                    {
-                        "name": employee.get_full_name(),
-                        "title": getattr(
-                            employee.get_job_position(), "job_position", _("Not set")
-                        ),
-                        "className": "middle-level",
-                        "children": create_hierarchy(employee),
-                    }
-                )
-        return nodes
-
-    selected_company = request.session.get("selected_company")
-    if (
-        request.GET.get("employee_work_info__company_id") == None
-        and selected_company != "all"
-    ):
-        reporting_managers = Employee.objects.filter(
-            is_active=True,
-            reporting_manager__isnull=False,
-            employee_work_info__company_id=selected_company,
-        ).distinct()
-    else:
-        reporting_managers = Employee.objects.filter(
-            is_active=True, reporting_manager__isnull=False
-        ).distinct()
-
     manager = request.user.employee_get
 
     if len(reporting_managers) == 0:
         new_dict = {}
     else:
         new_dict = {reporting_managers[0].id: _("My view"), **result_dict}
-    # POST method is used to change the reporting manager
+    # POST method is used to change the reporting manager, the chart shows
+    # the manager with their first reports and loads the others on expand
     if request.method == "POST":
         if request.POST.get("manager_id"):
             manager_id = int(request.POST.get("manager_id"))
             manager = Employee.objects.get(id=manager_id)
-        node = {
-            "name": manager.get_full_name(),
-            "title": getattr(manager.get_job_position(), "job_position", _("Not set")),
-            "children": create_hierarchy(manager),
-        }
-        context = {"act_datasource": node}
+        context = {"act_datasource": chart_root(manager, selected_company)}
         return render(request, "organisation_chart/chart.html", context=context)
 
-    node = {
-        "name": manager.get_full_name(),
-        "title": getattr(manager.get_job_position(), "job_position", _("Not set")),
-        "children": create_hierarchy(manager),
-    }
-
     context = {
-        "act_datasource": node,
         "reporting_manager_dict": new_dict,
         "act_manager_id": manager.id,
     }
     return render(request, "organisation_chart/org_chart.html", context=context)
 
 
+@login_required
+def organisation_chart_reports(request, employee_id):
+    """
+    This method is used to load the reports of an organisation chart node
+    """
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+    except ValueError:
+        offset = 0
+    return JsonResponse(
+        chart_reports(
+            employee_id, offset, request.session.get("selected_company")
+        )
+    )
+
+
 @login_required
 @permission_required("payroll.add_encashmentgeneralsettings")
 def encashment_condition_create(request):
@@ -15,10 +15,12 @@ from base.backends import ConfiguredEmailBackend
 from base.models import Department
 from employee.models import EmployeeWorkInformation
 from helpdesk.models import Ticket
+from horilla.profiler import profiled_thread
 
 logger = logging.getLogger(__name__)
 
 
+@profiled_thread
 class TicketSendThread(Thread):
     """
     MailSend
@@ -130,6 +132,7 @@ class TicketSendThread(Thread):
         return
 
 
+@profiled_thread
 class AddAssigneeThread(Thread):
     """
     MailSend
@@ -189,6 +192,7 @@ class AddAssigneeThread(Thread):
                 )
 
 
+@profiled_thread
 class RemoveAssigneeThread(Thread):
     """
     MailSend
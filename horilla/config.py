@@ -4,12 +4,16 @@ horilla/config.py
 Horilla app configurations
 """
 
+import hashlib
 import importlib
+import json
 import logging
+from functools import lru_cache
 
 from django.apps import apps
 from django.conf import settings
 from django.contrib.auth.context_processors import PermWrapper
+from django.core.cache import cache
 
 from horilla.horilla_apps import SIDEBARS
 
@@ -27,62 +31,94 @@ def import_method(accessibility):
     return accessibility_method
 
 
-ALL_MENUS = {}
+# Seconds a built sidebar stays cached. Accessibility rules which are not part
+# of the fingerprint (stage/task/project managers ...) refresh after this.
+SIDEBAR_CACHE_TIMEOUT = 300
+
+
+@lru_cache(maxsize=None)
+def get_sidebar_module(app):
+    """
+    Import the sidebar module of the app once per process
+    """
+    try:
+        return importlib.import_module(app + ".sidebar")
+    except Exception as e:
+        logger.error(e)
+        return None
+
+
+def sidebar_fingerprint(request):
+    """
+    Hash of everything the sidebar accessibility mostly depends on: the user's
+    permissions, accessibility grants version, reporting manager status and the
+    selected company.
+    """
+    from accessibility.methods import get_accessibility_version
+    from base.templatetags.basefilters import is_reportingmanager
+
+    user = request.user
+    inputs = [
+        user.pk,
+        user.is_superuser,
+        request.session.get("selected_company"),
+        sorted(user.get_all_permissions()),
+        get_accessibility_version(),
+        is_reportingmanager(user),
+    ]
+    return hashlib.sha1(
+        json.dumps(inputs, default=str).encode(), usedforsecurity=False
+    ).hexdigest()
 
 
 def sidebar(request):
-
-    base_dir_apps = get_apps_in_base_dir()
-
-    if not request.user.is_anonymous:
-        request.MENUS = []
-        MENUS = request.MENUS
-
-        for app in base_dir_apps:
-            if apps.is_installed(app):
-                try:
-                    sidebar = importlib.import_module(app + ".sidebar")
-
-                except Exception as e:
-                    logger.error(e)
-                    continue
-
-                if sidebar:
-                    accessibility = None
-                    if getattr(sidebar, "ACCESSIBILITY", None):
-                        accessibility = import_method(sidebar.ACCESSIBILITY)
-
-                    if not accessibility or accessibility(
-                        request,
-                        sidebar.MENU,
-                        PermWrapper(request.user),
-                    ):
-                        MENU = {}
-                        MENU["menu"] = sidebar.MENU
-                        MENU["app"] = app
-                        MENU["img_src"] = sidebar.IMG_SRC
-                        MENU["submenu"] = []
-                        MENUS.append(MENU)
-                        for submenu in sidebar.SUBMENUS:
-
-                            accessibility = None
-
-                            if submenu.get("accessibility"):
-                                accessibility = import_method(submenu["accessibility"])
-                            redirect: str = submenu["redirect"]
-                            redirect = redirect.split("?")
-                            submenu["redirect"] = redirect[0]
-
-                            if not accessibility or accessibility(
-                                request,
-                                submenu,
-                                PermWrapper(request.user),
-                            ):
-                                MENU["submenu"].append(submenu)
-        ALL_MENUS[request.session.session_key] = MENUS
+    """
+    Build the sidebar menus accessible for the request user
+    """
+    menus = []
+    user_perms = PermWrapper(request.user)
+    for app in get_apps_in_base_dir():
+        if not apps.is_installed(app):
+            continue
+        sidebar = get_sidebar_module(app)
+        if not sidebar:
+            continue
+
+        accessibility = None
+        if getattr(sidebar, "ACCESSIBILITY", None):
+            accessibility = import_method(sidebar.ACCESSIBILITY)
+
+        if accessibility and not accessibility(request, sidebar.MENU, user_perms):
+            continue
+
+        menu = {
+            "menu": sidebar.MENU,
+            "app": app,
+            "img_src": sidebar.IMG_SRC,
+            "submenu": [],
+        }
+        menus.append(menu)
+        for submenu in sidebar.SUBMENUS:
+            accessibility = None
+            if submenu.get("accessibility"):
+                accessibility = import_method(submenu["accessibility"])
+            # the callbacks may add a query string to the redirect of the copy
+            entry = {**submenu, "redirect": submenu["redirect"].split("?")[0]}
+            if not accessibility or accessibility(request, entry, user_perms):
+                menu["submenu"].append(entry)
+    return menus
 
 
 def get_MENUS(request):
-    ALL_MENUS[request.session.session_key] = []
-    sidebar(request)
-    return {"sidebar": ALL_MENUS.get(request.session.session_key)}
+    """
+    Context processor for the sidebar, served from the cache when the user's
+    fingerprint did not change
+    """
+    if request.user.is_anonymous:
+        return {"sidebar": []}
+    cache_key = "horilla_sidebar_" + sidebar_fingerprint(request)
+    menus = cache.get(cache_key)
+    if menus is None:
+        menus = sidebar(request)
+        cache.set(cache_key, menus, SIDEBAR_CACHE_TIMEOUT)
+    return {"sidebar": menus}
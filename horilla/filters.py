@@ -12,7 +12,7 @@ from django_filters.filterset import FILTER_FOR_DBFIELD_DEFAULTS
 
 from base.methods import reload_queryset
 from horilla.horilla_middlewares import _thread_locals
-from horilla_views.templatetags.generic_template_filters import getattribute
+from horilla_views.search import search_queryset
 
 FILTER_FOR_DBFIELD_DEFAULTS[models.ForeignKey][
     "filter_class"
@@ -125,10 +125,4 @@ class HorillaFilterSet(FilterSet):
         search_field = self.data.get("search_field")
         if not search_field:
             search_field = self.filters[name].field_name
-
-        def _icontains(instance):
-            result = str(getattribute(instance, search_field)).lower()
-            return instance.pk if search in result else None
-
-        ids = list(filter(None, map(_icontains, queryset)))
-        return queryset.filter(id__in=ids)
+        return search_queryset(queryset, search_field, search)
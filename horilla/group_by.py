@@ -1,63 +1,154 @@
-from django.core.paginator import Paginator
-from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+"""
+group_by.py
+
+Group by engine of the list views.
+
+The groups and their record counts come from one aggregate query paginated
+in SQL, then the current page of records of every visible group is fetched
+with a ROW_NUMBER() window partitioned by the group, so a grouped view costs
+a fixed handful of queries whatever the number of groups and records.
+"""
+
+from operator import attrgetter
+
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import Count, F, Max, Min, Q, Window
+from django.db.models.functions import RowNumber
 
 from horilla.horilla_middlewares import _thread_locals
 
+# records per page inside a group
+GROUP_RECORDS_PER_PAGE = 10
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator of rows already sliced in SQL, the count comes from the
+    aggregate query
+    """
+
+    def __init__(self, count, per_page):
+        super().__init__([], per_page)
+        self.count = count
+
+    def page_number(self, number):
+        try:
+            return self.validate_number(number)
+        except PageNotAnInteger:
+            return 1
+        except EmptyPage:
+            return self.num_pages
 
-def record_queryset_paginator(request, queryset, page_name, records_per_page=10):
+
+def relation_path(model, group_field):
+    """
+    The group field path by field names when it ends on a related model, the
+    groups are then the related instances, else None
+    """
+    names = []
+    for part in group_field.split("__"):
+        field = model._meta.get_field(part)
+        if not field.is_relation or field.related_model is None:
+            return None
+        names.append(field.name)
+        model = field.related_model
+    return "__".join(names) if names else None
+
+
+def records_ordering(queryset):
     """
-    Returns paginated results with safe ordering.
+    Ordering of the records inside a group, the primary key breaks the ties
     """
-    # 803
+    from horilla_views.navigation import query_ordering
+
     if not queryset.ordered:
         if hasattr(queryset.model, "created_at"):
             queryset = queryset.order_by("-created_at")
         else:
             queryset = queryset.order_by("-id")
+    return [
+        expression.desc() if descending else expression.asc()
+        for expression, descending, _ in query_ordering(queryset)
+    ]
 
-    page = request.GET.get(page_name)
-    paginator = Paginator(queryset, records_per_page)
-    return paginator.get_page(page)
 
+def aggregate_groups(queryset, group_field, relation):
+    """
+    Values query of the groups with their record count. Related groups follow
+    the ordering of the related model, value groups the order of their first
+    record in the queryset.
+    """
+    from horilla_views.navigation import query_ordering
 
-def generate_groups(request, groupers, queryset, page_name, group_field, is_fk_field):
+    groups = queryset.order_by().values(group_field)
+    if relation:
+        groups = groups.filter(**{f"{group_field}__isnull": False})
+    groups = groups.annotate(group_count=Count("pk", distinct=queryset.query.distinct))
+    if relation:
+        # ordering by the relation name follows the related model Meta.ordering
+        return groups.order_by(relation, f"{relation}__pk")
+    if not queryset.ordered:
+        return groups.annotate(group_first=Min("pk")).order_by("group_first")
+    expression, descending, _ = query_ordering(queryset)[0]
+    groups = groups.annotate(group_first_pk=Min("pk"))
+    if descending:
+        return groups.annotate(group_first=Max(expression)).order_by(
+            F("group_first").desc(), "group_first_pk"
+        )
+    return groups.annotate(group_first=Min(expression)).order_by(
+        "group_first", "group_first_pk"
+    )
+
+
+def group_records(queryset, group_field, pages, records_per_page):
     """
-    groups generating method
+    Fetch the requested page of records of every group, one window query per
+    distinct page number. `pages` maps the group keys to their page number.
     """
-    groups = []
-    if is_fk_field:
-        for grouper in groupers:
-            group_queryset = queryset.filter(**{group_field: grouper.id})
-            # to avoid zero records groupings
-            if group_queryset.count():
-                group_info = {
-                    "grouper": grouper,
-                    "list": record_queryset_paginator(
-                        request,
-                        group_queryset,
-                        f"dynamic_page_{page_name}{grouper.id}",
-                    ),
-                    "dynamic_name": f"dynamic_page_{page_name}{grouper.id}",
-                }
-                groups.append(group_info)
+    if queryset.query.distinct:
+        # the window numbers the rows, not the distinct records
+        base = queryset.model._base_manager.filter(
+            pk__in=queryset.order_by().values("pk")
+        ).prefetch_related(*queryset._prefetch_related_lookups)
+        base.query.select_related = queryset.query.select_related
     else:
-        for grouper in groupers:
-            group_queryset = queryset.filter(**{group_field: grouper})
-            # to avoid zero records groupings
-            if group_queryset.count():
-                group = {
-                    "grouper": grouper,
-                    "list": record_queryset_paginator(
-                        request,
-                        group_queryset,
-                        f"dynamic_page_{page_name}{grouper}".replace(" ", "_"),
-                    ),
-                    "dynamic_name": f"dynamic_page_{page_name}{grouper}".replace(
-                        " ", "_"
-                    ),
-                }
-                groups.append(group)
-    return groups
+        base = queryset
+    field = None if "__" in group_field else queryset.model._meta.get_field(group_field)
+    if field is not None and field.concrete and not field.many_to_many:
+        group_key = attrgetter(field.attname)
+    else:
+        # converted annotations (dates...) break next to the window filter,
+        # the related keys are plain primary keys
+        base = base.annotate(group_key=F(group_field))
+        group_key = attrgetter("group_key")
+    base = base.annotate(
+        group_row=Window(
+            RowNumber(),
+            partition_by=[F(group_field)],
+            order_by=records_ordering(queryset),
+        ),
+    )
+
+    by_page = {}
+    for key, number in pages.items():
+        by_page.setdefault(number, []).append(key)
+
+    records = {key: [] for key in pages}
+    for number, keys in by_page.items():
+        condition = Q(
+            **{f"{group_field}__in": [key for key in keys if key is not None]}
+        )
+        if None in keys:
+            condition |= Q(**{f"{group_field}__isnull": True})
+        start = (number - 1) * records_per_page
+        rows = base.filter(condition).filter(
+            group_row__gt=start, group_row__lte=start + records_per_page
+        )
+        for instance in rows:
+            records[group_key(instance)].append(instance)
+    for rows in records.values():
+        rows.sort(key=lambda instance: instance.group_row)
+    return records
 
 
 def group_by_queryset(
@@ -71,57 +162,48 @@ def group_by_queryset(
     if get_pagination() != 50:
         records_per_page = get_pagination()
 
-    fields_split = group_field.split("__")
-    splitted = len(fields_split) > 1
-    model = queryset.model
-    is_fk_field = isinstance(
-        getattr(model, group_field, None), ForwardManyToOneDescriptor
-    )
-    model_copy = model
-    field_obj = None
-
     # getting request from the thread locals
     request = getattr(_thread_locals, "request", None)
-    if splitted or is_fk_field:
-        for field in fields_split:
-            field_obj = model_copy._meta.get_field(field)
-            model_copy = field_obj.related_model
-        if model_copy:
-            groupers = model_copy.objects.all()
-            groups = generate_groups(
-                request,
-                groupers,
-                queryset,
-                page_name,
-                group_field,
-                is_fk_field=True,
-            )
-        else:
-            groupers = [
-                item
-                for index, item in enumerate(
-                    queryset.values_list(group_field, flat=True)
-                )
-                if item not in queryset.values_list(group_field, flat=True)[:index]
-            ]
-            groups = generate_groups(
-                request, groupers, queryset, page_name, group_field, is_fk_field=False
-            )
+    query_params = request.GET if request else {}
 
-    else:
-        # making unique | not using set(groupers) due to ordering issue
-        groupers = [
-            item
-            for index, item in enumerate(queryset.values_list(group_field, flat=True))
-            if item not in queryset.values_list(group_field, flat=True)[:index]
-        ]
-        # getting related queryset
-        related_model = queryset.model._meta.get_field(group_field).related_model
-        if related_model:
-            groupers = related_model.objects.filter(id__in=groupers)
-        groups = generate_groups(
-            request, groupers, queryset, page_name, group_field, is_fk_field=False
+    model = queryset.model
+    relation = relation_path(model, group_field)
+    groups = aggregate_groups(queryset, group_field, relation)
+
+    paginator = Paginator(groups, records_per_page)
+    groups_page = paginator.get_page(page)
+    visible = list(groups_page.object_list)
+
+    groupers = {}
+    if relation:
+        related_model = model
+        for part in group_field.split("__"):
+            related_model = related_model._meta.get_field(part).related_model
+        groupers = related_model._base_manager.in_bulk(
+            [group[group_field] for group in visible]
         )
 
-    groups = Paginator(groups, records_per_page)
-    return groups.get_page(page)
+    group_pages = {}
+    pages = {}
+    for group in visible:
+        key = group[group_field]
+        grouper = groupers.get(key) if relation else key
+        if relation:
+            dynamic_name = f"dynamic_page_{page_name}{key}"
+        else:
+            dynamic_name = f"dynamic_page_{page_name}{grouper}".replace(" ", "_")
+        group_paginator = CountedPaginator(group["group_count"], GROUP_RECORDS_PER_PAGE)
+        number = group_paginator.page_number(query_params.get(dynamic_name))
+        group_pages[key] = (grouper, dynamic_name, group_paginator, number)
+        pages[key] = number
+
+    records = group_records(queryset, group_field, pages, GROUP_RECORDS_PER_PAGE)
+    group_list = [
+        {
+            "grouper": grouper,
+            "list": Page(records[key], number, group_paginator),
+            "dynamic_name": dynamic_name,
+        }
+        for key, (grouper, dynamic_name, group_paginator, number) in group_pages.items()
+    ]
+    return Page(group_list, groups_page.number, paginator)
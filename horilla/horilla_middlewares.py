@@ -9,14 +9,19 @@ import threading
 from django.http import HttpResponseNotAllowed
 from django.shortcuts import render
 
+from horilla.horilla_settings import PROFILER, QUERY_INSPECTOR
 from horilla.settings import MIDDLEWARE
 
+if QUERY_INSPECTOR:
+    # first, so the session, auth and company middlewares are measured too
+    MIDDLEWARE.insert(0, "horilla.query_inspector.QueryInspectorMiddleware")
 MIDDLEWARE.append("base.middleware.CompanyMiddleware")
 MIDDLEWARE.append("horilla.horilla_middlewares.MethodNotAllowedMiddleware")
 MIDDLEWARE.append("horilla.horilla_middlewares.ThreadLocalMiddleware")
-MIDDLEWARE.append("accessibility.middlewares.AccessibilityMiddleware")
 MIDDLEWARE.append("base.middleware.ForcePasswordChangeMiddleware")
 MIDDLEWARE.append("base.middleware.TwoFactorAuthMiddleware")
+if PROFILER:
+    MIDDLEWARE.append("horilla.profiler.ProfilerMiddleware")
 _thread_locals = threading.local()
 
 
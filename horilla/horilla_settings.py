@@ -1,3 +1,5 @@
+import os
+
 from django.core.files.storage import FileSystemStorage
 
 from horilla import settings
@@ -167,3 +169,134 @@ def load_ldap_settings():
         return DEFAULT_LDAP_CONFIG  # Return default on error
 
     return DEFAULT_LDAP_CONFIG  # Fallback in case of an issue
+
+
+"""
+QUERY_INSPECTOR: bool
+
+Enables horilla.query_inspector.QueryInspectorMiddleware, which records the
+queries of every request and logs N+1 patterns and query budget overruns.
+"""
+QUERY_INSPECTOR = settings.env.bool("QUERY_INSPECTOR", default=False)
+
+# Number of request reports kept for the /query-inspector/ endpoint
+QUERY_INSPECTOR_HISTORY = 200
+
+# A statement repeated this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 10
+
+# Maximum number of queries per URL name
+QUERY_BUDGETS = {
+    "employee-view": 80,
+    "attendance-view": 80,
+    "request-view": 80,
+    "view-payslip": 80,
+}
+
+
+"""
+PROFILER: bool
+
+Enables horilla.profiler.ProfilerMiddleware. Staff users can then profile a
+request with the X-Horilla-Profile header or the ?_profile=1 query flag and
+requests slower than PROFILER_REQUEST_THRESHOLD_MS (0 disables it) are
+profiled automatically.
+"""
+PROFILER = settings.env.bool("PROFILER", default=False)
+PROFILER_REQUEST_THRESHOLD_MS = settings.env.int(
+    "PROFILER_REQUEST_THRESHOLD_MS", default=0
+)
+
+# Profile the APScheduler jobs and the profiled Thread subclasses, keeping the
+# runs slower than PROFILER_JOB_THRESHOLD_MS
+PROFILER_BACKGROUND = settings.env.bool("PROFILER_BACKGROUND", default=False)
+PROFILER_JOB_THRESHOLD_MS = settings.env.int("PROFILER_JOB_THRESHOLD_MS", default=0)
+
+# Time between two stack samples
+PROFILER_INTERVAL_MS = 5
+
+# Long running threads are flushed to a new profile every PROFILER_MAX_SECONDS
+PROFILER_MAX_SECONDS = 300
+
+# Profiles are stored under MEDIA in this directory, pruned by age and count
+PROFILER_DIRECTORY = "profiles"
+PROFILER_RETENTION_DAYS = 7
+PROFILER_MAX_FILES = 500
+
+
+"""
+VIEW_STATE_CACHE: str
+
+Alias of the Django cache holding the state of the generic views between the
+requests of a session (see horilla_views.view_state). The state is only seen
+by every worker when the cache backend is shared by them, configure one with
+the CACHE_URL setting when running several workers.
+"""
+VIEW_STATE_CACHE = settings.env("VIEW_STATE_CACHE", default="default")
+
+# Lifetime of a view state entry without being written again
+VIEW_STATE_TIMEOUT = 60 * 60 * 12
+
+# Serialised entries larger than this are not stored
+VIEW_STATE_MAX_BYTES = 256 * 1024
+
+# Entries kept per session, the least recently written are dropped
+VIEW_STATE_SESSION_ENTRIES = 100
+
+# Serialised entries larger than this are compressed
+VIEW_STATE_COMPRESS_BYTES = 1024
+
+
+"""
+ROW_CACHE: str
+
+Alias of the Django cache holding the rendered rows of the generic list and
+card views setting cache_rows (see horilla_views.row_cache).
+"""
+ROW_CACHE = settings.env("ROW_CACHE", default="default")
+
+# Lifetime of a cached row, bounds how long values read outside of the row
+# and its loaded relations can show stale
+ROW_CACHE_TIMEOUT = 60 * 5
+
+
+"""
+EMPLOYEE_IMPORT_WORKERS: int
+
+Processes validating the rows of an employee import file and hashing their
+initial passwords (see employee.methods.import_engine), 1 validates them in
+the import thread.
+"""
+EMPLOYEE_IMPORT_WORKERS = settings.env.int(
+    "EMPLOYEE_IMPORT_WORKERS", default=min(os.cpu_count() or 1, 4)
+)
+
+# Rows of the import file read, validated and saved together
+EMPLOYEE_IMPORT_CHUNK_SIZE = 1000
+
+
+"""
+PRESENCE_CACHE: str
+
+Alias of the Django cache holding the registry of the employees at work (see
+attendance.methods.presence), shared by the workers when the backend is.
+"""
+PRESENCE_CACHE = settings.env("PRESENCE_CACHE", default="default")
+
+# Lifetime of a presence snapshot or entry, bounds how long attendance changes
+# made without saving the models take to show
+PRESENCE_TIMEOUT = 60 * 10
+
+
+"""
+ORG_CHART_PAGE_SIZE: int
+
+Employees reporting to a manager shown when their node of the organisation
+chart is expanded, the next ones load from a "more" node (see
+employee.methods.org_chart).
+"""
+ORG_CHART_PAGE_SIZE = settings.env.int("ORG_CHART_PAGE_SIZE", default=50)
+
+# Lifetime of a cached page of the organisation chart, bounds how long changes
+# made without saving the models take to show
+ORG_CHART_TIMEOUT = 60 * 60
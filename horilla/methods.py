@@ -3,6 +3,8 @@ import importlib
 
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Case, F, Value, When
 
 from horilla.horilla_settings import APP_URLS, DYNAMIC_URL_PATTERNS
 
@@ -24,6 +26,165 @@ def get_horilla_model_class(app_label, model):
     return model_class
 
 
+def db_expression(expression):
+    """
+    Decorator declaring the database expression computing the same value as a
+    model method or property, so generic views can sort and search on it in SQL.
+
+    `expression` is called with the lookup prefix of the model, e.g.
+    "employee_id__" when the method is reached through the employee_id relation.
+
+    Usage:
+        @db_expression(
+            lambda prefix: Concat(F(f"{prefix}first_name"), F(f"{prefix}last_name"))
+        )
+        def get_full_name(self):
+            ...
+    """
+
+    def decorator(method):
+        method.db_expression = expression
+        return method
+
+    return decorator
+
+
+def resolve_db_expression(model, path):
+    """
+    Resolve a "__" separated attribute path of the model, as used in the
+    generic view columns, to a database expression.
+
+    Concrete fields resolve to F(), methods and properties to their
+    @db_expression and a trailing foreign key to the expression of the related
+    model __str__ when declared, else its primary key. Returns None when the
+    path crosses a multi valued relation or an attribute without expression.
+    """
+    parts = path.split("__")
+    prefix = ""
+    for index, part in enumerate(parts):
+        is_last = index == len(parts) - 1
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            attribute = getattr(model, part, None)
+            if isinstance(attribute, property):
+                attribute = attribute.fget
+            expression = getattr(attribute, "db_expression", None)
+            return expression(prefix) if expression and is_last else None
+
+        if not field.is_relation:
+            return F(prefix + part) if is_last else None
+        if field.many_to_many or field.one_to_many:
+            return None
+        model = field.related_model
+        prefix = f"{prefix}{part}__"
+        if is_last:
+            expression = getattr(model.__str__, "db_expression", None)
+            if expression is None:
+                return F(f"{prefix}pk")
+            # keep the empty relations NULL, string functions would not
+            return Case(
+                When(**{f"{prefix}isnull": True}, then=Value(None)),
+                default=expression(prefix),
+            )
+    return None
+
+
+def related_lookups(*lookups):
+    """
+    Decorator declaring the relations a model method or property reads, so
+    generic views rendering it as a column can load them with the page.
+
+    Usage:
+        @related_lookups("managers")
+        def get_managers(self):
+            return "<br>".join(str(employee) for employee in self.managers.all())
+    """
+
+    def decorator(method):
+        method.related_lookups = lookups
+        return method
+
+    return decorator
+
+
+def search_relation(relation):
+    """
+    Decorator declaring that the text of a model method or property lists the
+    records of a many to many relation, so generic searches on it filter the
+    relation on the @db_expression of the related model __str__ and follow the
+    changes of the related records.
+
+    Usage:
+        @search_relation("members")
+        @related_lookups("members")
+        def get_members(self):
+            return "<br>".join(str(employee) for employee in self.members.all())
+    """
+
+    def decorator(method):
+        method.search_relation = relation
+        return method
+
+    return decorator
+
+
+def get_attribute_field(model, attribute):
+    """
+    Field or relation reached by the attribute of the model instances, reverse
+    relations are reached by their accessor name instead of their query name
+    """
+    for relation in model._meta.related_objects:
+        if relation.get_accessor_name() == attribute:
+            return relation
+    try:
+        field = model._meta.get_field(attribute)
+    except FieldDoesNotExist:
+        return None
+    return None if field.auto_created and not field.concrete else field
+
+
+def resolve_related_lookups(model, path, depth=0):
+    """
+    Resolve a "__" separated attribute path of the model, as used in the
+    generic view columns, to the (select_related, prefetch_related) lookups
+    loading every relation it crosses.
+
+    Forward and one to one relations are joined, the path is prefetched from
+    the first multi valued relation on. Methods and properties end the path
+    and contribute their @related_lookups.
+    """
+    select_related, prefetch_related = set(), set()
+    parts = path.split("__")
+    walked = []
+    many = False
+    for part in parts:
+        field = get_attribute_field(model, part)
+        if field is None:
+            attribute = getattr(model, part, None)
+            if isinstance(attribute, property):
+                attribute = attribute.fget
+            if depth < 3:
+                for lookup in getattr(attribute, "related_lookups", ()):
+                    select, prefetch = resolve_related_lookups(model, lookup, depth + 1)
+                    prefix = "__".join(walked + [""])
+                    if many:
+                        prefetch, select = prefetch | select, set()
+                    select_related |= {prefix + item for item in select}
+                    prefetch_related |= {prefix + item for item in prefetch}
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        walked.append(part)
+        many = many or field.many_to_many or field.one_to_many
+        if many:
+            prefetch_related.add("__".join(walked))
+        else:
+            select_related.add("__".join(walked))
+        model = field.related_model
+    return select_related, prefetch_related
+
+
 def dynamic_attr(obj, attribute_path):
     """
     Retrieves the value of a nested attribute from a related object dynamically.
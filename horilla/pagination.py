@@ -0,0 +1,157 @@
+"""
+pagination.py
+
+Count free pagination of large lists.
+
+The Django paginator runs an exact COUNT(*) over the filtered joins on every
+page, which on the large tables costs more than the page itself.
+CountFreePaginator fetches one row more than the page instead, telling whether
+a next page exists, and only counts the rows when the template reads
+paginator.count or paginator.num_pages. That count comes from fast_count():
+the planner estimate for large unfiltered tables, otherwise the exact count
+cached for a short while.
+"""
+
+import hashlib
+from functools import cached_property
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections, models
+from django.utils.translation import gettext_lazy as _
+
+# Unfiltered tables estimated larger than this are not counted exactly
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Lifetime of a cached exact count
+COUNT_CACHE_TIMEOUT = 60
+
+
+def table_estimate(model, using):
+    """
+    Planner estimate of the rows of the model table, None when the database
+    does not provide one
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 for a table never analysed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+def is_unfiltered(queryset):
+    query = queryset.query
+    return (
+        not query.where
+        and not query.distinct
+        and not query.combinator
+        and not query.is_sliced
+    )
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f"{queryset.db}{sql}{params}".encode()).hexdigest()
+    return f"horilla_count:{digest}"
+
+
+def fast_count(queryset):
+    """
+    Number of rows of the queryset, estimated for large unfiltered tables,
+    otherwise exact and cached for COUNT_CACHE_TIMEOUT seconds
+    """
+    if not isinstance(queryset, models.QuerySet):
+        return len(queryset)
+    if is_unfiltered(queryset):
+        estimate = table_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+    key = count_cache_key(queryset.order_by())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CountFreePage(Page):
+    """
+    Page knowing whether a next page exists without the row count
+    """
+
+    def __init__(self, object_list, number, paginator, next_page_exists):
+        super().__init__(object_list, number, paginator)
+        self.next_page_exists = next_page_exists
+
+    def has_next(self):
+        return self.next_page_exists
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+
+class CountFreePaginator(Paginator):
+    """
+    Paginator fetching per_page + 1 rows instead of counting them, count and
+    num_pages are computed with fast_count() only when read
+    """
+
+    count_free = True
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return CountFreePage(
+            rows[: self.per_page], number, self, len(rows) > self.per_page
+        )
+
+    def get_page(self, number):
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            # past the end, count exactly to fall back on the last page
+            if isinstance(self.object_list, models.QuerySet):
+                self.__dict__["count"] = self.object_list.count()
+            else:
+                self.__dict__["count"] = len(self.object_list)
+            self.__dict__.pop("num_pages", None)
+            return self.page(max(self.num_pages, 1))
+
+    @cached_property
+    def count(self):
+        return fast_count(self.object_list)
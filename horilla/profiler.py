@@ -0,0 +1,344 @@
+"""
+profiler.py
+
+Low overhead sampling profiler for requests and background work.
+
+A single daemon thread samples the stack of every profiled thread each
+PROFILER_INTERVAL_MS and aggregates them as collapsed stacks, the
+"frame;frame;frame count" format read by flamegraph.pl and speedscope.
+Profiles are written under MEDIA/PROFILER_DIRECTORY and listed to staff users
+on /profiler/.
+
+Profiled work:
+    - requests, through ProfilerMiddleware (PROFILER=True)
+    - APScheduler jobs, through profile_scheduler_jobs() (PROFILER_BACKGROUND)
+    - Thread subclasses decorated with @profiled_thread (PROFILER_BACKGROUND)
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from functools import lru_cache, wraps
+
+from apscheduler.executors.base import run_job
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.utils import timezone
+
+from horilla.horilla_settings import (
+    PROFILER_BACKGROUND,
+    PROFILER_DIRECTORY,
+    PROFILER_INTERVAL_MS,
+    PROFILER_JOB_THRESHOLD_MS,
+    PROFILER_MAX_FILES,
+    PROFILER_MAX_SECONDS,
+    PROFILER_REQUEST_THRESHOLD_MS,
+    PROFILER_RETENTION_DAYS,
+)
+
+PROFILE_HEADER = "X-Horilla-Profile"
+PROFILE_QUERY_FLAG = "_profile"
+
+# <timestamp>_<kind>_<label>_<duration>ms_<uid>.collapsed
+PROFILE_NAME = re.compile(
+    r"^(?P<timestamp>\d{8}-\d{6})_(?P<kind>[a-z]+)_(?P<label>.*)_"
+    r"(?P<duration>\d+)ms_(?P<uid>[0-9a-f]+)\.collapsed$"
+)
+
+
+@lru_cache(maxsize=None)
+def frame_label(code):
+    """
+    Flame graph label of a code object, paths are relative to the project or
+    to site-packages
+    """
+    filename = code.co_filename
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir) :].lstrip(os.sep)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages", 1)[1].lstrip(os.sep)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class Profile:
+    """
+    Collapsed stacks sampled from one thread
+    """
+
+    def __init__(self, label, kind, thread_id):
+        self.label = label
+        self.kind = kind
+        self.thread_id = thread_id
+        self.file_name = None
+        self.reset()
+
+    def reset(self):
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+        self.started_at = timezone.now()
+        self.ended = None
+
+    @property
+    def duration_ms(self):
+        return ((self.ended or time.perf_counter()) - self.started) * 1000
+
+    def sample(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(labels))] += 1
+
+    def split(self):
+        """
+        Move the samples taken so far to a new profile
+        """
+        part = Profile(self.label, self.kind, self.thread_id)
+        part.stacks, part.started, part.started_at = (
+            self.stacks,
+            self.started,
+            self.started_at,
+        )
+        part.ended = time.perf_counter()
+        self.reset()
+        return part
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.items())
+
+
+class Sampler:
+    """
+    Daemon thread sampling the registered profiles, idle while there is none
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def is_profiling(self, thread_id):
+        return thread_id in self.profiles
+
+    def start(self, profile):
+        with self.lock:
+            self.profiles[profile.thread_id] = profile
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="horilla-profiler", daemon=True
+                )
+                self.thread.start()
+            self.wakeup.set()
+
+    def stop(self, profile):
+        with self.lock:
+            self.profiles.pop(profile.thread_id, None)
+
+    def run(self):
+        while True:
+            expired = []
+            with self.lock:
+                if not self.profiles:
+                    self.wakeup.clear()
+                else:
+                    frames = sys._current_frames()
+                    for profile in self.profiles.values():
+                        frame = frames.get(profile.thread_id)
+                        if frame is not None:
+                            profile.sample(frame)
+                        if profile.duration_ms >= PROFILER_MAX_SECONDS * 1000:
+                            # long running threads are written in slices
+                            expired.append(profile.split())
+                    del frames, frame
+            if not self.profiles:
+                self.wakeup.wait()
+                continue
+            for profile in expired:
+                save_profile(profile)
+            time.sleep(self.interval)
+
+
+sampler = Sampler(PROFILER_INTERVAL_MS / 1000)
+
+
+@contextmanager
+def profile(label, kind, threshold_ms=0):
+    """
+    Sample the current thread during the block and save the profile when the
+    block took at least `threshold_ms`. Nested blocks are part of the outer
+    profile and yield None.
+    """
+    thread_id = threading.get_ident()
+    if sampler.is_profiling(thread_id):
+        yield None
+        return
+
+    current = Profile(label, kind, thread_id)
+    sampler.start(current)
+    try:
+        yield current
+    finally:
+        sampler.stop(current)
+        current.ended = time.perf_counter()
+        if current.duration_ms >= threshold_ms and current.stacks:
+            save_profile(current)
+
+
+def save_profile(profile):
+    """
+    Write the collapsed stacks of the profile and apply the retention limits
+    """
+    label = re.sub(r"[^A-Za-z0-9-]+", "-", profile.label).strip("-")[:80]
+    name = (
+        f"{profile.started_at:%Y%m%d-%H%M%S}_{profile.kind}_{label or 'root'}_"
+        f"{int(profile.duration_ms)}ms_{uuid.uuid4().hex[:8]}.collapsed"
+    )
+    profile.file_name = default_storage.save(
+        f"{PROFILER_DIRECTORY}/{name}", ContentFile(profile.collapsed().encode())
+    )
+    prune_profiles()
+    return profile.file_name
+
+
+def list_profiles():
+    """
+    Stored profiles, newest first
+    """
+    try:
+        _, files = default_storage.listdir(PROFILER_DIRECTORY)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in files:
+        match = PROFILE_NAME.match(name)
+        if match:
+            profiles.append(
+                {
+                    "name": name,
+                    "created_at": datetime.strptime(
+                        match["timestamp"], "%Y%m%d-%H%M%S"
+                    ).replace(tzinfo=dt_timezone.utc),
+                    "kind": match["kind"],
+                    "label": match["label"],
+                    "duration_ms": int(match["duration"]),
+                }
+            )
+    return sorted(profiles, key=lambda item: item["name"], reverse=True)
+
+
+def prune_profiles():
+    """
+    Delete the profiles older than PROFILER_RETENTION_DAYS or beyond the
+    PROFILER_MAX_FILES newest
+    """
+    expire = timezone.now() - timedelta(days=PROFILER_RETENTION_DAYS)
+    for index, item in enumerate(list_profiles()):
+        if index >= PROFILER_MAX_FILES or item["created_at"] < expire:
+            default_storage.delete(f"{PROFILER_DIRECTORY}/{item['name']}")
+
+
+class ProfilerMiddleware:
+    """
+    Profile the requests flagged by a staff user and the slow requests
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        requested = self.is_requested(request)
+        if not requested and not PROFILER_REQUEST_THRESHOLD_MS:
+            return self.get_response(request)
+
+        with profile(
+            f"{request.method} {request.path}",
+            "request",
+            threshold_ms=0 if requested else PROFILER_REQUEST_THRESHOLD_MS,
+        ) as current:
+            response = self.get_response(request)
+        if requested and current is not None and current.file_name:
+            response[PROFILE_HEADER] = current.file_name
+        return response
+
+    def is_requested(self, request):
+        if not (
+            request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_FLAG)
+        ):
+            return False
+        user = getattr(request, "user", None)
+        return bool(user and user.is_authenticated and user.is_staff)
+
+
+def profiled_run_job(job, jobstore_alias, run_times, logger_name):
+    """
+    APScheduler run_job profiling the job
+    """
+    with profile(job.name or job.id, "job", PROFILER_JOB_THRESHOLD_MS):
+        return run_job(job, jobstore_alias, run_times, logger_name)
+
+
+def profile_scheduler_jobs():
+    """
+    Profile the jobs of every APScheduler thread pool executor
+    """
+    from apscheduler.executors import pool
+
+    pool.run_job = profiled_run_job
+
+
+def profiled_thread(cls):
+    """
+    Class decorator profiling the run() of a Thread subclass when
+    PROFILER_BACKGROUND is enabled
+    """
+    if not PROFILER_BACKGROUND:
+        return cls
+    run = cls.run
+
+    @wraps(run)
+    def profiled_run(self):
+        with profile(type(self).__name__, "thread", PROFILER_JOB_THRESHOLD_MS):
+            return run(self)
+
+    cls.run = profiled_run
+    return cls
+
+
+@staff_member_required
+def profile_list(request):
+    """
+    Staff only page listing the stored profiles
+    """
+    return render(request, "profiles.html", {"profiles": list_profiles()})
+
+
+@staff_member_required
+def profile_download(request, name):
+    """
+    Download the collapsed stacks of a profile
+    """
+    if not PROFILE_NAME.match(name):
+        raise Http404
+    path = f"{PROFILER_DIRECTORY}/{name}"
+    if not default_storage.exists(path):
+        raise Http404
+    return FileResponse(
+        default_storage.open(path, "rb"),
+        as_attachment=True,
+        filename=name,
+        content_type="text/plain",
+    )
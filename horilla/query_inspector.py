@@ -0,0 +1,252 @@
+"""
+query_inspector.py
+
+Opt-in per request query budget and N+1 detector.
+
+Enable it with QUERY_INSPECTOR=True in the environment. Every request then
+records its query count, total DB time, duplicated SQL fingerprints and the
+view/template that issued them. The report is written to the
+"horilla.query_inspector" logger as JSON, the latest reports are served to
+staff users on /query-inspector/ and tests can assert query budgets with
+max_queries().
+"""
+
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db import connections
+from django.http import JsonResponse
+from django.template.base import Template
+
+from horilla.horilla_settings import (
+    N_PLUS_ONE_THRESHOLD,
+    QUERY_BUDGETS,
+    QUERY_INSPECTOR_HISTORY,
+)
+
+logger = logging.getLogger("horilla.query_inspector")
+
+REPORTS_CACHE_KEY = "horilla_query_inspector_reports"
+
+# Name of the template being rendered while a query runs
+current_template = ContextVar("horilla_current_template", default=None)
+
+IN_CLAUSE = re.compile(r"IN \((?:%s, )*%s\)")
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def sql_fingerprint(sql):
+    """
+    Normalise the SQL so the same statement with other parameters, literals
+    or IN list length gives the same fingerprint
+    """
+    sql = IN_CLAUSE.sub("IN (...)", sql)
+    return LITERALS.sub("?", sql)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper collecting every query of a block
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "sql": sql,
+                    "time": time.perf_counter() - start,
+                    "template": current_template.get(),
+                }
+            )
+
+    @contextmanager
+    def record(self):
+        """
+        Record the queries of every configured database
+        """
+        with _execute_wrappers(self):
+            yield self
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(query["time"] for query in self.queries)
+
+    def duplicates(self, threshold=2):
+        """
+        Return the fingerprints executed at least `threshold` times, most
+        repeated first
+        """
+        grouped = defaultdict(list)
+        for query in self.queries:
+            grouped[sql_fingerprint(query["sql"])].append(query)
+        duplicates = [
+            {
+                "fingerprint": fingerprint,
+                "count": len(queries),
+                "time_ms": round(sum(query["time"] for query in queries) * 1000, 2),
+                "templates": sorted(
+                    {query["template"] for query in queries if query["template"]}
+                ),
+            }
+            for fingerprint, queries in grouped.items()
+            if len(queries) >= threshold
+        ]
+        return sorted(duplicates, key=lambda item: item["count"], reverse=True)
+
+    def report(self, **extra):
+        """
+        Structured summary of the recorded queries
+        """
+        duplicates = self.duplicates()
+        return {
+            **extra,
+            "query_count": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "duplicates": duplicates,
+            "n_plus_one": [
+                duplicate
+                for duplicate in duplicates
+                if duplicate["count"] >= N_PLUS_ONE_THRESHOLD
+            ],
+        }
+
+
+@contextmanager
+def _execute_wrappers(wrapper):
+    wrapped = []
+    try:
+        for connection in connections.all():
+            connection.execute_wrappers.append(wrapper)
+            wrapped.append(connection)
+        yield
+    finally:
+        for connection in wrapped:
+            connection.execute_wrappers.remove(wrapper)
+
+
+template_render = Template.render
+
+
+def inspected_render(self, context):
+    """
+    Template.render keeping track of the template issuing the queries
+    """
+    token = current_template.set(self.origin.template_name or self.name)
+    try:
+        return template_render(self, context)
+    finally:
+        current_template.reset(token)
+
+
+class QueryInspectorMiddleware:
+    """
+    Middleware recording the queries of each request and flagging N+1
+    patterns and requests over their query budget
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        Template.render = inspected_render
+
+    def __call__(self, request):
+        if request.path.startswith("/query-inspector"):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else None
+        budget = QUERY_BUDGETS.get(view_name)
+        report = recorder.report(
+            path=request.path,
+            method=request.method,
+            status=response.status_code,
+            view=view_name,
+            view_function=match._func_path if match else None,
+            budget=budget,
+            over_budget=budget is not None and recorder.count > budget,
+            user=getattr(getattr(request, "user", None), "pk", None),
+        )
+        store_report(report)
+
+        level = (
+            logging.WARNING
+            if report["over_budget"] or report["n_plus_one"]
+            else logging.INFO
+        )
+        logger.log(level, json.dumps(report, default=str))
+        response["X-Query-Count"] = report["query_count"]
+        response["X-DB-Time-Ms"] = report["db_time_ms"]
+        return response
+
+
+def store_report(report):
+    """
+    Keep the latest QUERY_INSPECTOR_HISTORY reports in the shared cache
+    """
+    reports = cache.get(REPORTS_CACHE_KEY, [])
+    reports.append(report)
+    cache.set(REPORTS_CACHE_KEY, reports[-QUERY_INSPECTOR_HISTORY:], None)
+
+
+@staff_member_required
+def query_inspector_reports(request):
+    """
+    Staff only endpoint listing the latest request reports, newest first.
+    ?n_plus_one=1 or ?over_budget=1 keep only the flagged ones.
+    """
+    reports = list(reversed(cache.get(REPORTS_CACHE_KEY, [])))
+    if request.GET.get("n_plus_one"):
+        reports = [report for report in reports if report["n_plus_one"]]
+    if request.GET.get("over_budget"):
+        reports = [report for report in reports if report["over_budget"]]
+    return JsonResponse({"reports": reports})
+
+
+@contextmanager
+def max_queries(limit, using_budget=None):
+    """
+    Test helper asserting the block runs at most `limit` queries.
+
+    Usage:
+        with max_queries(30):
+            self.client.get(reverse("employee-view"))
+
+        with max_queries(None, using_budget="attendance-view"):
+            ...
+
+    On failure the AssertionError lists the most repeated statements.
+    """
+    if limit is None:
+        limit = QUERY_BUDGETS[using_budget]
+    recorder = QueryRecorder()
+    with recorder.record():
+        yield recorder
+    if recorder.count > limit:
+        details = "\n".join(
+            f"  {duplicate['count']}x {duplicate['fingerprint'][:200]}"
+            for duplicate in recorder.duplicates()[:10]
+        )
+        raise AssertionError(
+            f"{recorder.count} queries executed, the budget is {limit}.\n"
+            f"Most repeated queries:\n{details}"
+        )
@@ -136,6 +136,16 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# The local memory default is not shared by the workers, set CACHE_URL to a
+# shared backend (e.g. rediscache://127.0.0.1:6379/1) when running several.
+
+if env("CACHE_URL", default=None):
+    CACHES = {
+        "default": env.cache(),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -22,6 +22,8 @@ from django.urls import include, path, re_path
 import notifications.urls
 
 from . import settings
+from .profiler import profile_download, profile_list
+from .query_inspector import query_inspector_reports
 
 
 def health_check(request):
@@ -42,6 +44,9 @@ urlpatterns = [
     ),
     path("i18n/", include("django.conf.urls.i18n")),
     path("health/", health_check),
+    path("query-inspector/", query_inspector_reports, name="query-inspector"),
+    path("profiler/", profile_list, name="profile-list"),
+    path("profiler/<str:name>", profile_download, name="profile-download"),
 ]
 
 # if settings.DEBUG:
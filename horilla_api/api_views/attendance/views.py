@@ -12,6 +12,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from attendance.methods.presence import at_work_seconds, not_in_yet, presence_entry
 from attendance.models import Attendance, AttendanceActivity, EmployeeShiftDay
 from attendance.views.clock_in_out import *
 from attendance.views.clock_in_out import clock_out
@@ -724,8 +725,8 @@ class OfflineEmployeesCountView(APIView):
 
     def get(self, request):
         count = (
-            EmployeeFilter({"not_in_yet": date.today()})
-            .qs.exclude(employee_work_info__isnull=True)
+            not_in_yet(EmployeeFilter().qs)
+            .exclude(employee_work_info__isnull=True)
             .filter(is_active=True)
             .count()
         )
@@ -744,8 +745,8 @@ class OfflineEmployeesListView(APIView):
 
     def get(self, request):
         queryset = (
-            EmployeeFilter({"not_in_yet": date.today()})
-            .qs.exclude(employee_work_info__isnull=True)
+            not_in_yet(EmployeeFilter().qs)
+            .exclude(employee_work_info__isnull=True)
             .filter(is_active=True)
         )
         leave_status = self.get_leave_status(queryset)
@@ -821,47 +822,28 @@ class CheckingStatus(APIView):
         return f"{hours:02}:{minutes:02}:{seconds:02}"
 
     def get(self, request):
-        attendance_activity = (
-            AttendanceActivity.objects.filter(employee_id=request.user.employee_get)
-            .order_by("-id")
-            .first()
-        )
-        duration = None
-        work_seconds = request.user.employee_get.get_forecasted_at_work()[
-            "forecasted_at_work_seconds"
-        ]
-        duration = CheckingStatus._format_seconds(int(work_seconds))
+        entry = presence_entry(request.user.employee_get.pk)
+        duration = CheckingStatus._format_seconds(int(at_work_seconds(entry)))
         status = False
         clock_in_time = None
 
-        today = datetime.now()
-        attendance_activity_first = (
-            AttendanceActivity.objects.filter(
-                employee_id=request.user.employee_get, clock_in_date=today
-            )
-            .order_by("in_datetime")
-            .first()
-        )
-        if attendance_activity:
-            try:
-                clock_in_time = attendance_activity_first.clock_in.strftime("%I:%M %p")
-                if attendance_activity.clock_out_date:
-                    status = False
-                else:
-                    status = True
-                    return Response(
-                        {
-                            "status": status,
-                            "duration": duration,
-                            "clock_in": clock_in_time,
-                        },
-                        status=200,
-                    )
-            except:
+        if entry["last_activity_open"] is not None:
+            if entry["first_clock_in_today"] is None:
                 return Response(
                     {"status": status, "duration": duration, "clock_in": clock_in_time},
                     status=200,
                 )
+            clock_in_time = entry["first_clock_in_today"].strftime("%I:%M %p")
+            if entry["last_activity_open"]:
+                status = True
+                return Response(
+                    {
+                        "status": status,
+                        "duration": duration,
+                        "clock_in": clock_in_time,
+                    },
+                    status=200,
+                )
         return Response(
             {"status": status, "duration": duration, "clock_in_time": clock_in_time},
             status=200,
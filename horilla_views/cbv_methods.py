@@ -2,17 +2,18 @@
 horilla/cbv_methods.py
 """
 
-import json
-import types
+import importlib
+import logging
+import re
 import uuid
-from io import BytesIO
+from functools import lru_cache
 from typing import Any
 from urllib.parse import urlencode
-from venv import logger
 
 from django import forms, template
 from django.contrib import messages
-from django.core.cache import cache as CACHE
+from django.core import signing
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.paginator import Page, Paginator
 from django.db import models
 from django.db.models.fields.related import ForeignKey
@@ -31,13 +32,19 @@ from django.utils.functional import lazy
 from django.utils.html import format_html
 from django.utils.safestring import SafeString
 from django.utils.translation import gettext_lazy as _
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
-from openpyxl.utils import get_column_letter
 
 from horilla import settings
 from horilla.horilla_middlewares import _thread_locals
+from horilla.methods import resolve_db_expression, resolve_related_lookups
+from horilla.pagination import CountFreePaginator
 from horilla_views.templatetags.generic_template_filters import getattribute
+from horilla_views.view_state import get_state, set_state
+
+logger = logging.getLogger(__name__)
+
+# {attribute__path} placeholders of the format template filter
+FORMAT_PLACEHOLDER = re.compile(r"{([\w]+)}")
+PLAIN_PATH = re.compile(r"^\w+$")
 
 FIELD_WIDGET_MAP = {
     models.CharField: forms.TextInput(attrs={"class": "oh-input w-100"}),
@@ -298,18 +305,20 @@ def render_template(
     return HttpResponse(rendered_content, status=status).content.decode(decoding)
 
 
-def paginator_qry(qryset, page_number, records_per_page=50):
+def paginator_qry(qryset, page_number, records_per_page=50, count_free=False):
     """
-    This method is used to paginate queryset
+    This method is used to paginate queryset, without counting the records
+    when count_free (see horilla.pagination)
     """
-    if not isinstance(qryset, Page) and not qryset.ordered:
+    if isinstance(qryset, models.QuerySet) and not qryset.ordered:
         qryset = (
             qryset.order_by("-created_at")
             if hasattr(qryset.model, "created_at")
             else qryset.order_by("-id")
         )  # 803
 
-    paginator = Paginator(qryset, records_per_page)
+    paginator_class = CountFreePaginator if count_free else Paginator
+    paginator = paginator_class(qryset, records_per_page)
     qryset = paginator.get_page(page_number)
     return qryset
 
@@ -322,21 +331,79 @@ def get_short_uuid(length: int, prefix: str = "hlv"):
     return prefix + str(uuid_str[:length]).replace("-", "")
 
 
-def update_initial_cache(request: object, cache: dict, view: object):
+# Signed list view tokens used by the fixed export/bulk update endpoints
+VIEW_TOKEN_SALT = "horilla_views.view_token"
+VIEW_TOKEN_MAX_AGE = 60 * 60 * 2
 
-    if cache.get(request.session.session_key + "cbv"):
-        cache.get(request.session.session_key + "cbv").update({view: {}})
-        return
-    cache.set(request.session.session_key + "cbv", {view: {}})
-    return
+
+def _import_path(path: str):
+    module_name, qualname = path.split(":", 1)
+    obj = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _view_class_key(view_class):
+    """
+    Import path of the view class, or for a class defined inside a function,
+    the import path and arguments of its view_factory rebuilding it
+    """
+    view_factory = view_class.__dict__.get("view_factory")
+    if view_factory:
+        factory, args = view_factory
+        return {"factory": factory, "args": list(args)}
+    return f"{view_class.__module__}:{view_class.__qualname__}"
 
 
-class Reverse:
-    reverse: bool = True
-    page: str = ""
+def _load_view_class(key):
+    if isinstance(key, dict):
+        return _import_path(key["factory"])(*key["args"])
+    return _import_path(key)
 
-    def __str__(self) -> str:
-        return str(self.reverse)
+
+def get_view_token(view) -> str:
+    """
+    Signed token identifying the view class, the url kwargs of the render and
+    the user, resolved back with load_view_token
+    """
+    return signing.dumps(
+        {
+            "view": _view_class_key(type(view)),
+            "kwargs": getattr(view, "kwargs", {}),
+            "user": view.request.user.pk,
+        },
+        salt=VIEW_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def load_view_token(request, token: str):
+    """
+    Return the view class and url kwargs of a token issued to the user, None
+    if the token is invalid or expired
+    """
+    try:
+        data = signing.loads(token, salt=VIEW_TOKEN_SALT, max_age=VIEW_TOKEN_MAX_AGE)
+        if data["user"] != request.user.pk:
+            return None
+        return _load_view_class(data["view"]), data["kwargs"]
+    except (
+        signing.BadSignature,
+        KeyError,
+        ImportError,
+        AttributeError,
+        ObjectDoesNotExist,
+    ):
+        return None
+
+
+def update_initial_cache(request: object, view: object):
+
+    state = get_state(request, "cbv", {})
+    state.update({view: {}})
+    set_state(request, "cbv", state)
+    return
 
 
 def getmodelattribute(value: models.Model, attr: str):
@@ -359,85 +426,136 @@ def getmodelattribute(value: models.Model, attr: str):
     return result
 
 
-def sortby(
-    query_dict, queryset, key: str, page: str = "page", is_first_sort: bool = False
-):
+def sortby(query_dict, queryset, key: str):
     """
-    New simplified method to sort the queryset/lists
+    Sort the queryset by the column of query_dict[key].
+
+    The column path is sorted in the database, a leading "-" meaning
+    descending, using the field or the @db_expression of the method behind
+    it. Columns without database expression fall back to python_sortby.
     """
     request = getattr(_thread_locals, "request", None)
     sort_key = query_dict[key]
-    if not CACHE.get(request.session.session_key + "cbvsortby"):
-        CACHE.set(request.session.session_key + "cbvsortby", Reverse())
-        CACHE.get(request.session.session_key + "cbvsortby").page = (
-            "1" if not query_dict.get(page) else query_dict.get(page)
-        )
-    reverse_object = CACHE.get(request.session.session_key + "cbvsortby")
-    reverse = reverse_object.reverse
-    none_ids = []
-    none_queryset = []
-    model = queryset.model
-    model_attr = getmodelattribute(model, sort_key)
-    is_method = isinstance(model_attr, types.FunctionType)
-    if not is_method:
-        none_queryset = queryset.filter(**{f"{sort_key}__isnull": True})
-        none_ids = list(none_queryset.values_list("id", flat=True))
-        queryset = queryset.exclude(id__in=none_ids)
-
-    def _sortby(object):
-        result = getattribute(object, attr=sort_key)
-        if result is None:
-            none_ids.append(object.pk)
-        return result
-
-    order = not reverse
-    current_page = query_dict.get(page)
-    if current_page or is_first_sort:
-        order = not order
-        if reverse_object.page == current_page and not is_first_sort:
-            order = not order
-        reverse_object.page = current_page
+    descending = sort_key.startswith("-")
+    sort_key = sort_key.lstrip("-")
+
+    expression = None
+    if isinstance(queryset, models.QuerySet):
+        expression = resolve_db_expression(queryset.model, sort_key)
+    if expression is None:
+        queryset = python_sortby(queryset, sort_key, descending)
+    elif descending:
+        queryset = queryset.order_by(expression.desc(nulls_first=True), "-pk")
+    else:
+        queryset = queryset.order_by(expression.asc(nulls_last=True), "pk")
+
+    setattr(request, "sort_order", "desc" if descending else "asc")
+    setattr(request, "sort_key", sort_key)
+    return queryset
+
+
+def python_sortby(queryset, sort_key: str, descending: bool = False) -> list:
+    """
+    Fallback sorting the evaluated rows in python, only used for columns
+    without database expression. Declare one with horilla.methods.db_expression
+    to sort the column in SQL.
+    """
+    logger.warning(
+        "Sorting %s in python, declare a db_expression to sort it in SQL", sort_key
+    )
+    values = [
+        (getattribute(instance, attr=sort_key), instance) for instance in queryset
+    ]
+    none_rows = [instance for value, instance in values if value is None]
+    rows = [(value, instance) for value, instance in values if value is not None]
     try:
-        queryset = sorted(queryset, key=_sortby, reverse=order)
+        rows.sort(key=lambda row: row[0], reverse=descending)
     except TypeError:
-        none_queryset = list(queryset.filter(id__in=none_ids))
-        queryset = sorted(queryset.exclude(id__in=none_ids), key=_sortby, reverse=order)
+        rows.sort(key=lambda row: str(row[0]), reverse=descending)
+    rows = [instance for _, instance in rows]
+    return none_rows + rows if descending else rows + none_rows
+
+
+def attribute_paths(*sources) -> list:
+    """
+    Attribute paths read by the rendering of a view: column tuples, plain
+    "__" separated paths and format strings with {placeholders}
+    """
+    paths = []
+    for source in sources:
+        if not source:
+            continue
+        if isinstance(source, (list, tuple)):
+            for item in source:
+                if isinstance(item, (list, tuple)):
+                    paths += [
+                        path for path in item[1:3] if isinstance(path, str) and path
+                    ]
+                elif isinstance(item, dict):
+                    paths += attribute_paths(*item.values())
+                else:
+                    paths += attribute_paths(item)
+        elif isinstance(source, dict):
+            paths += attribute_paths(*source.values())
+        elif isinstance(source, str):
+            placeholders = FORMAT_PLACEHOLDER.findall(source)
+            if placeholders:
+                paths += placeholders
+            elif PLAIN_PATH.match(source):
+                paths.append(source)
+    return paths
 
-    reverse_object.reverse = order
-    if order:
-        order = "asc"
-        queryset = list(queryset) + list(none_queryset)
-    else:
-        queryset = list(none_queryset) + list(queryset)
-        order = "desc"
-    setattr(request, "sort_order", order)
-    setattr(request, "sort_key", sort_key)
-    CACHE.set(request.session.session_key + "cbvsortby", reverse_object)
+
+@lru_cache(maxsize=1024)
+def query_plan(model, paths: tuple) -> tuple:
+    """
+    select_related and prefetch_related lookups loading the relations read by
+    the attribute paths, computed once per model and paths
+    """
+    select_related, prefetch_related = set(), set()
+    for path in paths:
+        select, prefetch = resolve_related_lookups(model, path)
+        select_related |= select
+        prefetch_related |= prefetch
+    return tuple(sorted(select_related)), tuple(sorted(prefetch_related))
+
+
+def plan_queryset(queryset, paths):
+    """
+    Load the relations read by the attribute paths with the queryset, so
+    rendering its rows runs a constant number of queries
+    """
+    if (
+        not isinstance(queryset, models.QuerySet)
+        or queryset.query.combinator
+        or queryset._fields is not None
+    ):
+        return queryset
+    select_related, prefetch_related = query_plan(
+        queryset.model, tuple(sorted(set(paths)))
+    )
+    deferred, _ = queryset.query.deferred_loading
+    if select_related and not deferred:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
     return queryset
 
 
-def update_saved_filter_cache(request, cache):
+def update_saved_filter_cache(request):
     """
-    Method to save filter on cache
+    Method to save filter on the view state
     """
-    if cache.get(request.session.session_key + request.path + "cbv"):
-        cache.get(request.session.session_key + request.path + "cbv").update(
-            {
-                "path": request.path,
-                "query_dict": request.GET,
-                # "request": request,
-            }
-        )
-        return cache
-    cache.set(
-        request.session.session_key + request.path + "cbv",
+    state = get_state(request, request.path + "cbv", {})
+    state.update(
         {
             "path": request.path,
             "query_dict": request.GET,
             # "request": request,
-        },
+        }
     )
-    return cache
+    set_state(request, request.path + "cbv", state)
+    return state
 
 
 def get_nested_field(model_class: models.Model, field_name: str) -> object:
@@ -534,135 +652,3 @@ def flatten_dict(d, parent_key=""):
         else:
             items.append((new_key, v))
     return dict(items)
-
-
-def export_xlsx(json_data, columns, file_name="quick_export"):
-    """
-    Quick export method
-    """
-    top_fields = [col[0] for col in columns if len(col) == 2]
-
-    nested_fields = [
-        col for col in columns if len(col) == 3 and isinstance(col[2], dict)
-    ]
-
-    # Discover dynamic keys for each nested column
-    dynamic_columns = {}
-    for title, key, mappings in nested_fields:
-        dyn_keys = set()
-        for entry in json_data:
-            try:
-                nested_data = json.loads(entry.get(key, "[]").replace("'", '"'))
-                for item in nested_data:
-                    flat = flatten_dict(item)
-                    dyn_keys.update(flat.keys())
-            except Exception:
-                continue
-        dynamic_columns[key] = {
-            "title": title,
-            "keys": [k for k in mappings if k in dyn_keys],
-            "display_names": mappings,
-        }
-
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Quick Export"
-
-    # Header row
-    header = top_fields[:]
-    for nested_info in dynamic_columns.values():
-        for dyn_key in nested_info["keys"]:
-            display_name = nested_info["display_names"].get(dyn_key, dyn_key)
-            header.append(display_name)
-    ws.append(list(str(title) for title in header))
-
-    # Style definitions
-    header_fill = PatternFill(
-        start_color="FFD700", end_color="FFD700", fill_type="solid"
-    )
-    bold_font = Font(bold=True)
-    thin_border = Border(
-        left=Side(style="thin"),
-        right=Side(style="thin"),
-        top=Side(style="thin"),
-        bottom=Side(style="thin"),
-    )
-
-    # Apply styles to header
-    for col_idx, title in enumerate(header, 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = bold_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    row_index = 2
-
-    for entry in json_data:
-        all_nested_records = []
-        max_nested_rows = 1
-
-        for key, nested_info in dynamic_columns.items():
-            try:
-                nested_data = json.loads(entry.get(key, "[]").replace("'", '"'))
-                if not isinstance(nested_data, list):
-                    nested_data = []
-            except Exception:
-                nested_data = []
-            all_nested_records.append(nested_data)
-            max_nested_rows = max(max_nested_rows, len(nested_data))
-
-        for i in range(max_nested_rows):
-            row = []
-
-            # Top fields
-            for tf in top_fields:
-                row.append(entry.get(tf, "") if i == 0 else "")
-
-            # Nested fields
-            for idx, (key, nested_info) in enumerate(dynamic_columns.items()):
-                nested_data = all_nested_records[idx]
-                flat_ans = flatten_dict(nested_data[i]) if i < len(nested_data) else {}
-                for dyn_key in nested_info["keys"]:
-                    row.append(flat_ans.get(dyn_key, ""))
-
-            ws.append(row)
-
-            # Apply border to row
-            for col_idx in range(1, len(row) + 1):
-                cell = ws.cell(row=row_index, column=col_idx)
-                cell.border = thin_border
-
-            row_index += 1
-
-        # Merge top fields if needed
-        if max_nested_rows > 1:
-            for col_idx in range(1, len(top_fields) + 1):
-                ws.merge_cells(
-                    start_row=row_index - max_nested_rows,
-                    start_column=col_idx,
-                    end_row=row_index - 1,
-                    end_column=col_idx,
-                )
-                top_cell = ws.cell(row=row_index - max_nested_rows, column=col_idx)
-                top_cell.alignment = Alignment(vertical="center")
-                top_cell.border = thin_border  # Re-apply border
-
-    # Auto-fit column widths
-    for col in ws.columns:
-        max_len = max(len(str(cell.value or "")) for cell in col)
-        col_letter = get_column_letter(col[0].column)
-        ws.column_dimensions[col_letter].width = min(max_len + 2, 50)
-
-    # Output file
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    response = HttpResponse(
-        output.read(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = f'attachment; filename="{file_name}.xlsx"'
-    return response
@@ -0,0 +1,353 @@
+"""
+horilla_views/export.py
+
+Streaming export of the generic list views.
+
+The rows are read from the queryset in chunks and every column value goes
+through an extractor compiled once per export: concrete fields are read with
+an attribute getter and written as is, only the method and markup columns are
+rendered as text with BeautifulSoup. CSV and JSON are streamed to the client
+as they are produced, XLSX rows are written to a write only workbook backed by
+a temporary file, so the memory used does not grow with the number of rows.
+"""
+
+import csv
+import io
+import json
+import operator
+import tempfile
+from itertools import chain
+
+from bs4 import BeautifulSoup
+from django.db import models
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from xhtml2pdf import pisa
+
+from horilla.methods import get_attribute_field
+from horilla_views.cbv_methods import flatten_dict
+from horilla_views.templatetags.generic_template_filters import getattribute
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Fields whose text can not hold markup, blank lines or surrounding spaces
+PLAIN_FIELDS = (
+    models.BooleanField,
+    models.DateField,
+    models.DecimalField,
+    models.DurationField,
+    models.FloatField,
+    models.IntegerField,
+    models.TimeField,
+    models.UUIDField,
+)
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+THIN_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+HEADER_FILL = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
+
+
+def clean_text(value) -> str:
+    """
+    Text of an exported cell:
+    - the selected option value of a <select>, the value of an <input> or the
+      text of a <textarea>
+    - otherwise the text without markup, blank lines and surrounding spaces,
+      <li> items on their own line
+    """
+    text = str(value)
+    if "<" in text or "&" in text:
+        soup = BeautifulSoup(text, "html.parser")
+
+        select_tag = soup.find("select")
+        if select_tag:
+            selected_option = select_tag.find("option", selected=True)
+            if selected_option:
+                return selected_option["value"]
+            first_option = select_tag.find("option")
+            return first_option["value"] if first_option else ""
+
+        input_tag = soup.find("input")
+        if input_tag:
+            return input_tag.get("value", "")
+
+        textarea_tag = soup.find("textarea")
+        if textarea_tag:
+            return textarea_tag.text.strip()
+
+        for li in soup.find_all("li"):
+            li.insert_before("\n")
+            li.unwrap()
+        text = soup.get_text()
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def get_field_path(model, path):
+    """
+    Concrete field reached by the attribute path through single valued
+    relations, None when the path reads a method, property or multi valued
+    relation
+    """
+    parts = path.split("__")
+    for part in parts[:-1]:
+        field = get_attribute_field(model, part)
+        if (
+            field is None
+            or not field.is_relation
+            or field.related_model is None
+            or field.many_to_many
+            or field.one_to_many
+        ):
+            return None
+        model = field.related_model
+    field = get_attribute_field(model, parts[-1])
+    if field is None or field.is_relation or not field.concrete:
+        return None
+    return field
+
+
+def compile_extractor(model, path):
+    """
+    Return the function computing the exported text of the column, the same
+    text as rendering getattribute(instance, path) through clean_text
+    """
+    field = get_field_path(model, path)
+    if field is None:
+        return lambda instance: clean_text(getattribute(instance, path))
+
+    getter = operator.attrgetter(path.replace("__", "."))
+    plain = isinstance(field, PLAIN_FIELDS)
+
+    def extract(instance):
+        try:
+            value = getter(instance)
+        except AttributeError:
+            # a relation on the path is empty
+            return ""
+        return str(value) if plain else clean_text(value)
+
+    return extract
+
+
+def export_rows(queryset, columns):
+    """
+    Yield the exported {label: text} rows of the queryset, chunk by chunk
+    """
+    extractors = [
+        (column[0], compile_extractor(queryset.model, column[1])) for column in columns
+    ]
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {str(label): extract(instance) for label, extract in extractors}
+
+
+class Echo:
+    """
+    File like object returning what is written, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, labels):
+    writer = csv.writer(Echo())
+    yield writer.writerow(labels)
+    for row in rows:
+        yield writer.writerow([row.get(label, "") for label in labels])
+
+
+def stream_json(rows):
+    """
+    The rows as an indented JSON array, written item by item
+    """
+    separator = "[\n"
+    for row in rows:
+        item = json.dumps(row, indent=4).replace("\n", "\n    ")
+        yield f"{separator}    {item}"
+        separator = ",\n"
+    yield "[]" if separator == "[\n" else "\n]"
+
+
+def parse_nested(value):
+    """
+    Records of a nested column, rendered as the text of a list of dicts
+    """
+    try:
+        nested = json.loads(value.replace("'", '"'))
+    except Exception:
+        return []
+    return nested if isinstance(nested, list) else []
+
+
+def write_xlsx(rows, columns, file):
+    """
+    Write the rows as a workbook.
+
+    Columns with a {key: display name} mapping as third item hold a list of
+    records, each record is written on its own line under one column per
+    mapped key present in the data and the other cells of the row are merged.
+    """
+    top_fields = [str(column[0]) for column in columns if len(column) == 2]
+    nested_fields = [
+        (str(column[1]), column[2])
+        for column in columns
+        if len(column) == 3 and isinstance(column[2], dict)
+    ]
+
+    # the nested keys are discovered before the header is written
+    nested_keys = {}
+    if nested_fields:
+        found = {key: set() for key, _ in nested_fields}
+        for row in rows():
+            for key, _ in nested_fields:
+                for record in parse_nested(row.get(key, "[]")):
+                    found[key].update(flatten_dict(record).keys())
+        nested_keys = {
+            key: [name for name in mapping if name in found[key]]
+            for key, mapping in nested_fields
+        }
+
+    header = top_fields[:]
+    for key, mapping in nested_fields:
+        header += [mapping.get(name, name) for name in nested_keys[key]]
+    header = [str(title) for title in header]
+
+    def sheet_rows():
+        for row in rows():
+            records = [parse_nested(row.get(key, "[]")) for key, _ in nested_fields]
+            height = max([1] + [len(items) for items in records])
+            for index in range(height):
+                values = [
+                    row.get(field, "") if index == 0 else "" for field in top_fields
+                ]
+                for (key, _), items in zip(nested_fields, records):
+                    flat = flatten_dict(items[index]) if index < len(items) else {}
+                    values += [flat.get(name, "") for name in nested_keys[key]]
+                yield values, index, height
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Quick Export")
+
+    # column widths are written before the rows, fit them on the first chunk
+    produced = sheet_rows()
+    first_chunk = []
+    for item in produced:
+        first_chunk.append(item)
+        if len(first_chunk) >= EXPORT_CHUNK_SIZE:
+            break
+    for column_index, title in enumerate(header):
+        width = max(
+            [len(title)]
+            + [len(str(values[column_index] or "")) for values, _, _ in first_chunk]
+        )
+        sheet.column_dimensions[get_column_letter(column_index + 1)].width = min(
+            width + 2, 50
+        )
+
+    def cell(value, **styles):
+        result = WriteOnlyCell(sheet, value=value)
+        result.border = THIN_BORDER
+        for name, style in styles.items():
+            setattr(result, name, style)
+        return result
+
+    sheet.append(
+        [
+            cell(
+                title,
+                font=Font(bold=True),
+                fill=HEADER_FILL,
+                alignment=Alignment(horizontal="center", vertical="center"),
+            )
+            for title in header
+        ]
+    )
+    row_index = 1
+    for values, index, height in chain(first_chunk, produced):
+        row_index += 1
+        merged = height > 1 and index == 0
+        sheet.append(
+            [
+                (
+                    cell(value, alignment=Alignment(vertical="center"))
+                    if merged and column_index < len(top_fields)
+                    else cell(value)
+                )
+                for column_index, value in enumerate(values)
+            ]
+        )
+        if merged:
+            for column_index in range(1, len(top_fields) + 1):
+                sheet.merged_cells.add(
+                    CellRange(
+                        min_col=column_index,
+                        min_row=row_index,
+                        max_col=column_index,
+                        max_row=row_index + height - 1,
+                    )
+                )
+    workbook.save(file)
+
+
+def export_response(queryset, columns, export_format, file_name, nested=None):
+    """
+    Export response of the queryset in the requested format.
+
+    `columns` are the (label, path) pairs selected by the user, `nested` maps
+    the labels of the nested columns to their {key: display name} mapping.
+    """
+    nested = nested or {}
+    labels = [str(column[0]) for column in columns]
+
+    def rows():
+        return export_rows(queryset, columns)
+
+    if export_format == "json":
+        response = StreamingHttpResponse(
+            stream_json(rows()), content_type="application/json"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{file_name}.json"'
+        return response
+    if export_format == "csv":
+        response = StreamingHttpResponse(
+            stream_csv(rows(), labels), content_type="text/csv"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{file_name}.csv"'
+        return response
+    if export_format == "pdf":
+        # the PDF renderer needs the whole document
+        html_string = render_to_string(
+            "generic/export_pdf.html", {"headers": labels, "rows": list(rows())}
+        )
+        result = io.BytesIO()
+        pisa_status = pisa.CreatePDF(html_string, dest=result)
+        if pisa_status.err:
+            return HttpResponse("PDF generation failed", status=500)
+        response = HttpResponse(result.getvalue(), content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="{file_name}.pdf"'
+        return response
+
+    xlsx_columns = [
+        (label, label, nested[label]) if label in nested else (label, label)
+        for label in labels
+    ]
+    file = tempfile.TemporaryFile()
+    write_xlsx(rows, xlsx_columns, file)
+    file.seek(0)
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename=f"{file_name}.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
+    )
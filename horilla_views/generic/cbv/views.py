@@ -2,43 +2,50 @@
 horilla/generic/views.py
 """
 
-import io
 import json
 import logging
 from typing import Any
 from urllib.parse import parse_qs
 
-from bs4 import BeautifulSoup
 from django import forms
 from django.contrib import messages
-from django.core.cache import cache as CACHE
 from django.core.exceptions import FieldDoesNotExist
 from django.core.paginator import Page
 from django.http import HttpRequest, HttpResponse, QueryDict
 from django.shortcuts import render
-from django.template.loader import render_to_string
 from django.urls import resolve, reverse
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import DetailView, FormView, ListView, TemplateView
-from xhtml2pdf import pisa
 
-from base.methods import closest_numbers, eval_validate, get_key_instances
+from base.methods import eval_validate, get_key_instances
 from horilla.filters import FilterSet
 from horilla.group_by import group_by_queryset
 from horilla.horilla_middlewares import _thread_locals
 from horilla_views import models
 from horilla_views.cbv_methods import (  # update_initial_cache,
-    export_xlsx,
+    attribute_paths,
     get_short_uuid,
+    get_view_token,
     hx_request_required,
     paginator_qry,
+    plan_queryset,
     sortby,
     structured,
     update_saved_filter_cache,
 )
+from horilla_views.export import export_response
 from horilla_views.forms import DynamicBulkUpdateForm, ToggleColumnForm
+from horilla_views.navigation import (
+    clear_navigation,
+    get_navigation,
+    get_neighbours,
+    navigation_queryset,
+    store_navigation,
+)
+from horilla_views.row_cache import RowCache
 from horilla_views.templatetags.generic_template_filters import getattribute
+from horilla_views.view_state import get_state, set_state
 
 logger = logging.getLogger(__name__)
 
@@ -110,6 +117,10 @@ class HorillaListView(ListView):
     filter_keys_to_remove: list = []
 
     records_per_page: int = 50
+    # page without counting the records, see horilla.pagination
+    count_free_pagination: bool = False
+    # serve the unchanged rows from the cache, see horilla_views.row_cache
+    cache_rows: bool = False
     export_fields: list = []
     verbose_name: str = ""
     bulk_update_fields: list = []
@@ -132,7 +143,7 @@ class HorillaListView(ListView):
 
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # # update_initial_cache(request, CACHE, HorillaListView)
+        # # update_initial_cache(request, HorillaListView)
 
         # hidden columns configuration
         existing_instance = models.ToggleColumn.objects.filter(
@@ -162,6 +173,21 @@ class HorillaListView(ListView):
                 if column[1] in hidden_fields:
                     self.visible_column.remove(column)
 
+    def get_related_paths(self) -> list:
+        """
+        Attribute paths read by the rows, their relations are loaded with the
+        page
+        """
+        return attribute_paths(
+            self.visible_column,
+            self.row_attrs,
+            self.row_status_class,
+            self.actions,
+            self.options,
+            self.action_method,
+            self.option_method,
+        )
+
     def bulk_update_accessibility(self) -> bool:
         """
         Accessibility method for bulk update
@@ -258,16 +284,11 @@ class HorillaListView(ListView):
                     self.request.session["hlv_selected_ids"] = selected_ids
                     self.request.session["prev_path"] = self.request.path
 
+                saved_filter = get_state(self.request, self.request.path + "cbv")
                 if "filter_applied" in query_dict.keys():
-                    update_saved_filter_cache(self.request, CACHE)
-                elif CACHE.get(
-                    str(self.request.session.session_key) + self.request.path + "cbv"
-                ):
-                    query_dict = CACHE.get(
-                        str(self.request.session.session_key)
-                        + self.request.path
-                        + "cbv"
-                    )["query_dict"]
+                    update_saved_filter_cache(self.request)
+                elif saved_filter:
+                    query_dict = saved_filter["query_dict"]
 
                 default_filter = models.SavedFilter.objects.filter(
                     path=self.request.path,
@@ -294,9 +315,7 @@ class HorillaListView(ListView):
                 ) == "true" and self.request.session.get("hlv_selected_ids"):
                     del self.request.session["hlv_selected_ids"]
                 if self.request.session.get("hlv_selected_ids"):
-                    self.request.actual_ids = list(
-                        self.queryset.values_list("id", flat=True)
-                    )
+                    self.request.actual_ids_count = self.queryset.count()
                     self.queryset = self.queryset.filter(
                         id__in=self.request.session["hlv_selected_ids"]
                     )
@@ -380,30 +399,23 @@ class HorillaListView(ListView):
             context["keys_to_remove"] = keys_to_remove
 
         request = self.request
-        is_first_sort = False
         query_dict = self.request.GET
-        if (
-            not request.GET.get(self.sortby_key)
-            and not self._saved_filters.get(self.sortby_key)
-        ) or (
-            not request.GET.get(self.sortby_key)
-            and self._saved_filters.get(self.sortby_key)
-        ):
-            is_first_sort = True
+        if not request.GET.get(self.sortby_key):
             query_dict = self._saved_filters
 
         if query_dict.get(self.sortby_key):
-            queryset = sortby(
-                query_dict, queryset, self.sortby_key, is_first_sort=is_first_sort
-            )
+            queryset = sortby(query_dict, queryset, self.sortby_key)
+        queryset = plan_queryset(queryset, self.get_related_paths())
 
-        ordered_ids = []
         if not self._saved_filters.get("field"):
-            for instance in queryset:
-                ordered_ids.append(instance.pk)
-        self.request.session[self.ordered_ids_key] = ordered_ids
+            store_navigation(self.request, self.ordered_ids_key, queryset)
+        else:
+            clear_navigation(self.request, self.ordered_ids_key)
         context["queryset"] = paginator_qry(
-            queryset, self._saved_filters.get("page"), self.records_per_page
+            queryset,
+            self._saved_filters.get("page"),
+            self.records_per_page,
+            count_free=self.count_free_pagination,
         )
 
         if request and self._saved_filters.get("field"):
@@ -413,12 +425,9 @@ class HorillaListView(ListView):
                 queryset = self.filter_class(
                     request.GET, queryset=queryset.object_list.model.objects.all()
                 ).qs
-            groups = group_by_queryset(
+            context["groups"] = group_by_queryset(
                 queryset, field, self._saved_filters.get("page"), "page"
             )
-            context["groups"] = paginator_qry(
-                groups, self._saved_filters.get("page"), 10
-            )
 
             # for group in context["groups"]:
             #     for instance in group["list"]:
@@ -426,38 +435,45 @@ class HorillaListView(ListView):
             #         ordered_ids.append(instance.pk)
 
         # CACHE.get(self.request.session.session_key + "cbv")[HorillaListView] = context
-        from horilla.urls import path, urlpatterns
-
-        self.export_path = f"export-list-view-{get_short_uuid(4)}/"
-
-        urlpatterns.append(path(self.export_path, self.export_data))
-        context["export_path"] = self.export_path
+        view_token = get_view_token(self)
+        context["export_path"] = reverse("list-view-export", args=[view_token])
 
         if self.bulk_update_fields and self.bulk_update_accessibility():
-            get_bulk_path = (
-                f"get-bulk-update-{self.view_id}-{self.request.session.session_key}/"
-            )
-            post_bulk_path = (
-                f"post-bulk-update-{self.view_id}-{self.request.session.session_key}/"
-            )
-            self.post_bulk_path = post_bulk_path
-            urlpatterns.append(
-                path(
-                    get_bulk_path,
-                    self.serve_bulk_form,
-                )
-            )
-            urlpatterns.append(
-                path(
-                    post_bulk_path,
-                    self.handle_bulk_submission,
-                )
-            )
             context["bulk_update_fields"] = self.bulk_update_fields
-            context["bulk_path"] = get_bulk_path
+            context["bulk_path"] = reverse("list-view-bulk-form", args=[view_token])
         context["export_formats"] = self.export_formats
+
+        if self.cache_rows:
+            if context.get("groups"):
+                rows = [
+                    instance
+                    for group in context["groups"]
+                    for instance in group["list"]
+                ]
+            else:
+                rows = context["queryset"]
+            context["row_cache"] = RowCache(
+                self.request,
+                self,
+                (
+                    self.template_name,
+                    context["columns"],
+                    self.options,
+                    self.option_method,
+                    self.actions,
+                    self.action_method,
+                ),
+                rows,
+            )
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        row_cache = context.get("row_cache")
+        if row_cache is not None:
+            response.add_post_render_callback(lambda response: row_cache.account())
+        return response
+
     def select_all(self, *args, **kwargs):
         """
         Select all method
@@ -468,182 +484,29 @@ class HorillaListView(ListView):
         """
         Export list view visible columns
         """
-        from import_export import fields, resources
-
         request = getattr(_thread_locals, "request", None)
         ids = eval_validate(request.POST["ids"])
         _columns = eval_validate(request.POST["columns"])
         export_format = request.POST.get("format", "xlsx")
-        queryset = self.model.objects.filter(id__in=ids)
-
-        _model = self.model
-
-        class HorillaListViewResorce(resources.ModelResource):
-            """
-            Instant Resource class
-            """
-
-            id = fields.Field(column_name="ID")
-
-            class Meta:
-                """
-                Meta class for additional option
-                """
-
-                model = _model
-                fields = [field[1] for field in _columns]  # 773
-
-            def dehydrate_id(self, instance):
-                """
-                Dehydrate method for id field
-                """
-                return instance.pk
-
-            for field_tuple in _columns:
-                dynamic_fn_str = f"def dehydrate_{field_tuple[1]}(self, instance):return self.remove_extra_spaces(getattribute(instance, '{field_tuple[1]}'),{field_tuple})"
-                exec(dynamic_fn_str)
-                dynamic_fn = locals()[f"dehydrate_{field_tuple[1]}"]
-                locals()[field_tuple[1]] = fields.Field(column_name=field_tuple[0])
-
-            def remove_extra_spaces(self, text, field_tuple):
-                """
-                Clean the text:
-                - If it's a <select> element, extract the selected option's value.
-                - If it's an <input> or <textarea>, extract its 'value'.
-                - Otherwise, remove blank spaces, keep line breaks, and handle <li> tags.
-                """
-                soup = BeautifulSoup(str(text), "html.parser")
-
-                # Handle <select> tag
-                select_tag = soup.find("select")
-                if select_tag:
-                    selected_option = select_tag.find("option", selected=True)
-                    if selected_option:
-                        return selected_option["value"]
-                    else:
-                        first_option = select_tag.find("option")
-                        return first_option["value"] if first_option else ""
-
-                # Handle <input> tag
-                input_tag = soup.find("input")
-                if input_tag:
-                    return input_tag.get("value", "")
-
-                # Handle <textarea> tag
-                textarea_tag = soup.find("textarea")
-                if textarea_tag:
-                    return textarea_tag.text.strip()
-
-                # Default: clean normal text and <li> handling
-                for li in soup.find_all("li"):
-                    li.insert_before("\n")
-                    li.unwrap()
-
-                text = soup.get_text()
-                lines = text.splitlines()
-                non_blank_lines = [line.strip() for line in lines if line.strip()]
-                cleaned_text = "\n".join(non_blank_lines)
-                return cleaned_text
-
-        book_resource = HorillaListViewResorce()
-
-        # Export the data using the resource
-        dataset = book_resource.export(queryset)
-
-        # excel_data = dataset.export("xls")
-
-        # Set the response headers
-        # file_name = self.export_file_name
-        # if not file_name:
-        #     file_name = "quick_export"
-        # response = HttpResponse(excel_data, content_type="application/vnd.ms-excel")
-        # response["Content-Disposition"] = f'attachment; filename="{file_name}.xls"'
-        # return response
-        json_data = json.loads(dataset.export("json"))
-        merged = []
+        queryset = plan_queryset(
+            self.model.objects.filter(id__in=ids), attribute_paths(_columns)
+        )
 
+        # (verbose name, path, {key: display name}) export fields hold records
+        nested = {}
         for item in _columns:
-            # Check if item has exactly 2 elements
-            if len(item) == 2:
-                # Check if there's a matching (type, key) in export_fields (t, k, _)
-                match_found = any(
-                    export_item[0] == item[0] and export_item[1] == item[1]
-                    for export_item in self.export_fields
-                )
-
-                if match_found:
-                    # Find the first matching metadata or use {} as fallback
-                    try:
-                        metadata = next(
-                            (
-                                export_item[2]
-                                for export_item in self.export_fields
-                                if export_item[0] == item[0]
-                                and export_item[1] == item[1]
-                            ),
-                            {},
-                        )
-                    except Exception as e:
-                        merged.append(item)
-                        continue
-
-                    merged.append([*item, metadata])
-                else:
-                    merged.append(item)
-            else:
-                merged.append(item)
-        columns = []
-        for column in merged:
-            if len(column) >= 3 and isinstance(column[2], dict):
-                column = (column[0], column[0], column[2])
-            elif len(column) >= 3:
-                column = (column[0], column[1])
-            columns.append(column)
-
-        if export_format == "json":
-            response = HttpResponse(
-                json.dumps(json_data, indent=4), content_type="application/json"
-            )
-            response["Content-Disposition"] = (
-                f'attachment; filename="{self.export_file_name}.json"'
-            )
-            return response
-        # CSV
-        elif export_format == "csv":
-            csv_data = dataset.export("csv")
-            response = HttpResponse(csv_data, content_type="text/csv")
-            response["Content-Disposition"] = (
-                f'attachment; filename="{self.export_file_name}.csv"'
-            )
-            return response
-        elif export_format == "pdf":
-
-            headers = dataset.headers
-            rows = dataset.dict
-
-            # Render to HTML using a template
-            html_string = render_to_string(
-                "generic/export_pdf.html",
-                {
-                    "headers": headers,
-                    "rows": rows,
-                },
-            )
-
-            # Convert HTML to PDF using xhtml2pdf
-            result = io.BytesIO()
-            pisa_status = pisa.CreatePDF(html_string, dest=result)
-
-            if pisa_status.err:
-                return HttpResponse("PDF generation failed", status=500)
-
-            # Return response
-            response = HttpResponse(result.getvalue(), content_type="application/pdf")
-            response["Content-Disposition"] = (
-                f'attachment; filename="{self.export_file_name}.pdf"'
-            )
-            return response
-        return export_xlsx(json_data, columns)
+            if len(item) != 2:
+                continue
+            for export_item in self.export_fields:
+                if export_item[0] == item[0] and export_item[1] == item[1]:
+                    metadata = export_item[2] if len(export_item) > 2 else {}
+                    if isinstance(metadata, dict):
+                        nested[str(item[0])] = metadata
+                    break
+
+        return export_response(
+            queryset, _columns, export_format, self.export_file_name, nested
+        )
 
 
 class HorillaSectionView(TemplateView):
@@ -655,7 +518,7 @@ class HorillaSectionView(TemplateView):
         super().__init__(**kwargs)
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # update_initial_cache(request, CACHE, HorillaListView)
+        # update_initial_cache(request, HorillaListView)
 
     nav_url: str = ""
     view_url: str = ""
@@ -701,6 +564,12 @@ class HorillaDetailedView(DetailView):
 
     ids_key: str = "instance_ids"
 
+    def get_queryset(self):
+        return plan_queryset(
+            super().get_queryset(),
+            attribute_paths(self.header, self.body, self.actions, self.action_method),
+        )
+
     def get_object(self, queryset=None):
         try:
             self.instance = super().get_object(queryset)
@@ -722,11 +591,10 @@ class HorillaDetailedView(DetailView):
         self.ordered_ids_key = f"ordered_ids_{self.model.__name__.lower()}"
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # update_initial_cache(request, CACHE, HorillaDetailedView)
+        # update_initial_cache(request, HorillaDetailedView)
 
     def get_context_data(self, **kwargs: Any):
         context = super().get_context_data(**kwargs)
-        instance_ids = self.request.session.get(self.ordered_ids_key, [])
         if not context.get("object", False):
             return context
 
@@ -740,12 +608,13 @@ class HorillaDetailedView(DetailView):
 
         url_name = url.url_name
 
-        previous_id, next_id = closest_numbers(instance_ids, pk)
+        navigation = get_navigation(self.request, self.ordered_ids_key)
+        if navigation:
+            previous_id, next_id = get_neighbours(navigation, pk)
+            next_url = reverse(url_name, kwargs={key: next_id})
+            previous_url = reverse(url_name, kwargs={key: previous_id})
 
-        next_url = reverse(url_name, kwargs={key: next_id})
-        previous_url = reverse(url_name, kwargs={key: previous_id})
-        if instance_ids:
-            context["instance_ids"] = str(instance_ids)
+            context["instance_ids"] = self.ordered_ids_key
             context["ids_key"] = self.ids_key
 
             context["next_url"] = next_url
@@ -780,7 +649,7 @@ class HorillaTabView(TemplateView):
         super().__init__(**kwargs)
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # update_initial_cache(request, CACHE, HorillaTabView)
+        # update_initial_cache(request, HorillaTabView)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -839,6 +708,10 @@ class HorillaCardView(ListView):
     filter_keys_to_remove: list = []
 
     records_per_page: int = 50
+    # page without counting the records, see horilla.pagination
+    count_free_pagination: bool = False
+    # serve the unchanged cards from the cache, see horilla_views.row_cache
+    cache_rows: bool = False
     card_status_class: str = """"""
     card_status_indications: list = []
 
@@ -846,7 +719,7 @@ class HorillaCardView(ListView):
         super().__init__(**kwargs)
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # update_initial_cache(request, CACHE, HorillaCardView)
+        # update_initial_cache(request, HorillaCardView)
         self._saved_filters = QueryDict()
         self.ordered_ids_key = f"ordered_ids_{self.model.__name__.lower()}"
 
@@ -855,16 +728,11 @@ class HorillaCardView(ListView):
             queryset = super().get_queryset()
             if self.filter_class:
                 query_dict = self.request.GET
+                saved_filter = get_state(self.request, self.request.path + "cbv")
                 if "filter_applied" in query_dict.keys():
-                    update_saved_filter_cache(self.request, CACHE)
-                elif CACHE.get(
-                    str(self.request.session.session_key) + self.request.path + "cbv"
-                ):
-                    query_dict = CACHE.get(
-                        str(self.request.session.session_key)
-                        + self.request.path
-                        + "cbv"
-                    )["query_dict"]
+                    update_saved_filter_cache(self.request)
+                elif saved_filter:
+                    query_dict = saved_filter["query_dict"]
 
                 self._saved_filters = query_dict
                 self.request.exclude_filter_form = True
@@ -917,12 +785,10 @@ class HorillaCardView(ListView):
 
             context["filter_dict"] = data_dict
 
-        ordered_ids = list(queryset.values_list("id", flat=True))
-        ordered_ids = []
         if not self._saved_filters.get("field"):
-            for instance in queryset:
-                ordered_ids.append(instance.pk)
-        self.request.session[self.ordered_ids_key] = ordered_ids
+            store_navigation(self.request, self.ordered_ids_key, queryset)
+        else:
+            clear_navigation(self.request, self.ordered_ids_key)
 
         # CACHE.get(self.request.session.session_key + "cbv")[HorillaCardView] = context
         referrer = self.request.GET.get("referrer", "")
@@ -938,10 +804,38 @@ class HorillaCardView(ListView):
             )
         ).distinct()
         context["queryset"] = paginator_qry(
-            queryset, self.request.GET.get("page"), self.records_per_page
+            plan_queryset(
+                queryset,
+                attribute_paths(
+                    self.details, self.card_attrs, self.card_status_class, self.actions
+                ),
+            ),
+            self.request.GET.get("page"),
+            self.records_per_page,
+            count_free=self.count_free_pagination,
         )
+        if self.cache_rows:
+            context["row_cache"] = RowCache(
+                self.request,
+                self,
+                (
+                    self.template_name,
+                    self.details,
+                    self.actions,
+                    self.card_attrs,
+                    self.card_status_class,
+                ),
+                context["queryset"],
+            )
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        row_cache = context.get("row_cache")
+        if row_cache is not None:
+            response.add_post_render_callback(lambda response: row_cache.account())
+        return response
+
 
 @method_decorator(hx_request_required, name="dispatch")
 class ReloadMessages(TemplateView):
@@ -967,8 +861,9 @@ def save(self: forms.ModelForm, commit=True, *args, **kwargs):
     if commit:
         response = super(type(self), self).save(*args, **kwargs)
         new_isntance_pk = self.instance.pk
-        CACHE.set(
-            request.session.session_key + "cbv" + dynamic_field,
+        set_state(
+            request,
+            "cbv" + dynamic_field,
             {
                 "dynamic_field": dynamic_field,
                 "value": new_isntance_pk,
@@ -1041,7 +936,7 @@ class HorillaFormView(FormView):
         self.request = request
         if not self.success_url:
             self.success_url = self.request.path
-        # update_initial_cache(request, CACHE, HorillaFormView)
+        # update_initial_cache(request, HorillaFormView)
 
         if self.form_class:
             setattr(self.form_class, "structured", structured)
@@ -1087,17 +982,17 @@ class HorillaFormView(FormView):
             pk = self.form.instance.pk
         # next/previous option in the forms
         if pk and self.request.GET.get(self.ids_key):
-            instance_ids = self.request.session.get(self.ordered_ids_key, [])
+            navigation = get_navigation(self.request, self.ordered_ids_key)
             url = resolve(self.request.path)
             key = list(url.kwargs.keys())[0]
             url_name = url.url_name
-            if instance_ids:
-                previous_id, next_id = closest_numbers(instance_ids, pk)
+            if navigation:
+                previous_id, next_id = get_neighbours(navigation, pk)
 
                 next_url = reverse(url_name, kwargs={key: next_id})
                 previous_url = reverse(url_name, kwargs={key: previous_id})
 
-                self.form.instance_ids = str(instance_ids)
+                self.form.instance_ids = self.ordered_ids_key
                 self.form.ids_key = self.ids_key
 
                 self.form.next_url = next_url
@@ -1142,7 +1037,7 @@ class HorillaFormView(FormView):
                     additional_data_fields = []
                     if len(dynamic_tuple) == 3:
                         additional_data_fields = dynamic_tuple[2]
-                    key = self.request.session.session_key + "cbv" + field
+                    key = "cbv" + field
                     field_instance = form.instance._meta.get_field(field)
                     value = form.initial.get(field, [])
 
@@ -1157,7 +1052,8 @@ class HorillaFormView(FormView):
                             )
                     else:
                         value = getattr(getattribute(form.instance, field), "pk", value)
-                    CACHE.set(
+                    set_state(
+                        self.request,
                         key,
                         {
                             "dynamic_field": field,
@@ -1212,13 +1108,7 @@ class HorillaFormView(FormView):
                     field = dynamic_tuple[0]
                     onchange = form.fields[field].widget.attrs.get("onchange", "")
                     if onchange:
-                        CACHE.set(
-                            self.request.session.session_key
-                            + "cbv"
-                            + field
-                            + "onchange",
-                            onchange,
-                        )
+                        set_state(self.request, "cbv" + field + "onchange", onchange)
 
             if pk:
                 form.instance = instance
@@ -1267,7 +1157,7 @@ class HorillaNavView(TemplateView):
         self._initialize_model_and_group_fields()
         request = getattr(_thread_locals, "request", None)
         self.request = request
-        # update_initial_cache(request, CACHE, HorillaNavView)
+        # update_initial_cache(request, HorillaNavView)
 
     def _initialize_model_and_group_fields(self) -> None:
         """
@@ -1330,11 +1220,8 @@ class HorillaNavView(TemplateView):
         context["search_in"] = self.search_in
         context["apply_first_filter"] = self.apply_first_filter
         context["filter_instance_context_name"] = self.filter_instance
-        last_filter = CACHE.get(
-            self.request.session.session_key
-            + "last-applied-filter"
-            + self.request.path,
-            {},
+        last_filter = get_state(
+            self.request, "last-applied-filter" + self.request.path, {}
         )
         context["empty_inputs"] = self.empty_inputs + ["nav_url"]
         context["last_filter"] = dict(last_filter)
@@ -1376,7 +1263,7 @@ class HorillaProfileView(DetailView):
         request = getattr(_thread_locals, "request", None)
         self.request = request
         self.ordered_ids_key = f"ordered_ids_{self.model.__name__.lower()}"
-        # update_initial_cache(request, CACHE, HorillaProfileView)
+        # update_initial_cache(request, HorillaProfileView)
 
         from horilla.urls import path, urlpatterns
 
@@ -1451,18 +1338,8 @@ class HorillaProfileView(DetailView):
         if active_tab:
             context["active_target"] = active_tab.tab_target
 
-        instance_ids = self.request.session.get(self.ordered_ids_key, [])
-
-        if instance_ids:
-            CACHE.set(
-                f"{self.request.session.session_key}hpv-instance-ids", instance_ids
-            )
-        else:
-            instance_ids = CACHE.get(
-                f"{self.request.session.session_key}hpv-instance-ids"
-            )
-            instance_ids = instance_ids if instance_ids else []
-        instances = self.model.objects.filter(id__in=instance_ids)
+        navigation = get_navigation(self.request, self.ordered_ids_key)
+        instances = navigation_queryset(self.model, navigation)
         context["instances"] = instances
         balance_count = instances.count() - 6
         if balance_count > 9:
@@ -1472,7 +1349,7 @@ class HorillaProfileView(DetailView):
         else:
             display_count = None
 
-        previous_id, next_id = closest_numbers(instance_ids, context["instance"].pk)
+        previous_id, next_id = get_neighbours(navigation, context["instance"].pk)
         url = resolve(self.request.path)
         key = list(url.kwargs.keys())[0]
 
@@ -1481,8 +1358,8 @@ class HorillaProfileView(DetailView):
         previous_url = reverse(url_name, kwargs={key: previous_id})
         push_url_next = reverse(self.push_url, kwargs={self.key_name: next_id})
         push_url_prev = reverse(self.push_url, kwargs={self.key_name: previous_id})
-        context["instance_ids"] = str(instance_ids)
-        if instance_ids:
+        context["instance_ids"] = self.ordered_ids_key if navigation else ""
+        if navigation:
             context["next_url"] = next_url
             context["previous_url"] = previous_url
             context["push_url_next"] = push_url_next
@@ -1492,11 +1369,10 @@ class HorillaProfileView(DetailView):
         context["actions"] = self.actions
         context["filter_class"] = self.filter_class
         cache = {
-            "instances": context["instances"],
             "instance_ids": context["instance_ids"],
             "filter_class": context["filter_class"],
             "view_id": context["view_id"],
             "object": context["object"],
         }
-        CACHE.set(f"{self.request.session.session_key}search_in_instance_ids", cache)
+        set_state(self.request, "search_in_instance_ids", cache)
         return context
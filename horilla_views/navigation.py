@@ -0,0 +1,243 @@
+"""
+horilla_views/navigation.py
+
+Previous/next navigation between the records of the last rendered list.
+
+The list and card views used to store every ordered id of the filtered
+queryset in the session. They now store only the filtered and sorted query,
+and the neighbours of a record are resolved with keyset queries on the
+ordering of that query, i.e. "the first row after this one" instead of an
+index lookup in a list holding the whole result.
+"""
+
+import logging
+import pickle
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, models
+from django.db.models import F, OrderBy, Q
+
+from horilla_views.view_state import delete_state, get_state, set_state
+
+logger = logging.getLogger(__name__)
+
+NAVIGATION_TIMEOUT = 60 * 60 * 12
+
+# Prefix of the annotations holding the ordering values of a row
+KEY_ALIAS = "_navigation_key_"
+
+
+def store_navigation(request, key, queryset):
+    """
+    Record the filtered and sorted records of a list render under `key`.
+
+    Querysets are stored as their query, results sorted in python (see
+    cbv_methods.python_sortby) fall back to their ordered primary keys.
+    """
+    if isinstance(queryset, models.QuerySet):
+        state = {"query": queryset.query}
+    else:
+        state = {"ids": [instance.pk for instance in queryset]}
+    try:
+        set_state(request, key, state, NAVIGATION_TIMEOUT)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        logger.warning("Could not store the navigation of %s", key, exc_info=True)
+        clear_navigation(request, key)
+
+
+def clear_navigation(request, key):
+    delete_state(request, key)
+
+
+def get_navigation(request, key):
+    """
+    Return the records of the last list rendered under `key` as an ordered
+    queryset or a list of primary keys, None when there is none
+    """
+    state = get_state(request, key)
+    if not state:
+        return None
+    if "ids" in state:
+        return state["ids"]
+    query = state["query"]
+    queryset = query.model._default_manager.all()
+    queryset.query = query
+    return queryset
+
+
+def navigation_queryset(model, navigation):
+    """
+    Records of the navigation as a queryset of `model`
+    """
+    if navigation is None:
+        return model.objects.none()
+    if isinstance(navigation, models.QuerySet):
+        return navigation
+    return model.objects.filter(pk__in=navigation)
+
+
+def get_neighbours(navigation, pk):
+    """
+    Return the (previous, next) primary keys around `pk`, wrapping around at
+    both ends. Both are `pk` when it is not part of the navigation.
+    """
+    if not navigation:
+        return pk, pk
+    if not isinstance(navigation, models.QuerySet):
+        return closest_pks(navigation, pk)
+
+    queryset = navigation.order_by()
+    ordering = []
+    for index, (expression, descending, nulls_largest) in enumerate(
+        query_ordering(navigation)
+    ):
+        alias = f"{KEY_ALIAS}{index}"
+        queryset = queryset.annotate(**{alias: expression})
+        ordering.append((alias, descending, nulls_largest))
+
+    current = queryset.filter(pk=pk).values_list(*[key[0] for key in ordering]).first()
+    if current is None:
+        return pk, pk
+
+    forward = [
+        (alias, descending, nulls_largest != descending)
+        for alias, descending, nulls_largest in ordering
+    ]
+    backward = [
+        (alias, not descending, not nulls_last)
+        for alias, descending, nulls_last in forward
+    ]
+    next_pk = first_pk(queryset, forward, current) or first_pk(queryset, forward)
+    previous_pk = first_pk(queryset, backward, current) or first_pk(queryset, backward)
+    return previous_pk or pk, next_pk or pk
+
+
+def first_pk(queryset, ordering, after=None):
+    """
+    Primary key of the first row in `ordering`, only the rows strictly after
+    the `after` key values when given
+    """
+    if after is not None:
+        queryset = queryset.filter(keyset_condition(ordering, after))
+    order_by = []
+    for alias, descending, nulls_last in ordering:
+        nulls = {"nulls_last": True} if nulls_last else {"nulls_first": True}
+        order_by.append(F(alias).desc(**nulls) if descending else F(alias).asc(**nulls))
+    return queryset.order_by(*order_by).values_list("pk", flat=True).first()
+
+
+def keyset_condition(ordering, values):
+    """
+    Lexicographic "row key > values" condition along `ordering`,
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (alias, descending, nulls_last), value in zip(ordering, values):
+        if value is None:
+            after = Q(**{f"{alias}__isnull": False}) if not nulls_last else None
+            same = Q(**{f"{alias}__isnull": True})
+        else:
+            after = Q(**{f"{alias}__{'lt' if descending else 'gt'}": value})
+            if nulls_last:
+                after |= Q(**{f"{alias}__isnull": True})
+            same = Q(**{alias: value})
+        if after is not None:
+            condition |= equal & after
+        equal &= same
+    return condition
+
+
+def query_ordering(queryset):
+    """
+    Normalised ordering of the queryset as (expression, descending,
+    nulls_largest) triples ending with the primary key, so that every row has
+    a distinct key
+    """
+    query = queryset.query
+    model = queryset.model
+    nulls_largest = connections[queryset.db].features.nulls_order_largest
+    order_by = query.order_by
+    if not order_by and query.default_ordering:
+        order_by = model._meta.ordering or []
+
+    ordering = []
+    for item in order_by:
+        if isinstance(item, str):
+            if item == "?":
+                continue
+            descending = item.startswith("-")
+            name = item.lstrip("-+")
+            for expression, expanded_descending in expand_ordering_name(
+                model, name, descending, query.annotations
+            ):
+                ordering.append((expression, expanded_descending, nulls_largest))
+            continue
+        if isinstance(item, OrderBy):
+            largest = nulls_largest
+            if item.nulls_first:
+                largest = item.descending
+            elif item.nulls_last:
+                largest = not item.descending
+            ordering.append((item.expression, item.descending, largest))
+            continue
+        ordering.append((item, False, nulls_largest))
+
+    if not any(
+        isinstance(expression, F) and expression.name in ("pk", model._meta.pk.name)
+        for expression, _, _ in ordering
+    ):
+        ordering.append((F("pk"), False, nulls_largest))
+    return ordering
+
+
+def expand_ordering_name(model, name, descending, annotations=None, depth=0):
+    """
+    Ordering by a relation orders by the Meta.ordering of the related model,
+    expand it the way the SQL compiler does
+    """
+    if annotations and name in annotations:
+        return [(F(name), descending)]
+    if name == "pk":
+        return [(F("pk"), descending)]
+    field = None
+    current = model
+    for part in name.split("__"):
+        try:
+            field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return [(F(name), descending)]
+        if field.is_relation and field.related_model:
+            current = field.related_model
+    if (
+        field is None
+        or not field.is_relation
+        or not (field.many_to_one or field.one_to_one)
+        or not current._meta.ordering
+        or depth > 2
+    ):
+        return [(F(name), descending)]
+
+    expanded = []
+    for item in current._meta.ordering:
+        if not isinstance(item, str) or item == "?":
+            continue
+        item_descending = item.startswith("-")
+        expanded += expand_ordering_name(
+            model,
+            f"{name}__{item.lstrip('-+')}",
+            descending != item_descending,
+            depth=depth + 1,
+        )
+    return expanded or [(F(name), descending)]
+
+
+def closest_pks(pks, pk):
+    """
+    Neighbours of `pk` in a list of primary keys, see base.methods.closest_numbers
+    """
+    try:
+        index = pks.index(pk)
+    except ValueError:
+        return pk, pk
+    return pks[index - 1], pks[(index + 1) % len(pks)]
@@ -0,0 +1,193 @@
+"""
+horilla_views/row_cache.py
+
+Cache of the rendered rows of the generic list and card views.
+
+Rendering the rows, their options and actions costs more than the queries
+once those are planned, while most rows are unchanged between two renders of
+a page. Views setting `cache_rows = True` wrap each row in the
+{% cache_row instance %} tag, which serves the row from the ROW_CACHE Django
+cache when rendered before with the same:
+
+- view class and row layout (columns, details, actions, options, attrs)
+- user, permissions and CSRF secret, accessibility callbacks and date formats
+  depend on the user
+- language
+- row version, a fingerprint of the field values loaded with the row and its
+  select_related and prefetched relations, so an edit of the row, including
+  by queryset update(), renders it again
+
+Values read by methods outside of the loaded relations are not part of the
+version, a cached row shows them for at most ROW_CACHE_TIMEOUT seconds.
+
+The fragments of a page are read with one get_many. row_cache_stats() reports
+the hits and misses counted by the workers.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.translation import get_language
+
+from horilla.horilla_settings import ROW_CACHE, ROW_CACHE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "horilla_row"
+
+
+def get_cache():
+    return caches[ROW_CACHE]
+
+
+def digest(*parts) -> str:
+    """
+    Hash of the parts, lazy translations and other values are taken as text
+    """
+    data = json.dumps(parts, default=str, sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def user_fingerprint(request) -> str:
+    user = request.user
+    return digest(
+        user.pk,
+        user.is_superuser,
+        sorted(user.get_all_permissions()),
+        request.META.get("CSRF_COOKIE"),
+    )
+
+
+def instance_state(instance, depth=0) -> tuple:
+    """
+    Field values loaded with the instance and its cached relations
+    """
+    values = [
+        (name, value)
+        for name, value in sorted(instance.__dict__.items())
+        if not name.startswith("_")
+    ]
+    if depth < 2:
+        for name, related in sorted(instance._state.fields_cache.items()):
+            values.append((name, related and instance_state(related, depth + 1)))
+        prefetched = getattr(instance, "_prefetched_objects_cache", {})
+        for name, objects in sorted(prefetched.items()):
+            values.append((name, [instance_state(item, depth + 1) for item in objects]))
+    return (type(instance).__name__, instance.pk, values)
+
+
+def row_version(instance) -> str:
+    return digest(instance_state(instance))
+
+
+class RowCache:
+    """
+    Rendered rows of a page, the fragments of the rows are read together on
+    the first lookup
+    """
+
+    def __init__(self, request, view, layout, rows):
+        self.prefix = "{}:{}".format(
+            KEY_PREFIX,
+            digest(
+                f"{type(view).__module__}.{type(view).__qualname__}",
+                layout,
+                user_fingerprint(request),
+                get_language(),
+            ),
+        )
+        self.rows = rows
+        self.fragments = None
+        self.loaded = set()
+        self.keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, instance) -> str:
+        """
+        Cache key of the row, kept for the render since rendering the row can
+        load relations changing its version
+        """
+        key = self.keys.get(id(instance))
+        if key is None:
+            key = f"{self.prefix}:{instance.pk}:{row_version(instance)}"
+            self.keys[id(instance)] = key
+        return key
+
+    def load(self):
+        try:
+            self.loaded = {self.key(instance) for instance in self.rows}
+            self.fragments = get_cache().get_many(list(self.loaded))
+        except Exception:
+            logger.warning("Could not read the cached rows", exc_info=True)
+            self.fragments = {}
+
+    def get(self, instance):
+        if self.fragments is None:
+            self.load()
+        key = self.key(instance)
+        if key in self.loaded:
+            fragment = self.fragments.get(key)
+        else:
+            fragment = get_cache().get(key)
+        if fragment is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fragment
+
+    def set(self, instance, fragment):
+        try:
+            get_cache().set(self.key(instance), fragment, ROW_CACHE_TIMEOUT)
+        except Exception:
+            logger.warning("Could not cache the row %s", instance.pk, exc_info=True)
+
+    def account(self):
+        """
+        Add the hits and misses of the page to the shared counters
+        """
+        for kind, delta in (("hits", self.hits), ("misses", self.misses)):
+            if delta:
+                count(kind, delta)
+        self.hits = self.misses = 0
+
+
+def counter_key(kind):
+    return f"{KEY_PREFIX}:stats:{kind}"
+
+
+def count(kind, delta):
+    cache = get_cache()
+    key = counter_key(kind)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # evicted between add and incr
+        cache.add(key, delta, None)
+
+
+def row_cache_stats() -> dict:
+    """
+    Rows served from the cache and rendered since the counters were created
+    """
+    counters = get_cache().get_many([counter_key("hits"), counter_key("misses")])
+    hits = counters.get(counter_key("hits"), 0)
+    misses = counters.get(counter_key("misses"), 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+@staff_member_required
+def row_cache_metrics(request):
+    """
+    Staff only endpoint serving row_cache_stats()
+    """
+    return JsonResponse(row_cache_stats())
@@ -0,0 +1,129 @@
+"""
+horilla_views/search.py
+
+Search of the generic filters.
+
+A search on an attribute path keeps the result of the former python search,
+the records whose getattribute(instance, path) text contains the searched
+value, but runs it in the database whenever the text can be computed there:
+
+- concrete text fields and methods declaring a @db_expression are filtered
+  on the expression
+- text fields reached through many to many relations are filtered with a
+  lookup across the relation
+- methods declaring @search_relation are filtered on the __str__ expression
+  of the records of the relation they list
+
+Other attributes are still computed in python on every record.
+"""
+
+from django.core.exceptions import FieldError
+from django.db import models
+
+from horilla.methods import get_attribute_field, resolve_db_expression
+from horilla_views.templatetags.generic_template_filters import getattribute
+
+TEXT_FIELDS = (models.CharField, models.TextField)
+
+# Annotation holding the searched text
+SEARCH_ALIAS = "_search_text"
+
+
+def many_lookup(model, path):
+    """
+    Query lookup of a text field reached through a many to many relation,
+    None for any other path
+    """
+    names = []
+    many = False
+    parts = path.split("__")
+    for part in parts[:-1]:
+        field = get_attribute_field(model, part)
+        if field is None or not field.is_relation or field.one_to_many:
+            return None
+        many = many or field.many_to_many
+        names.append(field.name)
+        model = field.related_model
+    field = get_attribute_field(model, parts[-1])
+    if not many or field is None or not isinstance(field, TEXT_FIELDS):
+        return None
+    return "__".join(names + [field.name])
+
+
+def relation_search(queryset, path, value):
+    """
+    Filter on the __str__ expression of the records of the many to many
+    relation listed by a @search_relation method, None for any other path
+    """
+    model = queryset.model
+    attribute = getattr(model, path, None)
+    if isinstance(attribute, property):
+        attribute = attribute.fget
+    relation = getattr(attribute, "search_relation", None)
+    field = relation and get_attribute_field(model, relation)
+    if field is None or not field.many_to_many:
+        return None
+    expression = getattr(field.related_model.__str__, "db_expression", None)
+    if expression is None:
+        return None
+    matches = (
+        model._base_manager.annotate(**{SEARCH_ALIAS: expression(f"{field.name}__")})
+        .filter(**{f"{SEARCH_ALIAS}__icontains": value})
+        .values("pk")
+    )
+    return queryset.filter(pk__in=matches)
+
+
+def expression_search(queryset, path, value):
+    """
+    Filter on the database expression of the path, None when it has none or
+    it is not a text
+    """
+    expression = resolve_db_expression(queryset.model, path)
+    if expression is None:
+        return None
+    annotated = queryset.annotate(**{SEARCH_ALIAS: expression})
+    try:
+        output_field = annotated.query.annotations[SEARCH_ALIAS].output_field
+    except FieldError:
+        return None
+    if not isinstance(output_field, TEXT_FIELDS):
+        return None
+    return annotated.filter(**{f"{SEARCH_ALIAS}__icontains": value})
+
+
+def attribute_text(instance, attribute) -> str:
+    return str(getattribute(instance, attribute))
+
+
+def search_queryset(queryset, path, value):
+    """
+    Records of the queryset whose getattribute(instance, path) text contains
+    the value, case insensitive
+    """
+    if not value:
+        return queryset
+    result = expression_search(queryset, path, value)
+    if result is not None:
+        return result
+    lookup = many_lookup(queryset.model, path)
+    if lookup:
+        return queryset.filter(
+            pk__in=queryset.model._base_manager.filter(
+                **{f"{lookup}__icontains": value}
+            ).values("pk")
+        )
+    result = relation_search(queryset, path, value)
+    if result is not None:
+        return result
+
+    from horilla_views.cbv_methods import plan_queryset
+
+    value = value.lower()
+
+    def _icontains(instance):
+        result = attribute_text(instance, path).lower()
+        return instance.pk if value in result else None
+
+    ids = list(filter(None, map(_icontains, plan_queryset(queryset, [path]))))
+    return queryset.filter(id__in=ids)
@@ -155,3 +155,40 @@ def get_id(string: str):
     Generate target/id for the generic delete summary
     """
     return string.split("-")[0].lower().replace(" ", "")
+
+
+class CacheRowNode(template.Node):
+    """
+    CacheRowNode
+    """
+
+    def __init__(self, nodelist, instance):
+        self.nodelist = nodelist
+        self.instance = instance
+
+    def render(self, context):
+        row_cache = context.get("row_cache")
+        if row_cache is None:
+            return self.nodelist.render(context)
+        instance = self.instance.resolve(context)
+        fragment = row_cache.get(instance)
+        if fragment is None:
+            fragment = self.nodelist.render(context)
+            row_cache.set(instance, fragment)
+        return fragment
+
+
+@register.tag
+def cache_row(parser, token):
+    """
+    Render the block of a row once per row version, views setting cache_rows
+    serve it from the cache afterwards (see horilla_views.row_cache)
+
+    Usage: {% cache_row instance %} ... {% endcache_row %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes one argument")
+    nodelist = parser.parse(("endcache_row",))
+    parser.delete_first_token()
+    return CacheRowNode(nodelist, parser.compile_filter(bits[1]))
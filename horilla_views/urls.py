@@ -7,6 +7,8 @@ from django.urls import path
 from horilla_views import views
 from horilla_views.generic.cbv import history
 from horilla_views.generic.cbv.views import ReloadMessages
+from horilla_views.row_cache import row_cache_metrics
+from horilla_views.view_state import view_state_metrics
 
 urlpatterns = [
     path("toggle-columns", views.ToggleColumn.as_view(), name="toggle-columns"),
@@ -45,9 +47,26 @@ urlpatterns = [
         views.HorillaDeleteConfirmationView.as_view(),
         name="generic-delete",
     ),
+    path(
+        "list-view-export/<str:token>/",
+        views.ListViewExport.as_view(),
+        name="list-view-export",
+    ),
+    path(
+        "list-view-bulk-form/<str:token>/",
+        views.ListViewBulkForm.as_view(),
+        name="list-view-bulk-form",
+    ),
+    path(
+        "list-view-bulk-update/<str:token>/",
+        views.ListViewBulkUpdate.as_view(),
+        name="list-view-bulk-update",
+    ),
     path(
         "horilla-history-revert/<int:pk>/<int:history_id>/",
         history.HorillaHistoryView.as_view(),
         name="history-revert",
     ),
+    path("view-state-metrics/", view_state_metrics, name="view-state-metrics"),
+    path("row-cache-metrics/", row_cache_metrics, name="row-cache-metrics"),
 ]
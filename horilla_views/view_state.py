@@ -0,0 +1,215 @@
+"""
+horilla_views/view_state.py
+
+State of the generic views kept between the requests of a session: saved
+list filters, last applied filters, record navigation, search in results and
+dynamic create fields.
+
+The entries live in the VIEW_STATE_CACHE Django cache, so every worker sees
+the same state when the backend is shared, and are bounded:
+
+- an entry expires VIEW_STATE_TIMEOUT after it was last written
+- an entry serialised larger than VIEW_STATE_MAX_BYTES is not stored
+- a session keeps VIEW_STATE_SESSION_ENTRIES entries, the least recently
+  written are dropped
+
+Values are pickled with the highest protocol and compressed when large.
+view_state_stats() reports the entries and bytes currently stored, counted
+in buckets by expiry hour so that expired entries leave the count without
+being deleted. The session index and the counters are updated without locks,
+concurrent requests of a session can make them approximate, never unbounded.
+"""
+
+import hashlib
+import logging
+import pickle
+import time
+import zlib
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from horilla.horilla_settings import (
+    VIEW_STATE_CACHE,
+    VIEW_STATE_COMPRESS_BYTES,
+    VIEW_STATE_MAX_BYTES,
+    VIEW_STATE_SESSION_ENTRIES,
+    VIEW_STATE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "horilla_view_state"
+
+# Serialised value prefixes
+PICKLED = b"p"
+COMPRESSED = b"z"
+
+BUCKET_SECONDS = 60 * 60
+
+
+def get_cache():
+    return caches[VIEW_STATE_CACHE]
+
+
+def session_key_of(request):
+    return str(request.session.session_key)
+
+
+def entry_key(session_key, name):
+    """
+    Cache key of an entry, names hold request paths and are hashed to stay
+    valid memcached keys
+    """
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return f"{KEY_PREFIX}:{session_key}:{digest}"
+
+
+def index_key(session_key):
+    return f"{KEY_PREFIX}:{session_key}"
+
+
+def counter_key(kind, bucket):
+    return f"{KEY_PREFIX}:stats:{kind}:{bucket}"
+
+
+def dumps(value) -> bytes:
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) > VIEW_STATE_COMPRESS_BYTES:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return COMPRESSED + compressed
+    return PICKLED + data
+
+
+def loads(data: bytes):
+    if data[:1] == COMPRESSED:
+        return pickle.loads(zlib.decompress(data[1:]))
+    return pickle.loads(data[1:])
+
+
+def count(kind, bucket, delta, timeout):
+    """
+    Add delta to a counter shared by the workers
+    """
+    cache = get_cache()
+    key = counter_key(kind, bucket)
+    cache.add(key, 0, timeout)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # expired between add and incr
+        cache.add(key, max(delta, 0), timeout)
+
+
+def account(entries, size, expires_at):
+    bucket = int(expires_at // BUCKET_SECONDS)
+    timeout = max(int(expires_at - time.time()) + BUCKET_SECONDS, 1)
+    count("entries", bucket, entries, timeout)
+    count("bytes", bucket, size, timeout)
+
+
+def forget(index, name_key):
+    """
+    Remove an entry from the session index and the counters
+    """
+    size, expires_at = index.pop(name_key)
+    if expires_at > time.time():
+        account(-1, -size, expires_at)
+
+
+def get_state(request, name, default=None):
+    """
+    Value stored under `name` for the session of the request
+    """
+    data = get_cache().get(entry_key(session_key_of(request), name))
+    if data is None:
+        return default
+    try:
+        return loads(data)
+    except Exception:
+        logger.warning("Could not load the view state %s", name, exc_info=True)
+        return default
+
+
+def set_state(request, name, value, timeout=VIEW_STATE_TIMEOUT) -> bool:
+    """
+    Store the value under `name` for the session of the request, returns
+    whether it was stored
+    """
+    session_key = session_key_of(request)
+    data = dumps(value)
+    cache = get_cache()
+    key = entry_key(session_key, name)
+    if len(data) > VIEW_STATE_MAX_BYTES:
+        logger.warning(
+            "View state %s not stored, %s bytes over the limit", name, len(data)
+        )
+        count("rejected", "total", 1, None)
+        delete_state(request, name)
+        return False
+
+    now = time.time()
+    index = {
+        item: (size, expires_at)
+        for item, (size, expires_at) in cache.get(index_key(session_key), {}).items()
+        if expires_at > now
+    }
+    if key in index:
+        forget(index, key)
+    while len(index) >= VIEW_STATE_SESSION_ENTRIES:
+        oldest = min(index, key=lambda item: index[item][1])
+        cache.delete(oldest)
+        forget(index, oldest)
+        count("evicted", "total", 1, None)
+
+    expires_at = now + timeout
+    cache.set(key, data, timeout)
+    index[key] = (len(data), expires_at)
+    cache.set(index_key(session_key), index, max(timeout, VIEW_STATE_TIMEOUT))
+    account(1, len(data), expires_at)
+    return True
+
+
+def delete_state(request, name):
+    session_key = session_key_of(request)
+    cache = get_cache()
+    key = entry_key(session_key, name)
+    cache.delete(key)
+    index = cache.get(index_key(session_key), {})
+    if key in index:
+        forget(index, key)
+        cache.set(index_key(session_key), index, VIEW_STATE_TIMEOUT)
+
+
+def view_state_stats() -> dict:
+    """
+    Entries and bytes currently stored, entries rejected for their size and
+    dropped by the session bound
+    """
+    cache = get_cache()
+    current = int(time.time() // BUCKET_SECONDS)
+    buckets = range(current, current + VIEW_STATE_TIMEOUT // BUCKET_SECONDS + 2)
+    keys = [
+        counter_key(kind, bucket) for kind in ("entries", "bytes") for bucket in buckets
+    ]
+    counters = cache.get_many(keys)
+    return {
+        "entries": sum(
+            counters.get(counter_key("entries", bucket), 0) for bucket in buckets
+        ),
+        "bytes": sum(
+            counters.get(counter_key("bytes", bucket), 0) for bucket in buckets
+        ),
+        "rejected": cache.get(counter_key("rejected", "total"), 0),
+        "evicted": cache.get(counter_key("evicted", "total"), 0),
+    }
+
+
+@staff_member_required
+def view_state_metrics(request):
+    """
+    Staff only endpoint serving view_state_stats()
+    """
+    return JsonResponse(view_state_stats())
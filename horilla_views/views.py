@@ -5,20 +5,27 @@ from django import forms
 from django.apps import apps
 from django.contrib import messages
 from django.contrib.admin.utils import NestedObjects
-from django.core.cache import cache as CACHE
 from django.db import router
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.decorators.csrf import csrf_protect
 
 from base.methods import eval_validate
 from horilla.signals import post_generic_delete, pre_generic_delete
 from horilla_views import models
-from horilla_views.cbv_methods import get_short_uuid, login_required, merge_dicts
+from horilla_views.cbv_methods import (
+    get_short_uuid,
+    load_view_token,
+    login_required,
+    merge_dicts,
+)
 from horilla_views.forms import SavedFilterForm
 from horilla_views.generic.cbv.views import HorillaFormView, HorillaListView
+from horilla_views.view_state import get_state, set_state
 
 # Create your views here.
 
@@ -71,10 +78,8 @@ class ReloadField(View):
         module = importlib.import_module(module_name)
         parent_form = getattr(module, class_name)()
 
-        dynamic_cache = CACHE.get(request.session.session_key + "cbv" + reload_field)
-        onchange = CACHE.get(
-            request.session.session_key + "cbv" + reload_field + "onchange"
-        )
+        dynamic_cache = get_state(request, "cbv" + reload_field)
+        onchange = get_state(request, "cbv" + reload_field + "onchange")
         if not onchange:
             onchange = ""
 
@@ -252,8 +257,7 @@ class SearchInIds(View):
         """
         Search in instance ids method
         """
-        cache_key = f"{self.request.session.session_key}search_in_instance_ids"
-        context: dict = CACHE.get(cache_key)
+        context: dict = get_state(self.request, "search_in_instance_ids")
         context["instances"] = context["filter_class"](self.request.GET).qs
         return render(self.request, "generic/filter_result.html", context)
 
@@ -273,14 +277,85 @@ class LastAppliedFilter(View):
             "nav_url",
         )
         if nav_path:
-            CACHE.set(
-                self.request.session.session_key + "last-applied-filter" + nav_path,
+            set_state(
+                self.request,
+                "last-applied-filter" + nav_path,
                 self.request.GET,
                 timeout=600,
             )
         return HttpResponse("success")
 
 
+class ListViewTokenMixin:
+    """
+    Mixin for the fixed HorillaListView endpoints, resolves the list view
+    from the signed token rendered in its context
+    """
+
+    def get_list_view(self, token):
+        """
+        Instance of the list view the token was issued for, None when the
+        token is invalid or expired
+        """
+        resolved = load_view_token(self.request, token)
+        if resolved is None:
+            return None
+        view_class, kwargs = resolved
+        if not (
+            isinstance(view_class, type) and issubclass(view_class, HorillaListView)
+        ):
+            return None
+        view = view_class()
+        view.setup(self.request, **kwargs)
+        view.post_bulk_path = reverse("list-view-bulk-update", args=[token])
+        return view
+
+    def expired(self):
+        return HttpResponse(
+            _("This view has expired, please reload the page and try again."),
+            status=400,
+        )
+
+
+@method_decorator(login_required, name="dispatch")
+class ListViewExport(ListViewTokenMixin, View):
+    """
+    Export endpoint of the HorillaListViews
+    """
+
+    def post(self, *args, **kwargs):
+        view = self.get_list_view(kwargs["token"])
+        if view is None:
+            return self.expired()
+        return view.export_data()
+
+
+@method_decorator(login_required, name="dispatch")
+class ListViewBulkForm(ListViewTokenMixin, View):
+    """
+    Serves the bulk update form of the HorillaListViews
+    """
+
+    def post(self, *args, **kwargs):
+        view = self.get_list_view(kwargs["token"])
+        if view is None:
+            return self.expired()
+        return view.serve_bulk_form(self.request)
+
+
+@method_decorator(login_required, name="dispatch")
+class ListViewBulkUpdate(ListViewTokenMixin, View):
+    """
+    Handles the bulk update form submission of the HorillaListViews
+    """
+
+    def post(self, *args, **kwargs):
+        view = self.get_list_view(kwargs["token"])
+        if view is None:
+            return self.expired()
+        return view.handle_bulk_submission(self.request)
+
+
 class DynamiListView(HorillaListView):
     """
     DynamicListView for Generic Delete
@@ -304,17 +379,14 @@ class HorillaDeleteConfirmationView(View):
 
     confirmation_target = "deleteConfirmationBody"
 
-    def get(self, *args, **kwargs):
+    @staticmethod
+    def collect_related(app, MODEL_NAME, pk, register_urls=True):
         """
-        GET method
+        Collect the records deleted with or protecting the record, with a
+        DynamiListView listing them per model
         """
         from horilla.urls import path, urlpatterns
 
-        pk = self.request.GET["pk"]
-
-        app, MODEL_NAME = self.request.GET["model"].split(".")
-        if not self.request.user.has_perm(app + ".delete_" + MODEL_NAME.lower()):
-            return render(self.request, "no_perm.html")
         model = apps.get_model(app, MODEL_NAME)
 
         delete_object = model.objects.get(pk=pk)
@@ -327,6 +399,7 @@ class HorillaDeleteConfirmationView(View):
         DYNAMIC_PATH_MAP = {}
         MODEL_RELATED_FIELD_MAP = {}
         MODEL_RELATED_PROTECTED_FIELD_MAP = {}
+        DYNAMIC_VIEW_MAP = {}
 
         def format_callback(instance, protected=False):
             if not MODEL_RELATED_FIELD_MAP.get(instance._meta.model):
@@ -495,14 +568,21 @@ class HorillaDeleteConfirmationView(View):
                 DynamiListView.selected_instances_key_id = (
                     DynamiListView.selected_instances_key_id + model.verbose_name
                 )
-
-                urlpatterns.append(
-                    path(
-                        DynamiListView.search_url,
-                        DynamiListView.as_view(),
-                        name=DynamiListView.search_url,
-                    )
+                # rebuilt by any worker from the view token (see get_view_token)
+                DynamiListView.view_factory = (
+                    "horilla_views.views:generic_delete_list_view",
+                    [app, MODEL_NAME, str(pk), model._meta.label],
                 )
+                DYNAMIC_VIEW_MAP[model] = DynamiListView
+
+                if register_urls:
+                    urlpatterns.append(
+                        path(
+                            DynamiListView.search_url,
+                            DynamiListView.as_view(),
+                            name=DynamiListView.search_url,
+                        )
+                    )
             model_map[app_label][model].append(instance)
 
             return instance
@@ -511,6 +591,27 @@ class HorillaDeleteConfirmationView(View):
         protected = [
             format_callback(obj, protected=True) for obj in collector.protected
         ]
+        return {
+            "delete_object": delete_object,
+            "collector": collector,
+            "model_map": MODEL_MAP,
+            "protected_model_map": PROTECTED_MODEL_MAP,
+            "dynamic_path_map": DYNAMIC_PATH_MAP,
+            "dynamic_view_map": DYNAMIC_VIEW_MAP,
+            "protected": protected,
+        }
+
+    def get(self, *args, **kwargs):
+        """
+        GET method
+        """
+        pk = self.request.GET["pk"]
+
+        app, MODEL_NAME = self.request.GET["model"].split(".")
+        if not self.request.user.has_perm(app + ".delete_" + MODEL_NAME.lower()):
+            return render(self.request, "no_perm.html")
+        related = self.collect_related(app, MODEL_NAME, pk)
+        collector = related["collector"]
 
         model_count = {
             model._meta.verbose_name_plural: len(objs)
@@ -524,10 +625,12 @@ class HorillaDeleteConfirmationView(View):
             protected_model_count[model._meta.verbose_name_plural] += 1
         protected_model_count = dict(protected_model_count)
         context = {
-            "model_map": merge_dicts(MODEL_MAP, PROTECTED_MODEL_MAP),
-            "dynamic_list_path": DYNAMIC_PATH_MAP,
-            "delete_object": delete_object,
-            "protected": protected,
+            "model_map": merge_dicts(
+                related["model_map"], related["protected_model_map"]
+            ),
+            "dynamic_list_path": related["dynamic_path_map"],
+            "delete_object": related["delete_object"],
+            "protected": related["protected"],
             "model_count_sum": sum(model_count.values()),
             "related_objects_count": model_count,
             "protected_objects_count": protected_model_count,
@@ -592,3 +695,14 @@ class HorillaDeleteConfirmationView(View):
         context = {}
         context["confirmation_target"] = self.confirmation_target
         return context
+
+
+def generic_delete_list_view(app, model_name, pk, view_model):
+    """
+    DynamiListView of the generic delete confirmation of the record, listing
+    its related records of the view model
+    """
+    related = HorillaDeleteConfirmationView.collect_related(
+        app, model_name, pk, register_urls=False
+    )
+    return related["dynamic_view_map"][apps.get_model(view_model)]
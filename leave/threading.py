@@ -8,10 +8,12 @@ from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
 
 from base.backends import ConfiguredEmailBackend
+from horilla.profiler import profiled_thread
 
 logger = logging.getLogger(__name__)
 
 
+@profiled_thread
 class LeaveMailSendThread(Thread):
 
     def __init__(self, request, leave_request, type):
@@ -125,6 +127,7 @@ class LeaveMailSendThread(Thread):
         return
 
 
+@profiled_thread
 class LeaveClashThread(Thread):
 
     def __init__(self, leave_request):
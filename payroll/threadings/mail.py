@@ -12,12 +12,14 @@ from django.template.loader import render_to_string
 
 from base.backends import ConfiguredEmailBackend
 from employee.models import EmployeeWorkInformation
+from horilla.profiler import profiled_thread
 from payroll.models.models import Payslip
 from payroll.views.views import payslip_pdf
 
 logger = logging.getLogger(__name__)
 
 
+@profiled_thread
 class MailSendThread(Thread):
     """
     MailSend
@@ -156,6 +156,7 @@ class ProjectsList(HorillaListView):
 
     model = Project
     filter_class = ProjectFilter
+    cache_rows = True
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -333,6 +334,7 @@ class ProjectCardView(HorillaCardView):
 
     model = Project
     filter_class = ProjectFilter
+    cache_rows = True
 
     def get_queryset(self):
         queryset = super().get_queryset()
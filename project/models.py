@@ -22,6 +22,7 @@ from base.models import Company
 from employee.models import Employee
 from horilla import horilla_middlewares
 from horilla.horilla_middlewares import _thread_locals
+from horilla.methods import related_lookups, search_relation
 from horilla.models import HorillaModel
 from horilla_views.cbv_methods import render_template
 
@@ -96,6 +97,8 @@ class Project(HorillaModel):
             else self.description[:length] + "..."
         )
 
+    @search_relation("managers")
+    @related_lookups("managers")
     def get_managers(self):
         """
         managers column
@@ -107,6 +110,8 @@ class Project(HorillaModel):
             )
             return employee_names_string
 
+    @search_relation("members")
+    @related_lookups("members")
     def get_members(self):
         """
         members column
@@ -138,6 +143,9 @@ class Project(HorillaModel):
                 image_url,
             )
 
+    @related_lookups(
+        "managers", "members", "task_set__task_managers", "task_set__task_members"
+    )
     def redirect(self):
         """
         This method generates an onclick URL for task viewing.
@@ -410,6 +418,8 @@ class Task(HorillaModel):
         """
         return dict(self.TASK_STATUS).get(self.status)
 
+    @search_relation("task_managers")
+    @related_lookups("task_managers")
     def get_managers(self):
         """
         return task managers
@@ -421,6 +431,8 @@ class Task(HorillaModel):
         else:
             return ""
 
+    @search_relation("task_members")
+    @related_lookups("task_members")
     def get_members(self):
         """
         return task members